@@ -0,0 +1,193 @@
+"""
+アカウントのポーリングスケジューラー
+
+accounts.json の並び順で先頭から取るのではなく、毎回どのアカウントを収集するかを
+次の3つから決める:
+
+- priority（high / medium / low）
+- 過去の収穫率: 1回の収集で閾値を超えたツイート数の指数移動平均（EMA）
+- 前回の収集からの経過時間
+
+score = 優先度の重み × (収穫率EMA + PRIOR_YIELD) × 経過時間の係数
+
+収穫の多いアカウントは頻繁に、収穫の無いアカウントは間隔を空けて収集される。
+収穫率が0でも経過時間の係数が伸び続けるので、いずれは再チェックされる。
+統計は output/account_stats.json に保存する。
+
+使い方:
+    scheduler = AccountScheduler()
+    selected = scheduler.select(accounts, limit=10)
+    ...収集・フィルタ...
+    scheduler.record_run(selected, all_tweets, viral_tweets)
+    scheduler.save()
+
+チェックポイント（checkpoint.RunCheckpoint）のある実行では select_for_run / record_run_once を使う。
+再開しても同じアカウントを収集し、統計はアカウントごとに実行IDあたり1回だけ記録される。
+"""
+import os
+import time
+from utils import load_json_file, save_json_file, log_info
+
+PRIORITY_WEIGHTS = {'high': 3.0, 'medium': 2.0, 'low': 1.0}
+# 収穫率がまだ無い（または0の）アカウントにも機会を残すための下駄
+PRIOR_YIELD = 0.5
+# 経過時間の係数 = 経過時間 / BASE_INTERVAL_HOURS（上限 MAX_STALENESS）
+BASE_INTERVAL_HOURS = 24
+MAX_STALENESS = 7.0
+EMA_ALPHA = 0.3
+
+
+def _default_stats_path():
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv('ACCOUNT_STATS_PATH') or os.path.join(parent_dir, 'output', 'account_stats.json')
+
+
+def _username(account):
+    return account['username'].strip().lstrip('@').lower()
+
+
+class AccountScheduler:
+    """優先度・収穫率・経過時間で収集するアカウントを選ぶ"""
+    def __init__(self, stats_path=None, priority_weights=None, base_interval_hours=None,
+                 ema_alpha=None):
+        """
+        Args:
+            stats_path: 統計ファイルのパス（既定: output/account_stats.json）
+            priority_weights: priority → 重み（PRIORITY_WEIGHTS を上書き）
+            base_interval_hours: 経過時間の係数が1になる時間
+            ema_alpha: 収穫率EMAの係数（大きいほど直近の結果を重視）
+        """
+        self.stats_path = stats_path or _default_stats_path()
+        self.priority_weights = {**PRIORITY_WEIGHTS, **(priority_weights or {})}
+        self.base_interval_hours = base_interval_hours or BASE_INTERVAL_HOURS
+        self.ema_alpha = ema_alpha or EMA_ALPHA
+        self.stats = {}
+        if os.path.exists(self.stats_path):
+            try:
+                self.stats = load_json_file(self.stats_path)
+            except (OSError, ValueError) as e:
+                log_info(f"Failed to load account stats, starting fresh: {e}")
+
+    @classmethod
+    def from_settings(cls, settings):
+        """settings.json の collection.scheduler から生成"""
+        options = settings.get('collection', {}).get('scheduler', {})
+        return cls(
+            priority_weights=options.get('priority_weights'),
+            base_interval_hours=options.get('base_interval_hours'),
+            ema_alpha=options.get('ema_alpha')
+        )
+
+    def score(self, account, now=None):
+        """アカウントの優先スコア（大きいほど先に収集）"""
+        now = now or time.time()
+        weight = self.priority_weights.get(account.get('priority', 'medium'),
+                                           self.priority_weights['medium'])
+        stats = self.stats.get(_username(account))
+        if not stats:
+            # 一度も収集していないアカウントは最大の経過時間として扱う
+            return weight * (PRIOR_YIELD + 1.0) * MAX_STALENESS
+        hours = max(0.0, now - stats['last_polled_at']) / 3600
+        staleness = min(hours / self.base_interval_hours, MAX_STALENESS)
+        return weight * (stats['yield_ema'] + PRIOR_YIELD) * staleness
+
+    def select(self, accounts, limit=None, now=None):
+        """
+        今回収集するアカウントをスコア順に選ぶ
+
+        Args:
+            accounts: accounts.json の benchmark_accounts
+            limit: 選ぶ数（max_accounts_per_run）
+
+        Returns:
+            list[dict]: 選ばれたアカウント（スコアの降順）
+        """
+        now = now or time.time()
+        valid = [a for a in accounts if a.get('username', '').strip().lstrip('@')]
+        # 同点なら accounts.json の順（sorted は安定ソート）
+        ranked = sorted(valid, key=lambda a: self.score(a, now), reverse=True)
+        selected = ranked[:limit] if limit else ranked
+        if limit and len(valid) > limit:
+            log_info(f"Scheduler: {len(valid)}アカウント中{len(selected)}件を選択 "
+                     f"({', '.join('@' + _username(a) for a in selected[:5])}"
+                     f"{' ...' if len(selected) > 5 else ''})")
+        return selected
+
+    def select_for_run(self, checkpoint, accounts, limit=None, now=None):
+        """
+        実行のアカウントを選ぶ（チェックポイントに選択済みならそれを使う）
+
+        再開時にスコアを計算し直すと（前回の実行で統計が更新されているので）
+        別のアカウントが選ばれ、収集をやり直すことになるため。
+        """
+        selected = checkpoint.get_meta('scheduled_accounts')
+        if selected is not None:
+            log_info(f"Scheduler: 実行 {checkpoint.run_id} で選択済みの{len(selected)}アカウントを使用")
+            return selected
+        return checkpoint.set_meta_once('scheduled_accounts', self.select(accounts, limit, now=now))
+
+    def record_run_once(self, checkpoint, accounts, tweets, viral_tweets, failed=(), now=None):
+        """
+        record_run → save を、この実行でまだ記録していないアカウントだけに行う
+
+        accounts には実際に収集したアカウントを渡す（予算で見送ったアカウントを渡すと
+        収穫0として記録されてしまう）。予算で止まった実行を再開すると、再開時に収集した分が記録される。
+        """
+        recorded = set(checkpoint.get_meta('scheduler_recorded_accounts') or [])
+        failed = {name.strip().lstrip('@').lower() for name in failed}
+        new_accounts = [a for a in accounts
+                        if _username(a) not in recorded and _username(a) not in failed]
+        if not new_accounts:
+            return
+        self.record_run(new_accounts, tweets, viral_tweets, now=now)
+        self.save()
+        checkpoint.set_meta('scheduler_recorded_accounts',
+                            sorted(recorded | {_username(a) for a in new_accounts}))
+
+    def record(self, username, collected, viral, now=None):
+        """1アカウントの収集結果を記録"""
+        key = username.strip().lstrip('@').lower()
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = {'polls': 0, 'yield_ema': float(viral),
+                                       'collected_total': 0, 'viral_total': 0}
+        else:
+            stats['yield_ema'] = (self.ema_alpha * viral
+                                  + (1 - self.ema_alpha) * stats['yield_ema'])
+        stats['polls'] += 1
+        stats['collected_total'] += collected
+        stats['viral_total'] += viral
+        stats['last_collected'] = collected
+        stats['last_viral'] = viral
+        stats['last_polled_at'] = now or time.time()
+
+    def record_run(self, accounts, tweets, viral_tweets, failed=(), now=None):
+        """
+        1回分の収集結果をまとめて記録
+
+        Args:
+            accounts: 収集したアカウント（予算などで取得しなかったアカウントは含めない）
+            tweets: 収集したツイート（'account' にユーザー名が入っている）
+            viral_tweets: 閾値を超えたツイート
+            failed: 取得に失敗したアカウント（収穫0として扱わず、記録しない）
+        """
+        collected, viral = {}, {}
+        for tweet in tweets:
+            name = (tweet.get('account') or '').lower()
+            collected[name] = collected.get(name, 0) + 1
+        for tweet in viral_tweets:
+            name = (tweet.get('account') or '').lower()
+            viral[name] = viral.get(name, 0) + 1
+        failed = {name.strip().lstrip('@').lower() for name in failed}
+        for account in accounts:
+            name = _username(account)
+            if name in failed:
+                continue
+            self.record(name, collected.get(name, 0), viral.get(name, 0), now=now)
+
+    def save(self):
+        """統計をファイルに書き出す"""
+        os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        tmp_path = f"{self.stats_path}.tmp"
+        save_json_file(tmp_path, self.stats)
+        os.replace(tmp_path, self.stats_path)
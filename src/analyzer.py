@@ -13,9 +13,9 @@ Xの公式アルゴリズムが予測する指標:
 
 最終スコア = Σ (weight_i × P(action_i))
 """
-import asyncio
 import json
 import os
+from resilience import CircuitOpenError, resilient_call
 from utils import is_mock_mode, log_info
 
 
@@ -35,7 +35,7 @@ class TweetAnalyzer:
             except Exception as e:
                 log_info(f"Gemini analyzer init failed: {e}")
 
-    async def analyze_tweet(self, tweet_data):
+    async def analyze_tweet(self, tweet_data, on_usage=None):
         """
         X公式アルゴリズムの視点でツイートを分析
 
@@ -46,6 +46,7 @@ class TweetAnalyzer:
                 'retweets': int,
                 'replies': int
             }
+            on_usage: 応答ごとに on_usage('analyze', usage_metadata) を呼ぶ（コスト集計用）
 
         Returns:
             dict: 分析結果
@@ -107,7 +108,8 @@ class TweetAnalyzer:
 }}
 """
         try:
-            response = await asyncio.to_thread(
+            response = await resilient_call(
+                'gemini',
                 self._model.generate_content,
                 prompt,
                 generation_config={
@@ -116,10 +118,14 @@ class TweetAnalyzer:
                     "response_mime_type": "application/json",
                 }
             )
+            if on_usage:
+                on_usage('analyze', getattr(response, 'usage_metadata', None))
             if response and response.text:
                 out = self._parse_analysis(response.text)
                 log_info("Gemini analysis completed")
                 return out
+        except CircuitOpenError:
+            raise
         except Exception as e:
             log_info(f"Gemini analysis error: {e}")
 
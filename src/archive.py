@@ -0,0 +1,227 @@
+"""
+実行履歴の列指向アーカイブ（Parquet / Arrow）
+
+- 収集した生ツイート・分析・スコア・リライトを1実行ごとに追記
+- output/archive/date=YYYY-MM-DD/category=xxx/part-<run_id>.parquet に分割保存
+- 「過去90日の hook_type 別 dwell_potential 平均」のような集計を数秒で実行
+
+pyarrow が無い環境ではアーカイブをスキップする（本体の処理は止めない）
+"""
+import os
+import uuid
+from datetime import datetime, timedelta
+from utils import log_info, log_success
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+SCORE_FIELDS = ['dwell_potential', 'reply_potential', 'favorite_potential', 'repost_potential']
+
+
+def _schema():
+    return pa.schema([
+        ('run_id', pa.string()),
+        ('source', pa.string()),
+        ('collected_at', pa.timestamp('s')),
+        ('date', pa.string()),
+        ('category', pa.string()),
+        ('tweet_id', pa.string()),
+        ('url', pa.string()),
+        ('text', pa.string()),
+        ('tweet_timestamp', pa.string()),
+        ('likes', pa.int64()),
+        ('retweets', pa.int64()),
+        ('replies', pa.int64()),
+        ('engagement_score', pa.float64()),
+        ('analyzed', pa.bool_()),
+        ('rewritten', pa.bool_()),
+        *[(name, pa.int32()) for name in SCORE_FIELDS],
+        ('hook_type', pa.string()),
+        ('structure_type', pa.string()),
+        ('essence', pa.string()),
+        ('why_viral', pa.list_(pa.string())),
+        ('dwell_factors', pa.string()),
+        ('reply_triggers', pa.string()),
+        ('engagement_hooks', pa.string()),
+        ('rewritten_text', pa.string()),
+        ('thread', pa.list_(pa.string())),
+        ('call_to_action', pa.string()),
+        ('image_url', pa.string()),
+    ])
+
+
+class RunArchive:
+    """
+    1回の実行結果をParquetに追記するアーカイブ
+
+    使い方:
+        archive = RunArchive(source='main')
+        archive.add_tweets(all_tweets)
+        archive.add_analysis(tweet, analysis)
+        archive.add_rewrite(tweet, rewritten, image_url)
+        archive.write()
+    """
+    def __init__(self, archive_dir=None, run_id=None, source='main'):
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.archive_dir = archive_dir or os.getenv('ARCHIVE_DIR') or os.path.join(parent_dir, 'output', 'archive')
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.source = source
+        self.started_at = datetime.now().replace(microsecond=0)
+        self._records = {}
+
+    def add_tweets(self, tweets):
+        """収集した生ツイートを登録"""
+        for tweet in tweets:
+            self._record(tweet)
+
+    def add_analysis(self, tweet, analysis):
+        """分析結果を登録"""
+        record = self._record(tweet)
+        analysis = analysis or {}
+        scores = analysis.get('scores') or {}
+        positive = analysis.get('positive_signals') or {}
+        record.update(
+            analyzed=True,
+            hook_type=analysis.get('hook_type'),
+            structure_type=analysis.get('structure_type'),
+            essence=analysis.get('essence'),
+            why_viral=[str(v) for v in analysis.get('why_viral') or []],
+            dwell_factors=positive.get('dwell_factors'),
+            reply_triggers=positive.get('reply_triggers'),
+            engagement_hooks=positive.get('engagement_hooks'),
+            **{name: self._to_int(scores.get(name)) for name in SCORE_FIELDS},
+        )
+
+    def add_rewrite(self, tweet, rewritten, image_url=None):
+        """リライト結果を登録"""
+        record = self._record(tweet)
+        rewritten = rewritten or {}
+        record.update(
+            rewritten=True,
+            rewritten_text=rewritten.get('main_text'),
+            thread=[str(t) for t in rewritten.get('thread') or []],
+            call_to_action=rewritten.get('call_to_action'),
+            image_url=image_url or None,
+        )
+
+    def write(self):
+        """
+        登録したレコードを日付・カテゴリで分割してParquetに書き出す
+
+        Returns:
+            int: 書き出した件数
+        """
+        if not PYARROW_AVAILABLE:
+            log_info("pyarrow not installed. Skipping run archive.")
+            return 0
+        if not self._records:
+            return 0
+        try:
+            table = pa.Table.from_pylist(list(self._records.values()), schema=_schema())
+            pq.write_to_dataset(
+                table,
+                root_path=self.archive_dir,
+                partition_cols=['date', 'category'],
+                basename_template=f"part-{self.run_id}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+            )
+            log_success(f"Archived {table.num_rows} records to {self.archive_dir} (run {self.run_id})")
+            return table.num_rows
+        except Exception as e:
+            log_info(f"Run archive failed: {e}")
+            return 0
+
+    def _record(self, tweet):
+        """ツイートIDごとのレコードを取得（なければ作成）"""
+        key = str(tweet.get('id') or tweet.get('url'))
+        record = self._records.get(key)
+        if record is None:
+            record = {
+                'run_id': self.run_id,
+                'source': self.source,
+                'collected_at': self.started_at,
+                'date': self.started_at.strftime('%Y-%m-%d'),
+                'category': tweet.get('category') or 'uncategorized',
+                'tweet_id': str(tweet.get('id', '')),
+                'url': tweet.get('url'),
+                'text': tweet.get('text'),
+                'tweet_timestamp': tweet.get('timestamp'),
+                'likes': self._to_int(tweet.get('likes')),
+                'retweets': self._to_int(tweet.get('retweets')),
+                'replies': self._to_int(tweet.get('replies')),
+                'engagement_score': float(tweet.get('engagement_score') or 0),
+                'analyzed': False,
+                'rewritten': False,
+            }
+            self._records[key] = record
+        return record
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+def scan_archive(days=90, columns=None, category=None, archive_dir=None):
+    """
+    アーカイブを読み込む（日付・カテゴリのパーティションで絞り込み）
+
+    Args:
+        days: 直近何日分を読むか（Noneなら全期間）
+        columns: 読み込む列（Noneなら全列）
+        category: カテゴリで絞り込み
+
+    Returns:
+        pyarrow.Table
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow がインストールされていません（pip install pyarrow）")
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    archive_dir = archive_dir or os.getenv('ARCHIVE_DIR') or os.path.join(parent_dir, 'output', 'archive')
+    dataset = ds.dataset(archive_dir, format='parquet', partitioning='hive')
+
+    expr = None
+    if days is not None:
+        since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        expr = ds.field('date') >= since
+    if category:
+        cond = ds.field('category') == category
+        expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=columns, filter=expr)
+
+
+def average_by(metric, group_by, days=90, category=None, archive_dir=None):
+    """
+    指標をグループ別に平均（例: hook_type 別の dwell_potential 平均）
+
+    Returns:
+        list[dict]: [{group_by: 値, f'{metric}_mean': 平均, 'count': 件数}, ...]（平均の降順）
+    """
+    table = scan_archive(days=days, columns=[group_by, metric],
+                         category=category, archive_dir=archive_dir)
+    table = table.filter(pc.is_valid(table[metric]))
+    grouped = table.group_by(group_by).aggregate([(metric, 'mean'), (metric, 'count')])
+    rows = [
+        {group_by: r[group_by], f'{metric}_mean': r[f'{metric}_mean'], 'count': r[f'{metric}_count']}
+        for r in grouped.to_pylist()
+    ]
+    rows.sort(key=lambda r: r[f'{metric}_mean'] or 0, reverse=True)
+    return rows
+
+
+if __name__ == '__main__':
+    # 例: python archive.py dwell_potential hook_type 90
+    import sys
+    metric = sys.argv[1] if len(sys.argv) > 1 else 'dwell_potential'
+    group = sys.argv[2] if len(sys.argv) > 2 else 'hook_type'
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 90
+    for row in average_by(metric, group, days=days):
+        print(f"{row[group]}\t{row[f'{metric}_mean']:.2f}\t(n={row['count']})")
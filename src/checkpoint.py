@@ -0,0 +1,199 @@
+"""
+実行のチェックポイント（途中から再開するため）
+
+- output/runs/<run_id>/checkpoint.db（SQLite）にステージごとの出力を保存
+- キーは (ステージ名, ツイートID or アカウント名 or URL)
+- 再開時は保存済みの出力を使い、収集・分析・リライトをやり直さない
+  （Geminiのクォータ切れなどで落ちても、残りの分だけで完了できる）
+"""
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+
+# 実行IDはディレクトリ名になるので英数字・_・- のみ
+RUN_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def _default_runs_dir():
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv('RUNS_DIR') or os.path.join(parent_dir, 'output', 'runs')
+
+
+def run_dir_for(run_id, runs_dir=None):
+    """実行ごとのディレクトリ（output/runs/<run_id>）"""
+    if not RUN_ID_RE.match(run_id):
+        raise ValueError(f"Invalid run_id: {run_id}")
+    return os.path.join(runs_dir or _default_runs_dir(), run_id)
+
+
+def new_run_id():
+    """実行ID（日時＋ランダム）"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+class RunCheckpoint:
+    """
+    1回の実行のチェックポイント
+
+    使い方:
+        checkpoint = RunCheckpoint()                     # 新規
+        checkpoint = RunCheckpoint(run_id='20260101_...')  # 再開
+        analysis = checkpoint.get('analyze', tweet_id)
+        checkpoint.put('analyze', tweet_id, analysis)
+        checkpoint.mark_complete()
+    """
+    def __init__(self, run_id=None, runs_dir=None):
+        self.runs_dir = runs_dir or _default_runs_dir()
+        self.run_id = run_id or new_run_id()
+        self.run_dir = run_dir_for(self.run_id, self.runs_dir)
+        self.resumed = os.path.exists(os.path.join(self.run_dir, 'checkpoint.db'))
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.run_dir, 'checkpoint.db'))
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    stage TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (stage, key)
+                )
+            ''')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)'
+            )
+
+    @classmethod
+    def exists(cls, run_id, runs_dir=None):
+        """
+        実行のチェックポイントがあるか（ディレクトリ・DBは作らない）
+
+        Raises:
+            ValueError: run_id の形式が不正
+        """
+        return os.path.exists(os.path.join(run_dir_for(run_id, runs_dir), 'checkpoint.db'))
+
+    @classmethod
+    def prune(cls, max_age_days, runs_dir=None):
+        """
+        最終更新から max_age_days 日を過ぎた実行のディレクトリを削除
+
+        Returns:
+            int: 削除した実行の数
+        """
+        runs_dir = runs_dir or _default_runs_dir()
+        if not os.path.isdir(runs_dir):
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for run_id in os.listdir(runs_dir):
+            path = os.path.join(runs_dir, run_id)
+            if not RUN_ID_RE.match(run_id) or not os.path.isdir(path):
+                continue
+            try:
+                # checkpoint.db-wal など中のファイルの更新も見る
+                mtime = max([os.path.getmtime(path)] + [
+                    os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)
+                ])
+                if mtime < cutoff:
+                    shutil.rmtree(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    @classmethod
+    def latest_incomplete(cls, runs_dir=None):
+        """
+        未完了の最新の実行IDを探す
+
+        Returns:
+            str | None
+        """
+        runs_dir = runs_dir or _default_runs_dir()
+        if not os.path.isdir(runs_dir):
+            return None
+        for run_id in sorted(os.listdir(runs_dir), reverse=True):
+            path = os.path.join(runs_dir, run_id, 'checkpoint.db')
+            if not os.path.exists(path):
+                continue
+            conn = sqlite3.connect(path)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'completed_at'").fetchone()
+            except sqlite3.Error:
+                row = None
+            finally:
+                conn.close()
+            if row is None:
+                return run_id
+        return None
+
+    def get(self, stage, key):
+        """保存済みの出力（無ければ None）"""
+        row = self._conn.execute(
+            'SELECT payload FROM checkpoints WHERE stage = ? AND key = ?',
+            (stage, str(key))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, stage, key, value):
+        """ステージの出力を保存（コミットまで行う）"""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO checkpoints (stage, key, payload, created_at) '
+                'VALUES (?, ?, ?, ?)',
+                (stage, str(key), json.dumps(value, ensure_ascii=False, default=str), time.time())
+            )
+
+    def count(self, stage):
+        """ステージの保存件数"""
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM checkpoints WHERE stage = ?', (stage,)
+        ).fetchone()[0]
+
+    def set_meta(self, key, value):
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (key, json.dumps(value, ensure_ascii=False, default=str))
+            )
+
+    def set_meta_once(self, key, value):
+        """未設定のときだけ保存し、保存されている値を返す（別プロセスと同時でも最初の値が残る）"""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)',
+                (key, json.dumps(value, ensure_ascii=False, default=str))
+            )
+        return self.get_meta(key)
+
+    def get_meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_complete(self):
+        """実行の完了を記録（latest_incomplete の対象から外れる）"""
+        self.set_meta('completed_at', time.time())
+
+    def is_complete(self):
+        return self.get_meta('completed_at') is not None
+
+    def summary(self):
+        """ステージごとの保存件数: {stage: count}"""
+        return dict(self._conn.execute(
+            'SELECT stage, COUNT(*) FROM checkpoints GROUP BY stage'
+        ).fetchall())
+
+    def close(self):
+        self._conn.close()
+
+    def delete(self):
+        """チェックポイントを閉じて実行のディレクトリごと削除（完了して再開の必要がない場合）"""
+        self.close()
+        shutil.rmtree(self.run_dir, ignore_errors=True)
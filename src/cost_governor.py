@@ -0,0 +1,338 @@
+"""
+コスト・クォータの管理（X API / Gemini / 画像生成）
+
+- Gemini は応答の usage_metadata から実際のトークン数を数える
+  （thinking のトークンは出力として課金される）
+- X API は読み取ったツイート数とユーザー検索数を数える
+- 実行ごと・1日ごとの上限を超えそうなら、分析・リライト件数を減らすか途中で止める
+- allow() は見積もり額を予約し、呼び出しが終わったら release() で返す
+  （並列に呼んでも、予約の合計が残りの予算を超えないようにする）
+- 1日の累計は output/cost_ledger.json に記録する（ファイルロックで複数プロセスから安全に加算）。
+  同じプロセス内の他の実行（APIの同時リクエストなど）の未確定分も1日の残りから差し引く
+
+使い方:
+    governor = CostGovernor.from_settings(settings)
+    n_analyze, n_rewrite = governor.plan(10, 5)
+    if governor.allow('analyze'):
+        try:
+            analysis = await analyzer.analyze_tweet(tweet, on_usage=governor.record_usage)
+        finally:
+            governor.release('analyze')
+    governor.commit()
+    governor.summary()
+"""
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+from datetime import datetime
+from utils import load_json_file, save_json_file, log_info
+
+try:
+    import fcntl
+except ImportError:  # Windows: プロセス内のロックのみ
+    fcntl = None
+
+# USD / 100万トークン
+MODEL_PRICES = {
+    'gemini-2.5-flash': {'input': 0.30, 'output': 2.50},
+    # Nano Banana Pro（画像出力は1枚あたり約1120トークン）
+    'nano-banana-pro-preview': {'input': 2.00, 'output': 120.00},
+}
+DEFAULT_MODEL = 'gemini-2.5-flash'
+# X API (Pay-Per-Use)
+X_USER_LOOKUP_USD = 0.01
+X_TWEET_READ_USD = 0.005
+USD_TO_JPY = 150  # 概算レート
+# 長時間動くインスタンス（APIなど）が他プロセスの加算を取り込む間隔
+LEDGER_REFRESH_SEC = 10
+
+# 実測が無いうちの1回あたりの見積もり（入力, 出力トークン）
+DEFAULT_TOKEN_ESTIMATES = {
+    'analyze': (2000, 500),
+    'rewrite': (3000, 1000),
+    'image': (500, 1120),
+}
+KIND_MODELS = {
+    'analyze': DEFAULT_MODEL,
+    'rewrite': DEFAULT_MODEL,
+    'image': 'nano-banana-pro-preview',
+}
+
+
+def _default_ledger_path():
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.getenv('COST_LEDGER_PATH') or os.path.join(parent_dir, 'output', 'cost_ledger.json')
+
+
+def _env_float(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+class CostGovernor:
+    """1回の実行のコストを数え、上限を超えないように止める"""
+    # 同じプロセス内の複数の実行（APIのリクエストなど）が台帳を同時に書かないように
+    _ledger_lock = threading.Lock()
+    # 同じプロセス内で動いている実行（未確定のコストを1日の残りから差し引く）
+    _live = weakref.WeakSet()
+
+    def __init__(self, run_limit_usd=None, daily_limit_usd=None, ledger_path=None):
+        """
+        Args:
+            run_limit_usd: 1回の実行の上限（Noneなら無制限）
+            daily_limit_usd: 1日の上限（Noneなら無制限）
+            ledger_path: 1日の累計の記録先（既定: output/cost_ledger.json）
+        """
+        self.run_limit_usd = run_limit_usd
+        self.daily_limit_usd = daily_limit_usd
+        self.ledger_path = ledger_path or _default_ledger_path()
+        self.calls = Counter()          # kind → 呼び出し回数
+        self.input_tokens = Counter()   # kind → 入力トークン
+        self.output_tokens = Counter()  # kind → 出力トークン（thinking を含む）
+        self.costs = Counter()          # kind → USD
+        self.skipped = Counter()        # kind → 予算不足で実行しなかった数
+        self.x_user_lookups = 0
+        self.x_tweets_read = 0
+        self._reservations = defaultdict(list)  # kind → 予約額（USD）
+        self._committed_usd = 0.0
+        self._run_counted = False  # 台帳の runs に数えたか（commit は何度呼んでもよい）
+        self._today = datetime.now().strftime('%Y-%m-%d')
+        self._spent_today = 0.0
+        self._refreshed_at = 0.0
+        self._refresh_spent_today()
+        self._live.add(self)
+
+    @classmethod
+    def from_settings(cls, settings=None, run_limit_usd=None):
+        """
+        settings.json の budget と環境変数から生成
+
+        環境変数 COST_LIMIT_PER_RUN_USD / COST_LIMIT_PER_DAY_USD が優先。
+        run_limit_usd を渡すとさらに小さい方を使う（APIのリクエストごとの上限など）。
+        """
+        budget = (settings or {}).get('budget', {})
+        run_limit = _env_float('COST_LIMIT_PER_RUN_USD') or budget.get('per_run_usd')
+        daily_limit = _env_float('COST_LIMIT_PER_DAY_USD') or budget.get('per_day_usd')
+        if run_limit_usd is not None:
+            run_limit = min(run_limit, run_limit_usd) if run_limit else run_limit_usd
+        return cls(run_limit_usd=run_limit, daily_limit_usd=daily_limit)
+
+    def split(self, parts):
+        """
+        並列プロセス（シャード）1つ分の予算にする
+
+        1回の実行の上限と、1日の残りの両方を parts で等分した額を、このインスタンスの
+        実行の上限にする（1日の上限の確認は等分した時点で済んでいるので外す）。
+        """
+        limits = []
+        if self.run_limit_usd is not None:
+            limits.append(self.run_limit_usd / parts)
+        if self.daily_limit_usd is not None:
+            limits.append(max(0.0, self.daily_limit_usd - self._spent_today) / parts)
+        self.run_limit_usd = min(limits) if limits else None
+        self.daily_limit_usd = None
+        return self
+
+    # ─── 記録 ───
+
+    def record_usage(self, kind, usage_metadata, model=None):
+        """
+        Gemini の応答の usage_metadata を記録
+
+        Args:
+            kind: 'analyze' / 'rewrite' / 'image'
+            usage_metadata: response.usage_metadata（Noneなら見積もりで数える）
+            model: モデル名（料金表のキー）
+        """
+        if usage_metadata is None:
+            input_tokens, output_tokens = DEFAULT_TOKEN_ESTIMATES.get(kind, (0, 0))
+        else:
+            input_tokens = getattr(usage_metadata, 'prompt_token_count', 0) or 0
+            output_tokens = ((getattr(usage_metadata, 'candidates_token_count', 0) or 0)
+                             + (getattr(usage_metadata, 'thoughts_token_count', 0) or 0))
+        self.calls[kind] += 1
+        self.input_tokens[kind] += input_tokens
+        self.output_tokens[kind] += output_tokens
+        self.costs[kind] += self._token_cost(model or KIND_MODELS.get(kind, DEFAULT_MODEL),
+                                             input_tokens, output_tokens)
+
+    def record_x_reads(self, tweets_read, user_lookups=0):
+        """X API の読み取りを記録"""
+        self.x_user_lookups += user_lookups
+        self.x_tweets_read += tweets_read
+        self.costs['x_api'] += user_lookups * X_USER_LOOKUP_USD + tweets_read * X_TWEET_READ_USD
+
+    @staticmethod
+    def _token_cost(model, input_tokens, output_tokens):
+        prices = MODEL_PRICES.get(model, MODEL_PRICES[DEFAULT_MODEL])
+        return (input_tokens * prices['input'] + output_tokens * prices['output']) / 1_000_000
+
+    # ─── 予算 ───
+
+    @property
+    def run_cost_usd(self):
+        return sum(self.costs.values())
+
+    @property
+    def reserved_usd(self):
+        return sum(sum(amounts) for amounts in self._reservations.values())
+
+    def _uncommitted_usd(self):
+        """台帳にまだ加えていない額（実績＋予約）"""
+        return self.run_cost_usd - self._committed_usd + self.reserved_usd
+
+    def remaining_usd(self):
+        """実行・1日の上限までの残り（予約分を除く。上限なしなら None）"""
+        remaining = []
+        if self.run_limit_usd is not None:
+            remaining.append(self.run_limit_usd - self.run_cost_usd - self.reserved_usd)
+        if self.daily_limit_usd is not None:
+            self._refresh_spent_today()
+            in_flight = sum(g._uncommitted_usd() for g in list(self._live))
+            remaining.append(self.daily_limit_usd - self._spent_today - in_flight)
+        return max(0.0, min(remaining)) if remaining else None
+
+    def estimate(self, kind, count=1):
+        """
+        1回あたりの見積もり（USD）× count
+
+        この実行で実測があればその平均、無ければ DEFAULT_TOKEN_ESTIMATES。
+        kind が 'x_account' なら count はツイート数（ユーザー検索1回＋読み取り）。
+        """
+        if kind == 'x_account':
+            return X_USER_LOOKUP_USD + count * X_TWEET_READ_USD
+        if kind == 'x_tweet':
+            return count * X_TWEET_READ_USD
+        if self.calls[kind]:
+            return self.costs[kind] / self.calls[kind] * count
+        input_tokens, output_tokens = DEFAULT_TOKEN_ESTIMATES[kind]
+        return self._token_cost(KIND_MODELS[kind], input_tokens, output_tokens) * count
+
+    def allow(self, kind, count=1):
+        """
+        もう1回呼んでも上限を超えないか
+
+        呼べる場合は見積もり額を予約して True を返す。呼び出しが終わったら（失敗しても）
+        release(kind) で予約を返すこと。
+        超える場合は skipped に数えて False を返す（呼び出し側はそのアイテムを打ち切る）。
+        """
+        cost = self.estimate(kind, count)
+        with self._ledger_lock:
+            remaining = self.remaining_usd()
+            if remaining is None or cost <= remaining:
+                self._reservations[kind].append(cost)
+                return True
+        if not self.skipped[kind]:
+            log_info(f"Budget: {kind} を停止（残り ${remaining:.4f}）")
+        self.skipped[kind] += 1
+        return False
+
+    def release(self, kind):
+        """allow() の予約を1件返す（実際のコストは record_usage / record_x_reads で数え済み）"""
+        with self._ledger_lock:
+            if self._reservations[kind]:
+                self._reservations[kind].pop(0)
+
+    def plan(self, tweets_to_analyze, tweets_to_rewrite):
+        """
+        残りの予算に収まるように分析・リライト件数を減らす
+
+        上位のツイートを分析からリライトまで通せるように、件数を揃えて減らす。
+
+        Returns:
+            tuple: (tweets_to_analyze, tweets_to_rewrite)
+        """
+        remaining = self.remaining_usd()
+        if remaining is None:
+            return tweets_to_analyze, tweets_to_rewrite
+        cost_analyze = self.estimate('analyze')
+        cost_rewrite = self.estimate('rewrite')
+        n_analyze = tweets_to_analyze
+        while n_analyze > 0:
+            n_rewrite = min(tweets_to_rewrite, n_analyze)
+            if n_analyze * cost_analyze + n_rewrite * cost_rewrite <= remaining:
+                break
+            n_analyze -= 1
+        n_rewrite = min(tweets_to_rewrite, n_analyze)
+        if (n_analyze, n_rewrite) != (tweets_to_analyze, tweets_to_rewrite):
+            log_info(f"Budget: 残り ${remaining:.4f} に合わせて 分析 {tweets_to_analyze}→{n_analyze}件、"
+                     f"リライト {tweets_to_rewrite}→{n_rewrite}件")
+        return n_analyze, n_rewrite
+
+    # ─── 台帳・集計 ───
+
+    def _refresh_spent_today(self, force=False):
+        """台帳から本日の累計を読み直す（他のプロセスの加算を取り込む）"""
+        now = time.monotonic()
+        if not force and now - self._refreshed_at < LEDGER_REFRESH_SEC:
+            return
+        self._refreshed_at = now
+        self._spent_today = self._load_ledger().get(self._today, {}).get('usd', 0.0)
+
+    def _load_ledger(self):
+        if not os.path.exists(self.ledger_path):
+            return {}
+        try:
+            return load_json_file(self.ledger_path)
+        except (OSError, ValueError) as e:
+            log_info(f"Failed to load cost ledger: {e}")
+            return {}
+
+    def commit(self):
+        """
+        この実行のコスト（前回の commit 以降の分）を1日の累計に加える
+
+        シャードなど別プロセスも同じ台帳に加算するので、ファイルロックを取ってから
+        読み直し、プロセスごとの一時ファイルに書いて置き換える。
+        """
+        delta = self.run_cost_usd - self._committed_usd
+        os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+        with self._ledger_lock, open(f"{self.ledger_path}.lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            ledger = self._load_ledger()
+            today = ledger.setdefault(self._today, {'usd': 0.0, 'runs': 0})
+            today['usd'] = round(today['usd'] + delta, 6)
+            if not self._run_counted:
+                today['runs'] += 1
+                self._run_counted = True
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.ledger_path),
+                                            prefix='.cost_ledger.', suffix='.tmp')
+            os.close(fd)
+            try:
+                save_json_file(tmp_path, ledger)
+                os.replace(tmp_path, self.ledger_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._spent_today = today['usd']
+            self._refreshed_at = time.monotonic()
+            self._committed_usd = self.run_cost_usd
+
+    def summary(self):
+        """コストの内訳（API の summary.cost 用）"""
+        gemini_cost = self.costs['analyze'] + self.costs['rewrite']
+        total = self.run_cost_usd
+        return {
+            'x_api_user_lookups': self.x_user_lookups,
+            'x_api_tweets_read': self.x_tweets_read,
+            'x_api_cost_usd': round(self.costs['x_api'], 4),
+            'gemini_analysis_calls': self.calls['analyze'],
+            'gemini_rewrite_calls': self.calls['rewrite'],
+            'gemini_input_tokens': self.input_tokens['analyze'] + self.input_tokens['rewrite'],
+            'gemini_output_tokens': self.output_tokens['analyze'] + self.output_tokens['rewrite'],
+            'gemini_cost_usd': round(gemini_cost, 4),
+            'image_model_calls': self.calls['image'],
+            'image_cost_usd': round(self.costs['image'], 4),
+            # まだ終わっていない呼び出し（バックグラウンドの画像ジョブなど）の見積もり
+            'reserved_usd': round(self.reserved_usd, 4),
+            'estimated_cost_usd': round(total, 4),
+            'estimated_cost_jpy': round(total * USD_TO_JPY, 2),
+            'run_limit_usd': self.run_limit_usd,
+            'daily_limit_usd': self.daily_limit_usd,
+            'daily_spent_usd': round(self._spent_today + total - self._committed_usd, 4),
+            'skipped_for_budget': dict(self.skipped),
+        }
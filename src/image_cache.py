@@ -0,0 +1,157 @@
+"""
+生成画像の配信用ヘルパー
+
+- ファイル名の検証（パストラバーサル防止）
+- ETag / Last-Modified の生成と条件付きGET（304）の判定
+- Range ヘッダー（単一範囲）の解釈
+- よく読まれる小さい画像をメモリに保持するLRU
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+# 生成画像のファイル名（英数字・_・- と画像拡張子のみ）
+IMAGE_FILENAME_RE = re.compile(r'^[A-Za-z0-9_-]{1,128}\.(png|jpg|jpeg|webp)$')
+
+MEDIA_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+# 画像はコンテンツハッシュ／一意なファイル名なので内容が変わらない
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def media_type_for(filename):
+    """拡張子からContent-Typeを決める"""
+    return MEDIA_TYPES.get(filename.rsplit('.', 1)[-1].lower(), 'application/octet-stream')
+
+
+def make_etag(stat):
+    """サイズと更新時刻からETagを作る"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def make_last_modified(stat):
+    return formatdate(stat.st_mtime, usegmt=True)
+
+
+def is_not_modified(headers, etag, mtime):
+    """
+    条件付きGETで 304 を返してよいか
+
+    If-None-Match があればそれだけで判定し、無ければ If-Modified-Since を見る。
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(',')]
+        return '*' in tags or any(t.removeprefix('W/') == etag for t in tags)
+
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(range_header, size):
+    """
+    Range ヘッダー（bytes=start-end の単一範囲）を解釈
+
+    Returns:
+        tuple | None: (start, end)（endを含む）。ヘッダーが無い・複数範囲なら None
+    Raises:
+        ValueError: 満たせない範囲（416 を返す）
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+    spec = range_header[len('bytes='):].strip()
+    if ',' in spec:
+        # 複数範囲は未対応 → 全体を返す
+        return None
+    start_str, sep, end_str = spec.partition('-')
+    if not sep:
+        raise ValueError(f"Invalid range: {range_header}")
+    if start_str == '':
+        # 末尾から N バイト
+        length = int(end_str)
+        if length <= 0:
+            raise ValueError(f"Invalid range: {range_header}")
+        return max(size - length, 0), size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"Unsatisfiable range: {range_header}")
+    return start, min(end, size - 1)
+
+
+class ImageBytesCache:
+    """
+    画像バイト列のLRU（合計バイト数で上限）
+
+    キーにファイルの更新時刻とサイズを含めるので、差し替えられたファイルは読み直す。
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_bytes=2 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def read(self, path, stat):
+        """
+        ファイルを読む（キャッシュにあればメモリから返す）
+
+        Returns:
+            bytes | None: キャッシュ対象外（大きすぎる）なら None
+        """
+        if stat.st_size > self.max_file_bytes:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._total += len(data)
+                while self._total > self.max_bytes and self._entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total -= len(evicted)
+        return data
+
+    @staticmethod
+    def read_range(path, start, end):
+        """ファイルの一部を読む（キャッシュ対象外の大きいファイル用）"""
+        with open(path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+
+def stat_image(images_dir, filename):
+    """
+    画像ファイルのパスと stat を返す
+
+    Returns:
+        tuple | None: (path, os.stat_result)。不正なファイル名・存在しなければ None
+    """
+    if not IMAGE_FILENAME_RE.match(filename):
+        return None
+    path = os.path.join(images_dir, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat
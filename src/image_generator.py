@@ -9,12 +9,83 @@ Nano Banana Pro 画像生成エンジン
 技術:
 - Google Nano Banana Pro (google-genai パッケージ)
 - Google Cloud Storage に保存 → 公開URLをスプシに納品
+- プロンプト＋モデル名のハッシュでファイル名を決め、同じ内容は再生成しない
+- Pillow で軽量なWebP（またはJPEG）とサムネイルに変換してから保存
+
+ティア:
+- model:    Nano Banana Pro で生成（リッチな画像）
+- template: ローカルの Pillow レンダラーで固定レイアウトに描画（API呼び出しなし・数十ms）
 """
 import asyncio
+import glob
+import hashlib
+import io
+import json
 import os
-import uuid
-from datetime import datetime
-from utils import is_mock_mode, log_info, log_success
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from infographic_renderer import RENDERER_VERSION, find_font_path, render_infographic
+from resilience import resilient_call
+from utils import is_mock_mode, log_error, log_info, log_success
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# 出力形式ごとの (拡張子, Content-Type)
+OUTPUT_FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+}
+THUMBNAIL_SUFFIX = "_thumb.webp"
+# 最適化に失敗して元画像のまま保存した場合の接尾辞（サムネイルは無い）
+ORIGINAL_SUFFIX = "_orig"
+TIERS = ('model', 'template')
+# サムネイルを一緒に書き出した画像（最適化済みの WebP / JPEG）
+_HASHED_IMAGE_RE = re.compile(r'([0-9a-f]{32})\.(webp|jpg)$')
+
+
+def optimize_image(image_data, output_format='webp', max_width=1600, quality=82, thumb_width=400):
+    """
+    生成画像を配信用に最適化（プロセスプールで実行するためモジュール関数）
+
+    Returns:
+        tuple: (最適化した本画像のbytes, サムネイル(WebP)のbytes)
+    """
+    with Image.open(io.BytesIO(image_data)) as img:
+        img = img.convert('RGB')
+        if img.width > max_width:
+            img.thumbnail((max_width, max_width), Image.LANCZOS)
+
+        full = io.BytesIO()
+        if output_format == 'jpeg':
+            img.save(full, format='JPEG', quality=quality, optimize=True, progressive=True)
+        else:
+            img.save(full, format='WEBP', quality=quality, method=4)
+
+        thumb_img = img.copy()
+        thumb_img.thumbnail((thumb_width, thumb_width), Image.LANCZOS)
+        thumb = io.BytesIO()
+        thumb_img.save(thumb, format='WEBP', quality=75, method=4)
+
+    return full.getvalue(), thumb.getvalue()
+
+
+def thumbnail_url_for(image_url):
+    """
+    画像URLに対応するサムネイルURL
+
+    サムネイルを書き出した画像（ハッシュ名の WebP / JPEG）のみ。元画像のまま保存した画像
+    （{hash}_orig.png など）やそれ以外のURLは、元のURLをそのまま返す。
+    """
+    if not image_url:
+        return ''
+    match = _HASHED_IMAGE_RE.search(image_url)
+    if not match:
+        return image_url
+    return image_url[:match.start()] + match.group(1) + THUMBNAIL_SUFFIX
 
 
 class InfographicGenerator:
@@ -22,12 +93,29 @@ class InfographicGenerator:
     Nano Banana Pro でインフォグラフィック画像を生成し、Cloud Storageにアップロード
     """
     def __init__(self, project_id=None, location=None, credentials_path=None,
-                 gemini_api_key=None, model_version=None, bucket_name=None):
+                 gemini_api_key=None, model_version=None, bucket_name=None,
+                 io_workers=None, tier=None, font_path=None):
         self.gemini_api_key = gemini_api_key
         self._client = None
         self._storage_client = None
+        self._bucket = None
         self._model_name = "nano-banana-pro-preview"
         self._bucket_name = bucket_name or os.getenv("GCS_IMAGE_BUCKET", "x-viral-tweet-images")
+        # コンテンツハッシュ → URL のプロセス内キャッシュ
+        self._url_cache = {}
+        # GCSアップロード・ローカル保存用のスレッドプール（イベントループを止めない）
+        io_workers = io_workers or int(os.getenv("IMAGE_IO_WORKERS", "4"))
+        self._io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="image-io")
+        # 画像変換（CPU処理）用のプロセスプール（初回利用時に生成）
+        self._process_executor = None
+        self._process_workers = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+        self._output_format = os.getenv("IMAGE_OUTPUT_FORMAT", "webp").lower()
+        if self._output_format not in OUTPUT_FORMATS:
+            self._output_format = 'webp'
+        # 既定のティア（generate_infographic の tier 未指定時）
+        self.tier = tier or os.getenv("INFOGRAPHIC_TIER", "template")
+        self._font_path = font_path
+        self._warned = set()
 
         # ローカル保存先（フォールバック用）
         parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -52,27 +140,83 @@ class InfographicGenerator:
         try:
             from google.cloud import storage
             self._storage_client = storage.Client()
+            self._bucket = self._storage_client.bucket(self._bucket_name)
             log_success(f"Cloud Storage initialized (bucket: {self._bucket_name})")
         except Exception as e:
             log_info(f"Cloud Storage init failed (will save locally): {e}")
             self._storage_client = None
+            self._bucket = None
+
+    async def _run_io(self, func, *args):
+        """同期I/Oをスレッドプールで実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, func, *args)
+
+    def close(self):
+        """スレッドプール・プロセスプールを停止"""
+        self._io_executor.shutdown(wait=True)
+        if self._process_executor:
+            self._process_executor.shutdown(wait=True)
+            self._process_executor = None
+
+    def _get_process_executor(self):
+        if self._process_executor is None:
+            self._process_executor = ProcessPoolExecutor(max_workers=self._process_workers)
+        return self._process_executor
+
+    async def _postprocess(self, image_data, mime_type):
+        """
+        最適化した本画像とサムネイルを作る（Pillowが無い・失敗した場合は元画像のみ）
 
-    def _upload_to_gcs(self, image_data, filename, content_type="image/jpeg"):
-        """Cloud Storageに画像をアップロードして公開URLを返す"""
-        if not self._storage_client:
-            return None
-        try:
-            bucket = self._storage_client.bucket(self._bucket_name)
-            blob = bucket.blob(filename)
-            blob.upload_from_string(image_data, content_type=content_type)
-            public_url = f"https://storage.googleapis.com/{self._bucket_name}/{filename}"
-            log_success(f"Uploaded to GCS: {public_url}")
-            return public_url
-        except Exception as e:
-            log_info(f"GCS upload failed: {e}")
-            return None
+        Returns:
+            tuple: (本画像bytes, 拡張子, Content-Type, サムネイルbytes or None)
+        """
+        if PIL_AVAILABLE:
+            try:
+                loop = asyncio.get_running_loop()
+                full, thumb = await loop.run_in_executor(
+                    self._get_process_executor(), optimize_image, image_data, self._output_format
+                )
+                ext, content_type = OUTPUT_FORMATS[self._output_format]
+                log_info(f"Image optimized: {len(image_data)} → {len(full)} bytes (thumb {len(thumb)} bytes)")
+                return full, ext, content_type, thumb
+            except Exception as e:
+                log_info(f"Image optimization failed (using original): {e}")
+        ext = "jpg" if "jpeg" in mime_type else "png"
+        return image_data, ext, mime_type, None
+
+    async def _store_image(self, image_data, filename, content_type):
+        """
+        画像を保存して公開URLを返す（Cloud Storage → ローカルの順に試行）
+
+        Returns:
+            str: 公開URLまたはローカルURL
+        """
+        if self._bucket:
+            try:
+                return await resilient_call('gcs', self._run_io, self._upload_to_gcs,
+                                            image_data, filename, content_type)
+            except Exception as e:
+                log_info(f"GCS upload failed: {e}")
+        # フォールバック: ローカル保存
+        await self._run_io(self._save_local, image_data, filename)
+        return f"/api/images/{filename}"
+
+    def _save_local(self, image_data, filename):
+        """output/images に書き込む"""
+        filepath = os.path.join(self.images_dir, filename)
+        with open(filepath, 'wb') as f:
+            f.write(image_data)
 
-    async def generate_infographic(self, rewritten_tweet):
+    def _upload_to_gcs(self, image_data, filename, content_type="image/jpeg"):
+        """Cloud Storageに画像をアップロードして公開URLを返す（失敗時は例外）"""
+        blob = self._bucket.blob(filename)
+        blob.upload_from_string(image_data, content_type=content_type)
+        public_url = f"https://storage.googleapis.com/{self._bucket_name}/{filename}"
+        log_success(f"Uploaded to GCS: {public_url}")
+        return public_url
+
+    async def generate_infographic(self, rewritten_tweet, tier=None, on_usage=None):
         """
         リライトしたツイート内容を図解化
 
@@ -82,6 +226,8 @@ class InfographicGenerator:
                 'thread': list[str],
                 'call_to_action': str
             }
+            tier: 'model'（Nano Banana Pro）or 'template'（ローカル描画）。Noneなら既定のティア
+            on_usage: モデルを呼んだときに on_usage('image', usage_metadata, model) を呼ぶ（コスト集計用）
 
         Returns:
             str: 画像の公開URL（Cloud Storage）またはローカルURL
@@ -90,19 +236,83 @@ class InfographicGenerator:
             log_info("MODE=mock: 画像生成をスキップ")
             return ""
 
+        if self.resolve_tier(tier) == 'template':
+            return await self._generate_from_template(rewritten_tweet)
+        return await self._generate_with_model(rewritten_tweet, on_usage)
+
+    def resolve_tier(self, tier=None):
+        """
+        実際に使うティア
+
+        template は Pillow と日本語フォントがある場合だけ使い、無ければ model にする
+        （既定フォントで描くと日本語が豆腐になるため）。
+        """
+        tier = tier or self.tier
+        if tier not in TIERS:
+            log_info(f"Unknown image tier '{tier}'. Using model")
+            return 'model'
+        if tier == 'template':
+            if not PIL_AVAILABLE:
+                self._warn_once("Pillow not installed. Falling back to Nano Banana Pro")
+                return 'model'
+            if not find_font_path(self._font_path):
+                self._warn_once("日本語フォントが見つかりません（fonts-noto-cjk をインストールするか "
+                                "INFOGRAPHIC_FONT_PATH を設定してください）。Nano Banana Pro で生成します")
+                return 'model'
+        return tier
+
+    def _warn_once(self, message):
+        if message not in self._warned:
+            self._warned.add(message)
+            log_error(message)
+
+    async def _generate_from_template(self, rewritten_tweet):
+        """ローカルの Pillow レンダラーで図解を描画"""
+        content = json.dumps({
+            'main_text': rewritten_tweet.get('main_text', ''),
+            'thread': list(rewritten_tweet.get('thread') or [])[:2],
+            'call_to_action': rewritten_tweet.get('call_to_action', ''),
+        }, ensure_ascii=False, sort_keys=True)
+        cache_key = self._cache_key(content, model_name=RENDERER_VERSION)
+
+        cached_url = await self._run_io(self._find_cached_image, cache_key)
+        if cached_url:
+            log_success(f"Image cache hit: {cached_url}")
+            return cached_url
+
+        try:
+            loop = asyncio.get_running_loop()
+            image_data = await loop.run_in_executor(
+                self._get_process_executor(), render_infographic, rewritten_tweet, self._font_path
+            )
+            return await self._save_generated(cache_key, image_data, "image/png")
+        except Exception as e:
+            log_info(f"Template rendering failed: {e}")
+            return ""
+
+    async def _generate_with_model(self, rewritten_tweet, on_usage=None):
+        """Nano Banana Pro で画像を生成"""
+        # 1. ツイート内容から画像生成プロンプトを構築
+        prompt = self._build_image_prompt(rewritten_tweet)
+        cache_key = self._cache_key(prompt)
+
+        # 同じプロンプト＋モデルで生成済みなら既存のURLを返す
+        cached_url = await self._run_io(self._find_cached_image, cache_key)
+        if cached_url:
+            log_success(f"Image cache hit: {cached_url}")
+            return cached_url
+
         if not self._client:
             log_info("Nano Banana Pro not available, skipping image generation")
             return ""
 
         try:
-            # 1. ツイート内容から画像生成プロンプトを構築
-            prompt = self._build_image_prompt(rewritten_tweet)
-
             # 2. Nano Banana Pro で画像生成
             log_info("Generating image with Nano Banana Pro...")
             from google.genai import types
 
-            response = await asyncio.to_thread(
+            response = await resilient_call(
+                'image_model',
                 self._client.models.generate_content,
                 model=self._model_name,
                 contents=prompt,
@@ -110,6 +320,8 @@ class InfographicGenerator:
                     response_modalities=["IMAGE", "TEXT"],
                 )
             )
+            if on_usage:
+                on_usage('image', getattr(response, 'usage_metadata', None), self._model_name)
 
             # 3. レスポンスから画像を取得
             if response and response.candidates:
@@ -117,26 +329,7 @@ class InfographicGenerator:
                     if hasattr(part, 'inline_data') and part.inline_data and part.inline_data.data:
                         image_data = part.inline_data.data
                         mime_type = part.inline_data.mime_type or "image/jpeg"
-
-                        # ファイル名生成
-                        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                        unique_id = str(uuid.uuid4())[:8]
-                        ext = "jpg" if "jpeg" in mime_type else "png"
-                        filename = f"{timestamp}_{unique_id}.{ext}"
-
-                        # Cloud Storageにアップロード試行
-                        public_url = self._upload_to_gcs(image_data, filename, mime_type)
-                        if public_url:
-                            log_success(f"Image generated & uploaded: {public_url} ({len(image_data)} bytes)")
-                            return public_url
-
-                        # フォールバック: ローカル保存
-                        filepath = os.path.join(self.images_dir, filename)
-                        with open(filepath, 'wb') as f:
-                            f.write(image_data)
-                        local_url = f"/api/images/{filename}"
-                        log_success(f"Image generated (local): {local_url} ({len(image_data)} bytes)")
-                        return local_url
+                        return await self._save_generated(cache_key, image_data, mime_type)
 
             log_info("No image in Nano Banana Pro response")
             return ""
@@ -145,6 +338,71 @@ class InfographicGenerator:
             log_info(f"Image generation failed: {e}")
             return ""
 
+    async def _save_generated(self, cache_key, image_data, mime_type):
+        """
+        生成した画像を最適化して保存し、URLを返す
+
+        Returns:
+            str: 画像の公開URLまたはローカルURL
+        """
+        # 配信用に最適化（WebP/JPEG + サムネイル）
+        data, ext, content_type, thumb = await self._postprocess(image_data, mime_type)
+
+        # ファイル名はコンテンツハッシュ（同じ内容なら同じ名前）。
+        # サムネイルが無い場合は名前で区別し、thumbnail_url_for が元画像のURLを返すようにする
+        filename = f"{cache_key}.{ext}" if thumb else f"{cache_key}{ORIGINAL_SUFFIX}.{ext}"
+        if thumb:
+            image_url, thumb_url = await asyncio.gather(
+                self._store_image(data, filename, content_type),
+                self._store_image(thumb, f"{cache_key}{THUMBNAIL_SUFFIX}", "image/webp"),
+            )
+            if thumb_url != thumbnail_url_for(image_url):
+                # サムネイルだけ別の保存先（GCS失敗→ローカル）になった場合は、サムネイル無しとして保存し直す
+                image_url = await self._store_image(
+                    data, f"{cache_key}{ORIGINAL_SUFFIX}.{ext}", content_type
+                )
+        else:
+            image_url = await self._store_image(data, filename, content_type)
+        self._url_cache[cache_key] = image_url
+        log_success(f"Image generated: {image_url} ({len(data)} bytes)")
+        return image_url
+
+    def _cache_key(self, prompt, model_name=None):
+        """画像キャッシュのキー（プロンプト＋モデル名のSHA-256）"""
+        model_name = model_name or self._model_name
+        digest = hashlib.sha256(f"{model_name}\n{prompt}".encode('utf-8')).hexdigest()
+        return digest[:32]
+
+    def _find_cached_image(self, cache_key):
+        """
+        生成済み画像を探す（メモリ → ローカル → Cloud Storage の順）
+
+        Returns:
+            str | None: 既存画像のURL
+        """
+        if cache_key in self._url_cache:
+            return self._url_cache[cache_key]
+
+        url = None
+        prefixes = (f"{cache_key}.", f"{cache_key}{ORIGINAL_SUFFIX}.")
+        local_hits = [path for prefix in prefixes
+                      for path in glob.glob(os.path.join(self.images_dir, f"{prefix}*"))]
+        if local_hits:
+            url = f"/api/images/{os.path.basename(local_hits[0])}"
+        elif self._bucket:
+            try:
+                for prefix in prefixes:
+                    blobs = list(self._bucket.list_blobs(prefix=prefix, max_results=1))
+                    if blobs:
+                        url = f"https://storage.googleapis.com/{self._bucket_name}/{blobs[0].name}"
+                        break
+            except Exception as e:
+                log_info(f"GCS cache lookup failed: {e}")
+
+        if url:
+            self._url_cache[cache_key] = url
+        return url
+
     def _build_image_prompt(self, rewritten_tweet):
         """ツイート内容からXバズ特化の画像プロンプトを構築"""
         main_text = rewritten_tweet.get('main_text', '')
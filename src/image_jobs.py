@@ -0,0 +1,183 @@
+"""
+画像生成ジョブキュー
+
+- 画像生成リクエストをキューに積み、決まった数のワーカーで並列処理
+- 並列数は画像モデルのクォータに合わせて IMAGE_CONCURRENCY で調整
+- ジョブの状態（pending / running / done / failed）を job_id で参照できる
+- governor（CostGovernor）を渡すと、モデルで生成するジョブは登録時に予算を予約し、
+  ワーカーが実際の使用量を数えて1日の累計に加える
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from utils import log_info
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ImageJob:
+    """画像生成ジョブ1件"""
+    def __init__(self, rewritten, job_id=None, meta=None, on_done=None, tier=None, governor=None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.rewritten = rewritten
+        self.tier = tier
+        self.governor = governor
+        self.reserved = False  # governor に 'image' の予算を予約済みか
+        self.meta = meta or {}
+        self.on_done = on_done
+        self.status = PENDING
+        self.image_url = ''
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = asyncio.get_running_loop().create_future()
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'image_url': self.image_url,
+            'error': self.error,
+            **self.meta,
+        }
+
+
+class ImageJobQueue:
+    """
+    画像生成のワーカープール
+
+    使い方:
+        queue = ImageJobQueue(image_gen, concurrency=4)
+        queue.start()
+        job = await queue.submit(rewritten, meta={'row_id': 5})
+        image_url = await job.future
+        await queue.stop()
+    """
+    def __init__(self, image_gen, concurrency=None, max_history=1000):
+        """
+        Args:
+            image_gen: InfographicGenerator
+            concurrency: 同時に生成する数（Noneなら IMAGE_CONCURRENCY、既定4）
+            max_history: 状態を保持する完了済みジョブの上限
+        """
+        self.image_gen = image_gen
+        self.concurrency = concurrency or int(os.getenv('IMAGE_CONCURRENCY', 4))
+        self.max_history = max_history
+        self._queue = None
+        self._workers = []
+        self._jobs = OrderedDict()
+
+    def start(self):
+        """ワーカーを起動（イベントループ内で呼ぶ。起動済みなら何もしない）"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """ワーカーを停止（未処理のジョブは失敗扱い）"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while self._queue and not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._finish(job, '', 'cancelled')
+            await self._settle(job)
+
+    async def submit(self, rewritten, job_id=None, meta=None, on_done=None, tier=None, governor=None):
+        """
+        ジョブを登録
+
+        Args:
+            rewritten: {'main_text', 'thread', 'call_to_action'}
+            meta: to_dict() に含める付加情報（行番号など）
+            on_done: 完了時に呼ぶコルーチン関数 on_done(job)
+            tier: 'model' / 'template'（Noneなら生成エンジンの既定）
+            governor: CostGovernor（モデルで生成する場合は予算を予約し、使用量を数える）。
+                予算が足りなければキューに積まず、失敗したジョブを返す
+
+        Returns:
+            ImageJob
+        """
+        self.start()
+        job = ImageJob(rewritten, job_id=job_id, meta=meta, on_done=on_done, tier=tier, governor=governor)
+        self._jobs[job.job_id] = job
+        self._trim_history()
+        if governor and self.image_gen.resolve_tier(tier) == 'model':
+            if not governor.allow('image'):
+                self._finish(job, '', '予算の上限に達したため画像を生成しませんでした')
+                return job
+            job.reserved = True
+        await self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        """job_id からジョブを取得"""
+        return self._jobs.get(job_id)
+
+    def pending_count(self):
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                job.status = RUNNING
+                on_usage = job.governor.record_usage if job.governor else None
+                try:
+                    image_url = await self.image_gen.generate_infographic(
+                        job.rewritten, tier=job.tier, on_usage=on_usage
+                    )
+                    self._finish(job, image_url, None if image_url else '画像生成に失敗しました')
+                except Exception as e:
+                    log_info(f"Image job {job.job_id} failed: {e}")
+                    self._finish(job, '', str(e))
+                finally:
+                    await self._settle(job)
+                if job.on_done:
+                    try:
+                        await job.on_done(job)
+                    except Exception as e:
+                        log_info(f"Image job {job.job_id} callback failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _settle(self, job):
+        """予約を返し、実際の使用量を1日の累計に加える"""
+        if not job.governor:
+            return
+        if job.reserved:
+            job.governor.release('image')
+            job.reserved = False
+        try:
+            await asyncio.to_thread(job.governor.commit)
+        except Exception as e:
+            log_info(f"Image job {job.job_id}: failed to record cost: {e}")
+
+    def _finish(self, job, image_url, error):
+        job.image_url = image_url or ''
+        job.error = error
+        job.status = DONE if image_url else FAILED
+        job.finished_at = time.time()
+        if not job.future.done():
+            job.future.set_result(job.image_url)
+
+    def _trim_history(self):
+        """完了済みジョブの古いものから捨てる（未完了のものは残す）"""
+        excess = len(self._jobs) - self.max_history
+        if excess <= 0:
+            return
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status in (DONE, FAILED):
+                del self._jobs[job_id]
+                excess -= 1
@@ -0,0 +1,215 @@
+"""
+ローカル図解レンダラー（Pillow）
+
+画像モデルを呼ばずに、リライト結果を固定のダークテーマに流し込んで図解を作る。
+「〇〇選」・ランキング・ロードマップのような箇条書き構造のツイート向けの高速ティア。
+
+レイアウト（_build_image_prompt の指示と同じ方針）:
+- 16:9 / ダーク背景（#0a0a0a → #1a1a2e）にネオンのアクセント
+- 左上に見出し、本文のポイントを箇条書き
+- 数字はアクセントカラーで大きく強調
+
+日本語フォントは INFOGRAPHIC_FONT_PATH、無ければ Noto Sans CJK 等の既定パスを探す。
+見つからない場合は描画しない（既定フォントでは日本語が豆腐になるため）。
+Debian/Ubuntu では fonts-noto-cjk をインストールする。
+"""
+import io
+import os
+import re
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# レイアウトを変えたら上げる（画像キャッシュのキーに含める）
+RENDERER_VERSION = 'template-v1'
+
+WIDTH, HEIGHT = 1600, 900
+MARGIN = 96
+BG_TOP = (10, 10, 10)
+BG_BOTTOM = (26, 26, 46)
+TEXT_COLOR = (240, 240, 245)
+SUB_TEXT_COLOR = (160, 164, 180)
+ACCENT_COLOR = (0, 229, 255)
+NUMBER_COLOR = (255, 46, 136)
+
+MAX_BULLETS = 6
+HEADLINE_MAX_CHARS = 28
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/truetype/noto/NotoSansCJK-Bold.ttc',
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:/Windows/Fonts/meiryob.ttc',
+]
+
+# 箇条書きの行頭記号（①〜⑩、1. 1) １． ・ - • ■ ▶ ✅ など）
+_BULLET_PREFIX_RE = re.compile(
+    r'^\s*(?:[①-⑩]|[0-9０-９]+[.)．）、]|[・\-•■□▶▷→✅✔︎◆◇●○★☆]|[0-9０-９]+位)\s*'
+)
+# 強調する数字（単位つき）
+_NUMBER_RE = re.compile(r'[0-9０-９][0-9０-９,，.．]*(?:[%％]|万|億|円|位|選|倍|件|個|日|年|ヶ月|か月|時間|分|秒|人|回|歳)?')
+
+
+def find_font_path(font_path=None):
+    """使用する日本語フォントのパス（見つからなければ None）"""
+    for path in [font_path, os.getenv('INFOGRAPHIC_FONT_PATH'), *FONT_CANDIDATES]:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def _load_font(font_path, size):
+    return ImageFont.truetype(font_path, size)
+
+
+def extract_layout(rewritten):
+    """
+    リライト結果から見出しと箇条書きを取り出す
+
+    Returns:
+        tuple: (headline, bullets, footer)
+    """
+    main_text = (rewritten.get('main_text') or '').strip()
+    lines = [line.strip() for line in main_text.splitlines() if line.strip()]
+    for extra in (rewritten.get('thread') or [])[:2]:
+        lines += [line.strip() for line in str(extra).splitlines() if line.strip()]
+
+    headline = lines[0] if lines else ''
+    if len(headline) > HEADLINE_MAX_CHARS:
+        headline = headline[:HEADLINE_MAX_CHARS - 1] + '…'
+
+    body = lines[1:]
+    marked = [_BULLET_PREFIX_RE.sub('', line) for line in body if _BULLET_PREFIX_RE.match(line)]
+    # 箇条書き記号のある行を優先し、無ければ本文の行をそのまま使う
+    bullets = [b for b in (marked or body) if b][:MAX_BULLETS]
+    footer = (rewritten.get('call_to_action') or '').strip()
+    return headline, bullets, footer
+
+
+def _split_numbers(text):
+    """テキストを [(文字列, 数字か), ...] に分割"""
+    segments = []
+    pos = 0
+    for match in _NUMBER_RE.finditer(text):
+        if match.start() > pos:
+            segments.append((text[pos:match.start()], False))
+        segments.append((match.group(), True))
+        pos = match.end()
+    if pos < len(text):
+        segments.append((text[pos:], False))
+    return segments
+
+
+def _wrap(draw, text, font, max_width, max_lines):
+    """1文字ずつ幅を測って折り返す（日本語は単語区切りがないため）"""
+    lines = []
+    current = ''
+    for ch in text:
+        if draw.textlength(current + ch, font=font) <= max_width:
+            current += ch
+            continue
+        lines.append(current)
+        current = ch
+        if len(lines) == max_lines:
+            break
+    if current and len(lines) < max_lines:
+        lines.append(current)
+    if len(lines) == max_lines and ''.join(lines) != text:
+        lines[-1] = lines[-1][:-1] + '…'
+    return lines
+
+
+def _draw_highlighted(draw, xy, text, font, number_font, color, y_offset=0):
+    """数字だけ色とサイズを変えて1行描画"""
+    x, y = xy
+    for segment, is_number in _split_numbers(text):
+        seg_font = number_font if is_number else font
+        seg_color = NUMBER_COLOR if is_number else color
+        # 大きい数字とベースラインを揃える
+        dy = y_offset if not is_number else 0
+        draw.text((x, y + dy), segment, font=seg_font, fill=seg_color)
+        x += draw.textlength(segment, font=seg_font)
+
+
+def _background():
+    """上から下へのグラデーション背景"""
+    gradient = Image.new('RGB', (1, HEIGHT))
+    for y in range(HEIGHT):
+        t = y / (HEIGHT - 1)
+        gradient.putpixel((0, y), tuple(
+            int(BG_TOP[i] + (BG_BOTTOM[i] - BG_TOP[i]) * t) for i in range(3)
+        ))
+    return gradient.resize((WIDTH, HEIGHT))
+
+
+def render_infographic(rewritten, font_path=None):
+    """
+    リライト結果から図解画像（PNG）を描画
+
+    プロセスプールから呼べるようにモジュール関数にしている。
+
+    Args:
+        rewritten: {'main_text', 'thread', 'call_to_action'}
+        font_path: 日本語フォントのパス（Noneなら自動検出）
+
+    Returns:
+        bytes: PNG画像
+
+    Raises:
+        RuntimeError: 日本語フォントが見つからない
+    """
+    font_path = find_font_path(font_path)
+    if not font_path:
+        raise RuntimeError("日本語フォントが見つかりません（fonts-noto-cjk をインストールするか "
+                           "INFOGRAPHIC_FONT_PATH を設定してください）")
+    headline, bullets, footer = extract_layout(rewritten)
+
+    img = _background()
+    draw = ImageDraw.Draw(img)
+
+    headline_font = _load_font(font_path, 72)
+    headline_number_font = _load_font(font_path, 84)
+    bullet_font = _load_font(font_path, 42)
+    bullet_number_font = _load_font(font_path, 52)
+    footer_font = _load_font(font_path, 32)
+
+    # 見出し（アクセントのバー付き）
+    y = MARGIN
+    draw.rectangle([MARGIN, y + 8, MARGIN + 12, y + 92], fill=ACCENT_COLOR)
+    for line in _wrap(draw, headline, headline_font, WIDTH - MARGIN * 2 - 40, 2):
+        _draw_highlighted(draw, (MARGIN + 40, y), line, headline_font,
+                          headline_number_font, TEXT_COLOR, y_offset=8)
+        y += 96
+    y += 24
+    draw.line([MARGIN, y, WIDTH - MARGIN, y], fill=ACCENT_COLOR, width=3)
+    y += 40
+
+    # 箇条書き（下端のフッター領域を残して収まる分だけ）
+    footer_top = HEIGHT - MARGIN - 40
+    text_left = MARGIN + 56
+    for bullet in bullets:
+        lines = _wrap(draw, bullet, bullet_font, WIDTH - text_left - MARGIN, 2)
+        if y + 60 * len(lines) > footer_top - 16:
+            break
+        draw.ellipse([MARGIN + 8, y + 18, MARGIN + 28, y + 38], fill=ACCENT_COLOR)
+        for line in lines:
+            _draw_highlighted(draw, (text_left, y), line, bullet_font,
+                              bullet_number_font, TEXT_COLOR, y_offset=6)
+            y += 60
+        y += 18
+
+    # 問いかけ
+    if footer:
+        footer_line = _wrap(draw, footer, footer_font, WIDTH - MARGIN * 2, 1)
+        if footer_line:
+            draw.text((MARGIN, footer_top), footer_line[0], font=footer_font, fill=SUB_TEXT_COLOR)
+
+    out = io.BytesIO()
+    img.save(out, format='PNG', optimize=False)
+    return out.getvalue()
@@ -3,7 +3,13 @@ X バズ投稿自動生成システム - メイン実行ファイル
 
 X公式アルゴリズム（2026年版）完全準拠
 参考: https://github.com/xai-org/x-algorithm
+
+使い方:
+    python main.py                   # 新規実行
+    python main.py --resume          # 未完了の最新の実行を再開
+    python main.py --resume <run_id> # 指定した実行を再開
 """
+import argparse
 import asyncio
 import json
 import os
@@ -14,16 +20,20 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # モジュールインポート
-from scraper import XScraper
-from guest_token_manager import GuestTokenManager
-from analyzer import TweetAnalyzer
-from rewriter import TweetRewriter
-from image_generator import InfographicGenerator
-from sheets_manager import SheetsManager
+from account_scheduler import AccountScheduler
+from archive import RunArchive
+from checkpoint import RunCheckpoint
+from cost_governor import CostGovernor
+from tweet_pipeline import TweetPipeline
 from utils import load_json_file, log_info, log_success, log_error, is_mock_mode
 
-async def main():
-    """メイン実行フロー"""
+async def main(resume=None):
+    """
+    メイン実行フロー
+
+    Args:
+        resume: 再開する実行ID（'latest' なら未完了の最新の実行）
+    """
     
     # モード表示
     mode = "モックモード（テスト用）" if is_mock_mode() else "プロダクションモード"
@@ -44,165 +54,137 @@ async def main():
         log_error(f"設定ファイルの読み込みに失敗: {e}")
         return
     
+    # チェックポイント（再開時は記録済みの収集・分析・リライトを使う）
+    run_id = None
+    if resume == 'latest':
+        run_id = RunCheckpoint.latest_incomplete()
+        if run_id is None:
+            log_error("再開できる未完了の実行がありません")
+            return
+    elif resume:
+        run_id = resume
+    checkpoint = RunCheckpoint(run_id=run_id)
+    if checkpoint.resumed:
+        log_info(f"実行 {checkpoint.run_id} を再開します（記録済み: {checkpoint.summary()}）")
+    else:
+        log_info(f"実行ID: {checkpoint.run_id}（失敗時は --resume {checkpoint.run_id} で再開）")
+
+    # 予算（settings.json の budget / COST_LIMIT_PER_RUN_USD / COST_LIMIT_PER_DAY_USD）
+    governor = CostGovernor.from_settings(settings)
+
     # 各サービス初期化
     log_info("サービスを初期化中...")
-    guest_token_manager = GuestTokenManager()
-    scraper = XScraper(
-        guest_token_manager,
-        proxy_manager=None,
-        twitter_bearer_token=os.getenv('TWITTER_BEARER_TOKEN')
-    )
-    analyzer = TweetAnalyzer(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-    rewriter = TweetRewriter(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-    image_gen = InfographicGenerator(
-        project_id=os.getenv('GCP_PROJECT_ID'),
-        location='us-central1',
-        credentials_path='config/credentials.json',
-        gemini_api_key=os.getenv('GEMINI_API_KEY')
-    )
-    sheets = SheetsManager(
-        credentials_path='config/credentials.json',
-        spreadsheet_id=os.getenv('SPREADSHEET_ID')
+    engine = TweetPipeline.from_env(
+        archive=RunArchive(source='main'),
+        sheets_options={
+            'batch_size': 50,
+            'flush_interval': 30,
+            'dedupe': True  # 毎日の収集で同じツイートを重複保存しない
+        },
+        concurrency=settings['processing'].get('concurrency'),
+        retries=settings['processing'].get('stage_retries', 1),
+        # template: ローカル描画（API不要） / model: Nano Banana Pro
+        image_tier=settings.get('image_generation', {}).get('tier'),
+        checkpoint=checkpoint,
+        governor=governor
     )
     log_success("サービス初期化完了")
     print()
     
-    # ステップ1: ツイート収集
-    log_info("=" * 60)
-    log_info("ステップ1: ツイート収集")
-    log_info("=" * 60)
-    all_tweets = []
-    
-    max_accounts = min(
-        len(accounts_config['benchmark_accounts']),
-        settings['collection']['max_accounts_per_run']
-    )
-    
-    for i, account in enumerate(accounts_config['benchmark_accounts'][:max_accounts], 1):
-        log_info(f"[{i}/{max_accounts}] @{account['username']} から収集中...")
-        
-        tweets = await scraper.scrape_account_timeline(
-            username=account['username'],
-            max_tweets=settings['collection']['tweets_per_account']
+    try:
+        # ステップ1: ツイート収集
+        log_info("=" * 60)
+        log_info("ステップ1: ツイート収集")
+        log_info("=" * 60)
+        # 優先度・過去の収穫率・前回からの経過時間で今回収集するアカウントを選ぶ
+        # （再開時は前回選んだアカウントをそのまま使う）
+        scheduler = AccountScheduler.from_settings(settings)
+        accounts = scheduler.select_for_run(
+            checkpoint,
+            accounts_config['benchmark_accounts'],
+            limit=settings['collection']['max_accounts_per_run']
         )
+        all_tweets, _ = await engine.collect(
+            accounts,
+            max_tweets=settings['collection']['tweets_per_account'],
+            delay=settings['rate_limiting']['delay_between_accounts']
+        )
+        log_success(f"合計 {len(all_tweets)} 件のツイートを収集")
+        print()
         
-        for tweet in tweets:
-            tweet['category'] = account['category']
-        
-        all_tweets.extend(tweets)
-        log_success(f"  → {len(tweets)}件のツイートを取得")
-        
-        await asyncio.sleep(settings['rate_limiting']['delay_between_accounts'])
-    
-    log_success(f"合計 {len(all_tweets)} 件のツイートを収集")
-    print()
-    
-    # ステップ2: エンゲージメントフィルタリング
-    log_info("=" * 60)
-    log_info("ステップ2: エンゲージメントフィルタリング")
-    log_info("=" * 60)
-    threshold = settings['filtering']['engagement_threshold']
-    
-    viral_tweets = [
-        t for t in all_tweets
-        if t['likes'] >= threshold['min_likes']
-        and t['retweets'] >= threshold['min_retweets']
-    ]
-    
-    viral_tweets.sort(key=lambda x: x['engagement_score'], reverse=True)
-    log_success(f"高エンゲージメントツイート: {len(viral_tweets)} 件")
-    
-    if len(viral_tweets) == 0:
-        log_error("エンゲージメント閾値を満たすツイートがありません")
-        log_info(f"閾値を下げてください（現在: いいね{threshold['min_likes']}以上、RT{threshold['min_retweets']}以上）")
-        return
-    print()
-    
-    # ステップ3: X公式アルゴリズム分析
-    log_info("=" * 60)
-    log_info("ステップ3: X公式アルゴリズム分析")
-    log_info("=" * 60)
-    analyzed_tweets = []
-    
-    tweets_to_analyze = min(len(viral_tweets), settings['processing']['tweets_to_analyze'])
-    
-    for i, tweet in enumerate(viral_tweets[:tweets_to_analyze], 1):
-        log_info(f"[{i}/{tweets_to_analyze}] 分析中...")
-        log_info(f"  URL: {tweet['url']}")
-        log_info(f"  エンゲージメント: {tweet['engagement_score']:.0f}")
-        
-        analysis = await analyzer.analyze_tweet(tweet)
-        analyzed_tweets.append({
-            'original': tweet,
-            'analysis': analysis
-        })
-        
-        log_success(f"  → P(dwell): {analysis['scores']['dwell_potential']}/10")
-        log_success(f"  → P(reply): {analysis['scores']['reply_potential']}/10")
+        # ステップ2: エンゲージメントフィルタリング
+        log_info("=" * 60)
+        log_info("ステップ2: エンゲージメントフィルタリング")
+        log_info("=" * 60)
+        threshold = settings['filtering']['engagement_threshold']
+        viral_tweets = TweetPipeline.filter_viral(
+            all_tweets, threshold['min_likes'], threshold['min_retweets']
+        )
+        log_success(f"高エンゲージメントツイート: {len(viral_tweets)} 件")
+        # 予算で見送ったアカウントは統計を変えない（収穫0・収集済みとして記録しない）
+        scheduler.record_run_once(checkpoint, engine.polled_accounts, all_tweets, viral_tweets)
         
-        await asyncio.sleep(0.1)
-    
-    log_success(f"{len(analyzed_tweets)} 件のツイートを分析完了")
-    print()
-    
-    # ステップ4: リライト＋画像生成
-    log_info("=" * 60)
-    log_info("ステップ4: X公式アルゴリズム対応リライト＋画像生成")
-    log_info("=" * 60)
-    
-    tweets_to_rewrite = min(len(analyzed_tweets), settings['processing']['tweets_to_rewrite'])
-    
-    for i, item in enumerate(analyzed_tweets[:tweets_to_rewrite], 1):
-        log_info(f"[{i}/{tweets_to_rewrite}] 処理中...")
-        log_info(f"  元URL: {item['original']['url']}")
+        if len(viral_tweets) == 0:
+            log_error("エンゲージメント閾値を満たすツイートがありません")
+            log_info(f"閾値を下げてください（現在: いいね{threshold['min_likes']}以上、RT{threshold['min_retweets']}以上）")
+            return
+        print()
         
-        # リライト
-        log_info("  → リライト生成中...")
-        rewritten = await rewriter.rewrite_tweet(
-            item['original'],
-            item['analysis']
+        # ステップ3〜4: 分析 → リライト → 画像生成 → 保存
+        # 各ステージを有界キューでつなぎ、分析が終わったツイートから順にリライト・保存へ流す
+        log_info("=" * 60)
+        log_info("ステップ3〜4: X公式アルゴリズム分析 → リライト＋画像生成 → 保存")
+        log_info("=" * 60)
+        # 残りの予算に収まるように件数を減らす
+        tweets_to_analyze, tweets_to_rewrite = governor.plan(
+            settings['processing']['tweets_to_analyze'],
+            settings['processing']['tweets_to_rewrite']
         )
-        log_success(f"     リライト完了（{len(rewritten['main_text'])}文字）")
-        
-        # 画像生成
-        if settings['processing']['generate_images']:
-            log_info("  → 図解画像生成中...")
-            image_url = await image_gen.generate_infographic(rewritten)
-            log_success(f"     画像生成完了")
+        saved = await engine.process(
+            viral_tweets[:tweets_to_analyze],
+            rewrite_limit=tweets_to_rewrite,
+            generate_images=settings['processing']['generate_images']
+        )
+        log_success(f"{len(engine.analyzed)} 件を分析、{len(saved)} 件をリライト・保存")
+        if engine.errors:
+            log_error(f"{len(engine.errors)} 件が途中で失敗しました")
+            log_info(f"残りは python main.py --resume {checkpoint.run_id} で再開できます")
+        elif governor.skipped:
+            log_info(f"予算の上限で止めた分は python main.py --resume {checkpoint.run_id} で再開できます")
         else:
-            image_url = None
-        
-        # Google Sheetsに保存
-        log_info("  → 結果を保存中...")
-        await sheets.save_result({
-            'original_tweet': item['original'],
-            'analysis': item['analysis'],
-            'rewritten': rewritten,
-            'image_url': image_url
-        })
-        log_success("  → 保存完了")
+            checkpoint.mark_complete()
+        if engine.restored:
+            log_info(f"チェックポイントから復元: {dict(engine.restored)}")
+        output_location = engine.sheets.output_location()
         print()
-        
-        await asyncio.sleep(0.1)
+    finally:
+        # バッファに残った行の書き込み・アーカイブ追記（フィルタで落ちたツイートも含む）
+        await engine.close()
     
     # 完了
     log_info("=" * 60)
     log_success("✅ すべての処理が完了しました！")
     log_info("=" * 60)
     
+    log_info(f"結果: {output_location} を確認してください")
+    cost = governor.summary()
+    log_info(f"コスト: ${cost['estimated_cost_usd']:.4f}（X API ${cost['x_api_cost_usd']:.4f} / "
+             f"Gemini ${cost['gemini_cost_usd']:.4f} / 画像 ${cost['image_cost_usd']:.4f}）、"
+             f"本日の累計 ${cost['daily_spent_usd']:.4f}")
     if is_mock_mode():
-        log_info("結果: output/results.csv を確認してください")
         log_info("")
         log_info("プロダクションモードで実行するには:")
         log_info("1. .env ファイルを作成（env.template を参考）")
         log_info("2. MODE=production に変更")
         log_info("3. API認証情報を設定")
-    else:
-        log_info(f"結果: Google Sheets ({os.getenv('SPREADSHEET_ID')}) を確認してください")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='X バズ投稿自動生成システム')
+    parser.add_argument('--resume', nargs='?', const='latest', metavar='RUN_ID',
+                        help='途中で止まった実行を再開（RUN_ID省略時は未完了の最新の実行）')
+    args = parser.parse_args()
     try:
-        asyncio.run(main())
+        asyncio.run(main(resume=args.resume))
     except KeyboardInterrupt:
         log_info("\n処理を中断しました")
     except Exception as e:
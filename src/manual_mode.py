@@ -4,144 +4,174 @@
 使い方:
   python manual_mode.py https://x.com/username/status/1234567890
   python manual_mode.py https://x.com/username/status/1234567890 https://x.com/another/status/9876543210
+
+  # ファイル・標準入力から1行1URLで読む（空行と # で始まる行は無視）
+  python manual_mode.py --file urls.txt
+  cat urls.txt | python manual_mode.py --file -
+
+  # 1件ごとの結果をJSONLで出力（- なら標準出力。ログは標準エラーへ）
+  python manual_mode.py --file urls.txt --jsonl results.jsonl --concurrency 8
+
+URLは読みながら処理する（全件を読み込んでから始めない）。同時に処理する件数は
+--concurrency で決まり、先読みもその程度に抑えられる。結果はメモリに溜めずに
+JSONL・ログへ1件ずつ書き出し、シートへはまとめて追加する。
 """
+import argparse
 import asyncio
+import contextlib
+import json
 import sys
-import os
 from dotenv import load_dotenv
 
 # 環境変数読み込み
 load_dotenv()
 
-# モジュールインポート
-from scraper import XScraper
-from guest_token_manager import GuestTokenManager
-from analyzer import TweetAnalyzer
-from rewriter import TweetRewriter
-from image_generator import InfographicGenerator
-from sheets_manager import SheetsManager
+# モジュールインポート（tweet_pipeline は読み込み時にログを出すので main() 内で読み込む）
 from utils import log_info, log_success, log_error
 
-async def analyze_tweet_from_url(tweet_url):
-    """ツイートURLから分析・リライト"""
-    
-    log_info(f"=" * 60)
-    log_info(f"ツイートURL: {tweet_url}")
-    log_info(f"=" * 60)
-    
-    # サービス初期化
-    guest_token_manager = GuestTokenManager()
-    scraper = XScraper(
-        guest_token_manager,
-        twitter_bearer_token=os.getenv('TWITTER_BEARER_TOKEN')
-    )
-    analyzer = TweetAnalyzer(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-    rewriter = TweetRewriter(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-    image_gen = InfographicGenerator(
-        project_id=os.getenv('GCP_PROJECT_ID'),
-        location='us-central1',
-        credentials_path='../config/credentials.json',
-        gemini_api_key=os.getenv('GEMINI_API_KEY')
-    )
-    sheets = SheetsManager(
-        credentials_path='../config/credentials.json',
-        spreadsheet_id=os.getenv('SPREADSHEET_ID')
-    )
-    
-    # ステップ1: ツイート取得
-    log_info("ステップ1: ツイート取得")
-    tweet = await scraper.scrape_tweet_by_url(tweet_url)
-    
-    if not tweet:
-        log_error("ツイートの取得に失敗しました")
-        return None
-    
-    log_success(f"ツイート取得成功")
+def log_result(item):
+    """1件分の分析・リライト結果を表示"""
+    tweet = item['original']
+    analysis = item['analysis']
+    rewritten = item['rewritten']
+
+    log_info("=" * 60)
+    log_info(f"ツイートURL: {tweet['url']}")
+    log_info("=" * 60)
     log_info(f"  本文: {tweet['text'][:100]}...")
     log_info(f"  いいね: {tweet['likes']:,}")
     log_info(f"  リツイート: {tweet['retweets']:,}")
     log_info(f"  リプライ: {tweet['replies']:,}")
     log_info(f"  エンゲージメント: {tweet['engagement_score']:,.0f}")
-    print()
-    
-    # ステップ2: X公式アルゴリズム分析
-    log_info("ステップ2: X公式アルゴリズム分析")
-    analysis = await analyzer.analyze_tweet(tweet)
-    
-    log_success(f"分析完了")
     log_info(f"  P(dwell): {analysis['scores']['dwell_potential']}/10")
     log_info(f"  P(reply): {analysis['scores']['reply_potential']}/10")
     log_info(f"  P(favorite): {analysis['scores']['favorite_potential']}/10")
     log_info(f"  P(repost): {analysis['scores']['repost_potential']}/10")
-    print()
-    
-    # ステップ3: リライト生成
-    log_info("ステップ3: X公式アルゴリズム対応リライト")
-    rewritten = await rewriter.rewrite_tweet(tweet, analysis)
-    
-    log_success(f"リライト完了（{len(rewritten['main_text'])}文字）")
+    log_success(f"リライト（{len(rewritten['main_text'])}文字）")
     log_info(f"  本文: {rewritten['main_text']}")
-    if rewritten.get('thread_tweets'):
-        log_info(f"  スレッド: {len(rewritten['thread_tweets'])}ツイート")
-    print()
-    
-    # ステップ4: 結果を保存
-    log_info("ステップ4: 結果を保存")
-    await sheets.save_result({
-        'original_tweet': tweet,
-        'analysis': analysis,
-        'rewritten': rewritten,
-        'image_url': None
-    })
-    log_success("保存完了")
+    if rewritten.get('thread'):
+        log_info(f"  スレッド: {len(rewritten['thread'])}ツイート")
     print()
-    
-    return {
-        'tweet': tweet,
-        'analysis': analysis,
-        'rewritten': rewritten
-    }
-
-async def main():
+
+async def read_urls(stream):
+    """ファイル・標準入力から1行ずつURLを読む（イベントループを止めないようスレッドで読む）"""
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            return
+        url = line.strip()
+        if url and not url.startswith('#'):
+            yield url
+
+class JsonlWriter:
+    """1件ごとの結果をJSONLで書き出す"""
+    def __init__(self, out):
+        self.out = out
+
+    def result(self, item):
+        self._write({
+            'index': item['index'],
+            'url': item['url'],
+            'status': 'ok',
+            'original': item['original'],
+            'analysis': item['analysis'],
+            'rewritten': item['rewritten'],
+            'image_url': item.get('image_url') or None,
+        })
+
+    def error(self, stage, item, error):
+        self._write({
+            'index': item['index'],
+            'url': item['url'],
+            'status': 'failed',
+            'stage': stage,
+            'error': str(error),
+        })
+
+    def _write(self, record):
+        self.out.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.out.flush()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='X バズ投稿生成AI - 手動入力モード')
+    parser.add_argument('urls', nargs='*', help='ツイートURL')
+    parser.add_argument('--file', help='1行1URLのファイル（- なら標準入力）')
+    parser.add_argument('--jsonl', nargs='?', const='-', metavar='PATH',
+                        help='1件ごとの結果をJSONLで出力（PATH省略時は標準出力）')
+    parser.add_argument('--concurrency', type=int, default=3,
+                        help='取得・分析・リライトの同時処理数（既定: 3）')
+    return parser.parse_args()
+
+async def main(args):
     """メイン実行フロー"""
-    
+
     log_info("=" * 60)
     log_info("X バズ投稿生成AI - 手動入力モード")
     log_info("=" * 60)
     print()
-    
-    # コマンドライン引数チェック
-    if len(sys.argv) < 2:
-        log_error("使い方: python manual_mode.py <ツイートURL> [<ツイートURL2> ...]")
+
+    # 入力チェック
+    if not args.urls and not args.file:
+        log_error("使い方: python manual_mode.py <ツイートURL> [<ツイートURL2> ...] | --file <urls.txt | ->")
         log_info("例: python manual_mode.py https://x.com/username/status/1234567890")
         return
-    
-    tweet_urls = sys.argv[1:]
-    log_info(f"{len(tweet_urls)}件のツイートを処理します")
+
+    source = None
+    if args.file:
+        source = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+        urls = read_urls(source)
+        log_info(f"{'標準入力' if args.file == '-' else args.file} からURLを読みながら処理します")
+    else:
+        urls = args.urls
+        log_info(f"{len(urls)}件のツイートを処理します")
     print()
-    
-    # 各ツイートを処理
-    results = []
-    for i, url in enumerate(tweet_urls, 1):
-        log_info(f"[{i}/{len(tweet_urls)}] 処理中...")
-        result = await analyze_tweet_from_url(url)
-        if result:
-            results.append(result)
-        print()
-    
+
+    writer = None
+    if args.jsonl:
+        writer = JsonlWriter(sys.__stdout__ if args.jsonl == '-' else open(args.jsonl, 'w', encoding='utf-8'))
+    concurrency = max(1, args.concurrency)
+
+    from tweet_pipeline import TweetPipeline
+
+    # サービスは1回だけ初期化し、全URLをパイプラインに流す
+    # シートへは1件ずつではなく、まとめて append_rows する
+    engine = TweetPipeline.from_env(
+        sheets_options={'batch_size': 50, 'flush_interval': 30},
+        concurrency={'fetch': concurrency, 'analyze': concurrency, 'rewrite': concurrency},
+        queue_size=concurrency
+    )
+    try:
+        await engine.process_urls(
+            urls,
+            on_result=writer.result if writer else log_result,
+            on_error=writer.error if writer else None,
+            collect=False
+        )
+        output_location = engine.sheets.output_location()
+    finally:
+        await engine.close()
+        if source is not None and source is not sys.stdin:
+            source.close()
+        if writer and writer.out is not sys.__stdout__:
+            writer.out.close()
+
     # 完了
+    stages = engine.metrics()['stages']
+    failed = sum(stage['failed'] for stage in stages.values())
     log_info("=" * 60)
-    log_success(f"✅ {len(results)}件の処理が完了しました！")
+    log_success(f"✅ {stages['save']['processed']}件の処理が完了しました！")
+    if failed:
+        log_error(f"{failed}件は失敗しました")
     log_info("=" * 60)
-    
-    if os.getenv('SPREADSHEET_ID'):
-        log_info(f"結果: Google Sheets ({os.getenv('SPREADSHEET_ID')}) を確認してください")
-    else:
-        log_info("結果: output/results.csv を確認してください")
+    log_info(f"結果: {output_location} を確認してください")
 
 if __name__ == '__main__':
+    args = parse_args()
+    # JSONLを標準出力に書く場合、ログは標準エラーに回す
+    log_stream = sys.stderr if args.jsonl == '-' else sys.stdout
     try:
-        asyncio.run(main())
+        with contextlib.redirect_stdout(log_stream):
+            asyncio.run(main(args))
     except KeyboardInterrupt:
         log_info("\n処理を中断しました")
     except Exception as e:
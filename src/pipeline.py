@@ -0,0 +1,205 @@
+"""
+ステージ間を有界キューでつなぐパイプライン
+
+- 各ステージは決まった数のワーカーで並列実行
+- 前のステージが1件終わるとすぐ次のステージへ流れる（全件の完了を待たない）
+- キューに上限があるので、遅いステージの前で溜まりすぎない
+- 失敗したアイテムはステージごとの回数まで指数バックオフでリトライ
+  （外部API呼び出しの失敗は resilient_call 側でリトライ済みなので重ねてリトライしない。
+  プロバイダーのサーキットが open の場合も待たずに失敗させる）
+- ステージごとの処理数・失敗数・所要時間を metrics() で取得できる
+
+使い方:
+    pipeline = Pipeline([
+        Stage('analyze', analyze, concurrency=3),
+        Stage('rewrite', rewrite, concurrency=2),
+        Stage('save', save, concurrency=1),
+    ])
+    results = await pipeline.run(tweets)
+
+ハンドラーが None を返したアイテムはそこで流れから外れる。
+items には非同期イテレーター（標準入力から1行ずつ読むなど）も渡せる。
+キューに上限があるので、入力は処理の進み具合に合わせて少しずつ読まれる。
+"""
+import asyncio
+import time
+from resilience import CircuitOpenError, was_handled
+from utils import log_info
+
+_DONE = object()
+
+
+class Stage:
+    """パイプラインの1ステージ"""
+    def __init__(self, name, handler, concurrency=1, retries=0, retry_delay=1.0):
+        """
+        Args:
+            name: ステージ名（ログ・メトリクス用）
+            handler: async handler(item) -> 次のステージに渡す値（Noneなら打ち切り）
+            concurrency: 同時に処理する数
+            retries: 例外時のリトライ回数（resilient_call を通った失敗は対象外）
+            retry_delay: 最初のリトライまでの秒数（以降は倍々）
+        """
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, int(concurrency))
+        self.retries = max(0, int(retries))
+        self.retry_delay = retry_delay
+        self.metrics = StageMetrics()
+
+
+class StageMetrics:
+    """ステージごとの集計"""
+    def __init__(self):
+        self.processed = 0   # 次のステージに渡した数
+        self.dropped = 0     # ハンドラーが None を返した数
+        self.failed = 0      # リトライしても失敗した数
+        self.retried = 0     # リトライした回数
+        self.busy_sec = 0.0  # ハンドラーの実行時間の合計
+        self.max_sec = 0.0   # 1件の最大実行時間
+
+    def to_dict(self):
+        handled = self.processed + self.dropped + self.failed
+        return {
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'retried': self.retried,
+            'avg_sec': round(self.busy_sec / handled, 3) if handled else 0.0,
+            'max_sec': round(self.max_sec, 3),
+        }
+
+
+class Pipeline:
+    """有界キューでステージをつないで実行する"""
+    def __init__(self, stages, queue_size=10):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.errors = []
+        self.elapsed_sec = 0.0
+        self._on_result = None
+        self._on_error = None
+        self._collect = True
+
+    async def run(self, items, on_result=None, on_error=None, collect=True):
+        """
+        アイテムを流して最終ステージの出力を集める
+
+        Args:
+            items: アイテムのイテラブル or 非同期イテラブル
+            on_result: 最終ステージを通ったアイテムごとに on_result(output) を呼ぶ
+            on_error: 失敗したアイテムごとに on_error(stage_name, item, exception) を呼ぶ
+            collect: False なら出力・エラーをメモリに溜めない（件数は metrics()、
+                中身は on_result / on_error で受け取る。件数の多いストリーム用）
+
+        Returns:
+            list: 最終ステージの戻り値（完了順。collect=False なら空）
+        """
+        started = time.monotonic()
+        self._on_result = on_result
+        self._on_error = on_error
+        self._collect = collect
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = []
+        tasks = [asyncio.create_task(self._feed(items, queues[0], self.stages[0].concurrency))]
+        for i, stage in enumerate(self.stages):
+            out_queue = queues[i + 1] if i + 1 < len(self.stages) else None
+            next_workers = self.stages[i + 1].concurrency if out_queue else 0
+            tasks.append(asyncio.create_task(
+                self._run_stage(stage, queues[i], out_queue, next_workers, results)
+            ))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            self.elapsed_sec = time.monotonic() - started
+        return results
+
+    def metrics(self):
+        """ステージごとのメトリクスと全体の所要時間"""
+        return {
+            'elapsed_sec': round(self.elapsed_sec, 3),
+            'stages': {stage.name: stage.metrics.to_dict() for stage in self.stages},
+        }
+
+    def log_metrics(self):
+        """メトリクスをログに出す"""
+        log_info(f"Pipeline finished in {self.elapsed_sec:.1f}s")
+        for name, m in self.metrics()['stages'].items():
+            log_info(f"  [{name}] ok={m['processed']} dropped={m['dropped']} failed={m['failed']} "
+                     f"retried={m['retried']} avg={m['avg_sec']}s max={m['max_sec']}s")
+
+    @staticmethod
+    async def _feed(items, queue, workers):
+        if hasattr(items, '__aiter__'):
+            async for item in items:
+                await queue.put(item)
+        else:
+            for item in items:
+                await queue.put(item)
+        for _ in range(workers):
+            await queue.put(_DONE)
+
+    async def _run_stage(self, stage, in_queue, out_queue, next_workers, results):
+        """ステージのワーカーを動かし、全員が終わったら次のステージに終了を伝える"""
+        await asyncio.gather(*[
+            self._worker(stage, in_queue, out_queue, results)
+            for _ in range(stage.concurrency)
+        ])
+        for _ in range(next_workers):
+            await out_queue.put(_DONE)
+
+    async def _worker(self, stage, in_queue, out_queue, results):
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                return
+            output = await self._handle(stage, item)
+            if output is None:
+                continue
+            if out_queue is None:
+                if self._collect:
+                    results.append(output)
+                if self._on_result:
+                    self._on_result(output)
+            else:
+                await out_queue.put(output)
+
+    async def _handle(self, stage, item):
+        """ハンドラーを実行（失敗時はリトライ）。失敗・打ち切りなら None"""
+        metrics = stage.metrics
+        for attempt in range(stage.retries + 1):
+            started = time.monotonic()
+            try:
+                output = await stage.handler(item)
+            except Exception as e:
+                self._record_time(metrics, started)
+                retryable = not (isinstance(e, CircuitOpenError) or was_handled(e))
+                if attempt < stage.retries and retryable:
+                    wait = stage.retry_delay * (2 ** attempt)
+                    metrics.retried += 1
+                    log_info(f"[{stage.name}] failed: {e}. Retrying in {wait:.0f}s...")
+                    await asyncio.sleep(wait)
+                    continue
+                log_info(f"[{stage.name}] failed: {e}")
+                metrics.failed += 1
+                if self._collect:
+                    self.errors.append((stage.name, item, e))
+                if self._on_error:
+                    self._on_error(stage.name, item, e)
+                return None
+            self._record_time(metrics, started)
+            if output is None:
+                metrics.dropped += 1
+            else:
+                metrics.processed += 1
+            return output
+
+    @staticmethod
+    def _record_time(metrics, started):
+        elapsed = time.monotonic() - started
+        metrics.busy_sec += elapsed
+        metrics.max_sec = max(metrics.max_sec, elapsed)
@@ -0,0 +1,250 @@
+"""
+外部API呼び出しの共通リトライ・サーキットブレーカー
+
+X API / Gemini / xAI Grok / 画像モデル / Cloud Storage / Google Sheets の呼び出しは
+すべて resilient_call を通す。
+
+- リトライ: 指数バックオフ＋ジッター（full jitter）。回数は settings.json の
+  rate_limiting.max_retries（環境変数 RETRY_MAX_RETRIES が優先）
+- エラーの分類: 429・5xx・タイムアウト・接続エラーはリトライ、それ以外（認証・400・パース失敗など）は即失敗
+- サーキットブレーカー: プロバイダーごとにリトライ対象の失敗が続いたら一定時間 open にし、
+  その間の呼び出しは待たずに CircuitOpenError で失敗させる。時間が経ったら1回だけ試し、
+  成功すれば閉じる
+
+使い方:
+    response = await resilient_call('gemini', model.generate_content, prompt)
+    tweets = await resilient_call('x_api', client.get_users_tweets, id=user_id)
+    values = await resilient_call('sheets', self._run_io, worksheet.get_all_values)
+
+同期関数はスレッドで実行する（イベントループを止めない）。
+"""
+import asyncio
+import inspect
+import os
+import random
+import time
+from utils import load_json_file, log_info, log_error
+
+RETRYABLE_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+# ステータスコードが取れない例外のうち、一時障害として扱うもの（クラス名で判定）
+RETRYABLE_ERROR_NAMES = (
+    'Timeout', 'TimedOut', 'DeadlineExceeded', 'ConnectError', 'ConnectionError',
+    'RemoteProtocolError', 'ReadError', 'ResourceExhausted', 'ServiceUnavailable',
+    'TooManyRequests', 'InternalServerError', 'ServerError', 'Unavailable',
+)
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(RuntimeError):
+    """プロバイダーのサーキットが open（呼び出さずに失敗）"""
+    def __init__(self, provider, retry_after):
+        super().__init__(f"{provider} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def status_of(error):
+    """例外からHTTPステータスを取り出す（httpx / requests / gspread / tweepy / google）"""
+    response = getattr(error, 'response', None)
+    for value in (getattr(response, 'status_code', None), getattr(response, 'status', None),
+                  getattr(error, 'status_code', None), getattr(error, 'code', None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_rejected(error):
+    """サーバーが処理せずに断ったことが確かなエラーか（429: 送り直しても二重にならない）"""
+    return status_of(error) == 429
+
+
+def is_retryable(error):
+    """一時的な障害（リトライで回復しうる）か"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES or status >= 500
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return any(name in type(error).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+
+def _mark_handled(error):
+    try:
+        error._resilient_call_failed = True
+    except AttributeError:
+        pass
+
+
+def was_handled(error):
+    """resilient_call を通って失敗した例外か（呼び出し側で重ねてリトライしない）"""
+    return getattr(error, '_resilient_call_failed', False)
+
+
+class RetryPolicy:
+    """指数バックオフ＋ジッターのリトライ設定"""
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, retry_on=None):
+        """
+        Args:
+            retry_on: リトライするか判定する関数 retry_on(error)（Noneなら is_retryable）。
+                冪等でない書き込みでは、送信済みか分からない失敗をリトライしないように絞る
+        """
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on or is_retryable
+
+    def delay(self, attempt):
+        """attempt 回目（0始まり）の失敗後の待機秒数（0〜上限の一様乱数）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """プロバイダーごとのサーキットブレーカー（closed → open → half_open → closed）"""
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def before_call(self):
+        """呼び出してよいか確認（open なら CircuitOpenError）"""
+        if self.state == 'closed':
+            return
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == 'open' and elapsed >= self.reset_timeout:
+            self.state = 'half_open'
+        # half_open の間は1件だけ試す
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def release(self):
+        """成功・失敗のどちらとも数えずに試行を終える（キャンセル・リクエスト側のエラー）"""
+        self._probing = False
+
+    def record_success(self):
+        if self.state != 'closed':
+            log_info(f"Circuit [{self.name}] closed")
+        self.state = 'closed'
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                log_info(f"Circuit [{self.name}] open for {self.reset_timeout:.0f}s "
+                         f"after {self.failures} failures")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+    def to_dict(self):
+        return {'state': self.state, 'failures': self.failures}
+
+
+def _env_number(name, cast):
+    """環境変数を数値で読む（未設定・空・不正な値なら None）"""
+    value = os.getenv(name) or None
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        log_error(f"{name}={value!r} は数値ではないため無視します")
+        return None
+
+
+def _load_default_policy():
+    """settings.json の rate_limiting.max_retries（環境変数 RETRY_MAX_RETRIES が優先）"""
+    max_retries = _env_number('RETRY_MAX_RETRIES', int)
+    if max_retries is None:
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        try:
+            settings = load_json_file(os.path.join(parent_dir, 'config', 'settings.json'))
+            max_retries = int(settings.get('rate_limiting', {}).get('max_retries'))
+        except (OSError, ValueError, TypeError, AttributeError):
+            max_retries = None
+    return RetryPolicy(max_retries=DEFAULT_MAX_RETRIES if max_retries is None else max_retries)
+
+
+default_policy = _load_default_policy()
+_breakers = {}
+
+
+def get_breaker(provider):
+    """プロバイダーのサーキットブレーカー（プロセス内で共有）"""
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = _breakers[provider] = CircuitBreaker(
+            provider,
+            failure_threshold=_env_number('CIRCUIT_FAILURE_THRESHOLD', int) or DEFAULT_FAILURE_THRESHOLD,
+            reset_timeout=_env_number('CIRCUIT_RESET_SECONDS', float) or DEFAULT_RESET_TIMEOUT
+        )
+    return breaker
+
+
+def breaker_states():
+    """全プロバイダーのサーキットの状態（ヘルスチェック用）"""
+    return {name: breaker.to_dict() for name, breaker in _breakers.items()}
+
+
+async def resilient_call(provider, func, *args, policy=None, **kwargs):
+    """
+    外部APIを呼び出す（リトライ・サーキットブレーカー付き）
+
+    Args:
+        provider: プロバイダー名（'x_api' / 'gemini' / 'xai' / 'image_model' / 'gcs' / 'sheets'）
+        func: 呼び出す関数（async関数 or 同期関数）
+        policy: RetryPolicy（Noneなら settings.json の max_retries）
+
+    Raises:
+        CircuitOpenError: サーキットが open
+        Exception: リトライ対象外のエラー、またはリトライしても失敗したエラー
+            （was_handled(e) が True になる）
+    """
+    policy = policy or default_policy
+    breaker = get_breaker(provider)
+    is_async = inspect.iscoroutinefunction(func)
+    for attempt in range(policy.max_retries + 1):
+        breaker.before_call()
+        try:
+            if is_async:
+                result = await func(*args, **kwargs)
+            else:
+                result = await asyncio.to_thread(func, *args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                # リクエスト側の問題（4xx・パース失敗など）はプロバイダーの障害としても
+                # 回復としても数えない（half_open のまま次の呼び出しで試す）
+                breaker.release()
+                _mark_handled(e)
+                raise
+            breaker.record_failure()
+            if attempt >= policy.max_retries or breaker.state == 'open' or not policy.retry_on(e):
+                _mark_handled(e)
+                raise
+            wait = policy.delay(attempt)
+            log_info(f"[{provider}] {type(e).__name__}: {e}. Retrying in {wait:.1f}s "
+                     f"({attempt + 1}/{policy.max_retries})...")
+            await asyncio.sleep(wait)
+            continue
+        except BaseException:
+            # キャンセル（タイムアウト・切断）でも half_open の試行枠を必ず返す
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
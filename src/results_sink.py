@@ -0,0 +1,129 @@
+"""
+ローカル結果ファイル出力（JSONL / CSV）
+
+- 実行中はファイルハンドルを開いたまま、バッファ付きで追記
+- 切り詰めなしの完全なレコードを書き出す
+- 一定件数・一定時間ごとに fsync
+- 日付ごとのファイルローテーションに対応
+"""
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from utils import log_info
+
+
+class ResultsSink:
+    """
+    結果レコードをJSONLとCSVに追記するライター
+
+    ファイル名:
+      rotate=None    → {basename}.jsonl / {basename}.csv
+      rotate='daily' → {basename}-YYYY-MM-DD.jsonl / {basename}-YYYY-MM-DD.csv
+    """
+    BUFFER_SIZE = 1 << 16
+
+    def __init__(self, output_dir, csv_headers, basename='results',
+                 formats=('jsonl', 'csv'), rotate=None,
+                 fsync_every=100, fsync_interval=5.0):
+        """
+        Args:
+            output_dir: 出力ディレクトリ
+            csv_headers: CSVのヘッダー行
+            basename: ファイル名のベース
+            formats: 'jsonl' / 'csv' の組み合わせ
+            rotate: None or 'daily'
+            fsync_every: この件数ごとに fsync
+            fsync_interval: 最後の fsync からこの秒数経過したら fsync
+        """
+        self.output_dir = output_dir
+        self.csv_headers = list(csv_headers)
+        self.basename = basename
+        self.formats = tuple(formats)
+        self.rotate = rotate
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._period = None
+        self._jsonl_file = None
+        self._csv_file = None
+        self._csv_writer = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def path_for(self, ext, period=None):
+        """出力ファイルのパス"""
+        period = period if period is not None else self._current_period()
+        suffix = f"-{period}" if period else ""
+        return os.path.join(self.output_dir, f"{self.basename}{suffix}.{ext}")
+
+    def write(self, record, csv_row):
+        """
+        1件書き込む
+
+        Args:
+            record: JSONLに書く完全なレコード（dict）
+            csv_row: CSVに書く1行（csv_headers と同じ並び）
+        """
+        self._ensure_open()
+        if self._jsonl_file:
+            self._jsonl_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        if self._csv_writer:
+            self._csv_writer.writerow(csv_row)
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.flush(fsync=True)
+
+    def flush(self, fsync=True):
+        """バッファを書き出す（fsync=Trueならディスクまで同期）"""
+        for f in (self._jsonl_file, self._csv_file):
+            if f:
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+        if fsync:
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        """fsync してファイルを閉じる"""
+        self.flush(fsync=True)
+        for f in (self._jsonl_file, self._csv_file):
+            if f:
+                f.close()
+        self._jsonl_file = self._csv_file = self._csv_writer = None
+        self._period = None
+
+    def _current_period(self):
+        return datetime.now().strftime('%Y-%m-%d') if self.rotate == 'daily' else ''
+
+    def _ensure_open(self):
+        """未オープン、または日付が変わったらファイルを開き直す"""
+        period = self._current_period()
+        if self._period == period and (self._jsonl_file or self._csv_file):
+            return
+        if self._period is not None:
+            self.close()
+        self._period = period
+
+        if 'jsonl' in self.formats:
+            self._jsonl_file = open(self.path_for('jsonl', period), 'a',
+                                    encoding='utf-8', buffering=self.BUFFER_SIZE)
+        if 'csv' in self.formats:
+            path = self.path_for('csv', period)
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            self._csv_file = open(path, 'a', encoding='utf-8', newline='',
+                                  buffering=self.BUFFER_SIZE)
+            self._csv_writer = csv.writer(self._csv_file)
+            if is_new:
+                self._csv_writer.writerow(self.csv_headers)
+        log_info(f"Results sink opened: {self.path_for(self.formats[0], period)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,296 @@
+"""
+結果シートのローカルミラー（SQLite）
+
+- SheetsManager が同期的に書き込む（マイクロ秒で完了）
+- 未同期の行は SheetsSyncer がバッチでGoogle Sheetsに反映
+- シート側の編集は定期的に pull して取り込む
+- 管理画面の読み込み・行参照はこのミラーから返す
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# シートのA〜O列に対応するカラム
+COLUMNS = [
+    'collected_date',
+    'original_url',
+    'category',
+    'original_text',
+    'likes',
+    'retweets',
+    'replies',
+    'engagement_score',
+    'dwell_factors',
+    'reply_triggers',
+    'rewritten_text',
+    'thread',
+    'call_to_action',
+    'image_url',
+    'image_generated',
+]
+
+# シートへ数値で書き込む列（ミラーはすべてTEXTで持つ）
+NUMERIC_COLUMNS = ('likes', 'retweets', 'replies', 'engagement_score')
+
+# 同期状態
+SYNCED = 'synced'
+PENDING_APPEND = 'pending_append'
+PENDING_UPDATE = 'pending_update'
+
+
+class ResultsStore:
+    """
+    結果シートのSQLiteミラー
+
+    row_number はシート上の行番号（未反映の行はNULL）
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+
+    def _create_tables(self):
+        columns_sql = ',\n'.join(f'{c} TEXT' for c in COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    row_number INTEGER UNIQUE,
+                    {columns_sql},
+                    sync_state TEXT NOT NULL DEFAULT '{SYNCED}',
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_results_sync ON results(sync_state)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)'
+            )
+
+    # ─── 書き込み ───
+
+    def add_rows(self, rows):
+        """シートに追加予定の行を保存（pending_append）"""
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT INTO results ({", ".join(COLUMNS)}, sync_state, created_at) '
+                f'VALUES ({placeholders}, ?, ?)',
+                [self._normalize(row) + [PENDING_APPEND, now] for row in rows]
+            )
+
+    def pending_appends(self, limit=500):
+        """シート未反映の行を古い順に取得: [(id, values), ...]"""
+        with self._lock:
+            cur = self._conn.execute(
+                f'SELECT id, {", ".join(COLUMNS)} FROM results '
+                'WHERE sync_state = ? ORDER BY id LIMIT ?',
+                (PENDING_APPEND, limit)
+            )
+            return [(r[0], self._typed(r[1:])) for r in cur.fetchall()]
+
+    def pending_stats(self):
+        """未反映行の件数と最古の作成時刻"""
+        with self._lock:
+            count, oldest = self._conn.execute(
+                'SELECT COUNT(*), MIN(created_at) FROM results WHERE sync_state = ?',
+                (PENDING_APPEND,)
+            ).fetchone()
+        return count, oldest
+
+    def mark_appended(self, ids, first_row_number):
+        """append結果を反映（idの順に first_row_number から行番号を割り当てる）"""
+        with self._lock, self._conn:
+            for offset, row_id in enumerate(ids):
+                row_number = first_row_number + offset
+                # 同じ行番号を持つ古いミラー行があれば置き換える
+                self._conn.execute(
+                    'DELETE FROM results WHERE row_number = ? AND id != ?',
+                    (row_number, row_id)
+                )
+                self._conn.execute(
+                    'UPDATE results SET row_number = ?, sync_state = ? WHERE id = ?',
+                    (row_number, SYNCED, row_id)
+                )
+
+    def update_row_values(self, row_number, values):
+        """シートに直接書き込んだ行の値をミラーに反映（先頭から渡した列だけ更新）"""
+        columns = COLUMNS[:len(values)]
+        set_clause = ', '.join(f'{c} = ?' for c in columns)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE results SET {set_clause} WHERE row_number = ?',
+                self._normalize(values)[:len(columns)] + [row_number]
+            )
+
+    def set_image_urls(self, updates):
+        """画像URLと生成済みフラグを更新（シート反映済みの行は pending_update）"""
+        with self._lock, self._conn:
+            for row_number, image_url in updates:
+                self._conn.execute(
+                    'UPDATE results SET image_url = ?, image_generated = ?, '
+                    'sync_state = CASE WHEN sync_state = ? THEN ? ELSE sync_state END '
+                    'WHERE row_number = ?',
+                    (image_url, 'TRUE', SYNCED, PENDING_UPDATE, row_number)
+                )
+
+    def set_pending_image_url(self, original_url, image_url):
+        """
+        シート未反映（pending_append）の行に画像URLを入れる（append時に一緒に送られる）
+
+        Returns:
+            int: 更新した行数
+        """
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                'UPDATE results SET image_url = ?, image_generated = ? '
+                'WHERE original_url = ? AND sync_state = ?',
+                (image_url, 'TRUE', original_url, PENDING_APPEND)
+            )
+            return cur.rowcount
+
+    def pending_updates(self):
+        """シート未反映の画像更新: [(row_number, image_url), ...]"""
+        with self._lock:
+            cur = self._conn.execute(
+                'SELECT row_number, image_url FROM results WHERE sync_state = ?',
+                (PENDING_UPDATE,)
+            )
+            return cur.fetchall()
+
+    def mark_updated(self, row_numbers):
+        """画像更新のシート反映を記録"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE results SET sync_state = ? WHERE row_number = ? AND sync_state = ?',
+                [(SYNCED, row, PENDING_UPDATE) for row in row_numbers]
+            )
+
+    def replace_from_remote(self, sheet_rows):
+        """
+        シートの全行（ヘッダー除く）でミラーを更新
+
+        未反映のローカル変更（pending_*）は上書きしない。
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            local_states = dict(self._conn.execute(
+                'SELECT row_number, sync_state FROM results WHERE row_number IS NOT NULL'
+            ).fetchall())
+            set_clause = ', '.join(f'{c} = ?' for c in COLUMNS)
+            placeholders = ', '.join('?' for _ in COLUMNS)
+            for offset, row in enumerate(sheet_rows):
+                row_number = offset + 2
+                values = self._normalize(row)
+                state = local_states.get(row_number)
+                if state is None:
+                    self._conn.execute(
+                        f'INSERT INTO results (row_number, {", ".join(COLUMNS)}, sync_state, created_at) '
+                        f'VALUES (?, {placeholders}, ?, ?)',
+                        [row_number] + values + [SYNCED, now]
+                    )
+                elif state == SYNCED:
+                    self._conn.execute(
+                        f'UPDATE results SET {set_clause} WHERE row_number = ?',
+                        values + [row_number]
+                    )
+            # 行番号が取れなかった反映済み行は、シートから読み直した行で置き換える
+            self._conn.execute(
+                'DELETE FROM results WHERE row_number IS NULL AND sync_state = ?',
+                (SYNCED,)
+            )
+            # シート側で削除された行を落とす
+            self._conn.execute(
+                'DELETE FROM results WHERE row_number > ? AND sync_state = ?',
+                (len(sheet_rows) + 1, SYNCED)
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_pull', ?)",
+                (str(now),)
+            )
+
+    # ─── 読み込み ───
+
+    def is_hydrated(self):
+        """シートから1回以上 pull 済みか"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'last_pull'"
+            ).fetchone()
+        return row is not None
+
+    def get_row(self, row_number):
+        """シート行番号で1行取得（A〜O列の値リスト）"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(COLUMNS)} FROM results WHERE row_number = ?',
+                (row_number,)
+            ).fetchone()
+        return list(row) if row else None
+
+    def list_rows(self, limit=50, cursor=None):
+        """
+        新しい順に行を取得
+
+        未反映行（row_number なし）は最初のページの先頭に含める
+        （管理画面では「シート反映待ち」として表示し、行の操作の対象にしない）。
+
+        Returns:
+            tuple: ([(row_number, values), ...], next_cursor)
+        """
+        select = f'SELECT row_number, {", ".join(COLUMNS)} FROM results'
+        with self._lock:
+            pending = []
+            if cursor is None:
+                pending = self._conn.execute(
+                    f'{select} WHERE row_number IS NULL ORDER BY id DESC LIMIT ?',
+                    (limit,)
+                ).fetchall()
+            remaining = limit - len(pending)
+            where = 'row_number IS NOT NULL'
+            params = []
+            if cursor is not None:
+                where += ' AND row_number < ?'
+                params.append(cursor)
+            synced = self._conn.execute(
+                f'{select} WHERE {where} ORDER BY row_number DESC LIMIT ?',
+                params + [remaining + 1]
+            ).fetchall()
+
+        page = synced[:remaining]
+        next_cursor = None
+        if len(synced) > remaining:
+            # 次ページは「このページ最古の行より前」から
+            next_cursor = page[-1][0] if page else synced[0][0] + 1
+        return [(r[0], list(r[1:])) for r in pending + page], next_cursor
+
+    @staticmethod
+    def _typed(values):
+        """数値列を int / float に戻す（RAW で append しても数値としてシートに入るように）"""
+        values = list(values)
+        for column in NUMERIC_COLUMNS:
+            i = COLUMNS.index(column)
+            try:
+                number = float(values[i])
+            except (TypeError, ValueError):
+                continue
+            values[i] = int(number) if number.is_integer() else number
+        return values
+
+    @staticmethod
+    def _normalize(row):
+        """シート行をA〜O列の文字列リストに揃える"""
+        values = ['' if v is None else str(v) for v in list(row)[:len(COLUMNS)]]
+        return values + [''] * (len(COLUMNS) - len(values))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -11,9 +11,9 @@ X公式アルゴリズム対応リライトエンジン
    - P(not_interested): つまらない・無関係
    - P(block/mute): 押し付けがましい・不快
 """
-import asyncio
 import json
 import os
+from resilience import resilient_call
 from utils import is_mock_mode, log_info
 
 
@@ -33,13 +33,14 @@ class TweetRewriter:
             except Exception as e:
                 log_info(f"Gemini rewriter init failed: {e}")
 
-    async def rewrite_tweet(self, original_tweet, analysis):
+    async def rewrite_tweet(self, original_tweet, analysis, on_usage=None):
         """
         X公式アルゴリズムに最適化してリライト
 
         Args:
             original_tweet: dict (元ツイートデータ)
             analysis: dict (X公式アルゴリズム分析結果)
+            on_usage: 応答ごとに on_usage('rewrite', usage_metadata) を呼ぶ（コスト集計用）
 
         Returns:
             dict: リライト結果
@@ -290,18 +291,21 @@ JSON形式のみで回答。重要ルール:
   }}
 }}
 """
-        # 最大2回リトライ（JSONパース失敗対策）
+        # APIエラーのリトライは resilient_call が行う。ここではJSONパース失敗時だけ1回やり直す
         for attempt in range(2):
+            response = await resilient_call(
+                'gemini',
+                self._model.generate_content,
+                prompt,
+                generation_config={
+                    "temperature": 0.3,
+                    "max_output_tokens": 8192,
+                    "response_mime_type": "application/json",
+                }
+            )
             try:
-                response = await asyncio.to_thread(
-                    self._model.generate_content,
-                    prompt,
-                    generation_config={
-                        "temperature": 0.3,
-                        "max_output_tokens": 8192,
-                        "response_mime_type": "application/json",
-                    }
-                )
+                if on_usage:
+                    on_usage('rewrite', getattr(response, 'usage_metadata', None))
                 if response and response.candidates:
                     # Gemini 2.5 Flash (thinking model) は複数partを返す場合がある
                     # thought=True のpartはスキップし、JSONテキストだけ取り出す
@@ -330,9 +334,8 @@ JSON形式のみで回答。重要ルール:
                 traceback.print_exc()
             if attempt < 1:
                 log_info("Retrying Gemini rewrite...")
-                await asyncio.sleep(1)
 
-        raise RuntimeError("Geminiリライトが2回連続で失敗しました。APIの状態を確認してください")
+        raise RuntimeError("Geminiリライトの応答を2回連続で解釈できませんでした")
 
     def _get_mock_rewrite(self, original_tweet, analysis):
         """
@@ -10,6 +10,7 @@ import random
 import re
 import os
 from datetime import datetime, timedelta
+from resilience import resilient_call
 from utils import get_random_user_agent, is_mock_mode, log_info, log_error, log_success
 try:
     import tweepy
@@ -33,6 +34,11 @@ class XScraper:
             except Exception as e:
                 log_error(f"Failed to initialize X API client: {e}")
     
+    @property
+    def uses_paid_api(self):
+        """X API（従量課金）で取得するか"""
+        return bool(self.twitter_client) and not is_mock_mode()
+
     async def scrape_account_timeline(self, username, max_tweets=100):
         """
         特定アカウントの最新ツイートを取得
@@ -43,6 +49,9 @@ class XScraper:
         
         Returns:
             list: ツイートデータのリスト
+
+        Raises:
+            Exception: X APIのエラー（リトライ後も失敗、またはサーキットが open）
         """
         if is_mock_mode():
             return await self._get_mock_tweets(username, max_tweets)
@@ -64,7 +73,10 @@ class XScraper:
             tweet_url: ツイートのURL（例: https://x.com/username/status/1234567890）
         
         Returns:
-            dict: ツイートデータ、取得失敗時はNone
+            dict: ツイートデータ、URL不正・ツイートが無い場合はNone
+
+        Raises:
+            Exception: X APIのエラー（リトライ後も失敗、またはサーキットが open）
         """
         # URLからツイートIDを抽出
         tweet_id = self._extract_tweet_id(tweet_url)
@@ -89,7 +101,7 @@ class XScraper:
         
         try:
             # ユーザーIDを取得
-            user = self.twitter_client.get_user(username=username)
+            user = await resilient_call('x_api', self.twitter_client.get_user, username=username)
             if not user.data:
                 log_error(f"User @{username} not found")
                 return []
@@ -97,7 +109,9 @@ class XScraper:
             user_id = user.data.id
             
             # ツイートを取得（note_tweetで長文テキストも取得）
-            tweets_response = self.twitter_client.get_users_tweets(
+            tweets_response = await resilient_call(
+                'x_api',
+                self.twitter_client.get_users_tweets,
                 id=user_id,
                 max_results=min(max_tweets, 100),  # API制限
                 tweet_fields=['created_at', 'public_metrics', 'text', 'note_tweet'],
@@ -146,15 +160,18 @@ class XScraper:
             return tweets
             
         except Exception as e:
+            # 空リストにせず呼び出し側に伝える（取得失敗と「ツイート0件」を区別する）
             log_error(f"X API error: {e}")
-            return []
+            raise
     
     async def _get_tweet_by_id_api(self, tweet_id, tweet_url):
         """X API v2を使用して個別ツイートを取得"""
         log_info(f"Fetching tweet ID {tweet_id} via X API v2")
         
         try:
-            tweet_response = self.twitter_client.get_tweet(
+            tweet_response = await resilient_call(
+                'x_api',
+                self.twitter_client.get_tweet,
                 id=tweet_id,
                 tweet_fields=['created_at', 'public_metrics', 'text', 'author_id']
             )
@@ -167,7 +184,8 @@ class XScraper:
             metrics = tweet.public_metrics
             
             # ユーザー名を取得
-            user_response = self.twitter_client.get_user(id=tweet.author_id)
+            user_response = await resilient_call('x_api', self.twitter_client.get_user,
+                                                 id=tweet.author_id)
             username = user_response.data.username if user_response.data else 'unknown'
             
             tweet_data = {
@@ -193,7 +211,7 @@ class XScraper:
             
         except Exception as e:
             log_error(f"Failed to fetch tweet {tweet_id}: {e}")
-            return None
+            raise
     
     def _extract_tweet_id(self, tweet_url):
         """ツイートURLからIDを抽出"""
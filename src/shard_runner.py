@@ -0,0 +1,282 @@
+"""
+シャード分割ランナー（数百〜数千のベンチマークアカウント向け）
+
+accounts.json のアカウントをユーザー名のハッシュで安定的にシャードに分け、
+シャードごとに別プロセス（または別ジョブ・別マシン）で収集する。
+各シャードの結果は output/runs/<run_id>/shards/shard-NNN.json に書き出し、
+マージして1つのランキング済み候補（candidates.json）にまとめる。
+
+- レート: rate_limiting.delay_between_accounts を全シャード合計の上限とし、
+  各シャードはその shard_count 倍の間隔で取得する
+- 書き出し済みのシャードは再実行時にスキップする（途中で落ちても残りだけ取り直す）
+
+使い方:
+    # このマシンで4プロセス並列に収集 → マージ → 分析・リライト
+    python shard_runner.py --shard-count 4 --process
+
+    # 別ジョブとして1シャードずつ実行（同じ run_id・共有ディスク）
+    python shard_runner.py --run-id 20260101_daily --shard-count 8 --shard-index 0
+    ...
+    python shard_runner.py --run-id 20260101_daily --shard-count 8 --merge --process
+"""
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+# 環境変数読み込み（spawn されたワーカーでも読み込まれる）
+load_dotenv()
+
+from account_scheduler import AccountScheduler
+from archive import RunArchive
+from checkpoint import RunCheckpoint, new_run_id
+from cost_governor import CostGovernor
+from tweet_pipeline import TweetPipeline
+from utils import load_json_file, save_json_file, log_info, log_success, log_error
+
+
+def shard_of(username, shard_count):
+    """ユーザー名 → シャード番号（実行・マシンが変わっても同じ）"""
+    name = username.strip().lstrip('@').lower()
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return int(digest[:8], 16) % shard_count
+
+
+def partition(accounts, shard_count):
+    """アカウントをシャードに分ける: [[account, ...], ...]"""
+    shards = [[] for _ in range(shard_count)]
+    for account in accounts:
+        if account.get('username', '').strip().lstrip('@'):
+            shards[shard_of(account['username'], shard_count)].append(account)
+    return shards
+
+
+def shard_path(run_dir, shard_index):
+    return os.path.join(run_dir, 'shards', f'shard-{shard_index:03d}.json')
+
+
+async def _collect(accounts, max_tweets, delay, governor):
+    # 収集だけなので分析・リライト・保存のサービスは作らない
+    engine = TweetPipeline(TweetPipeline.build_scraper(), analyzer=None, rewriter=None,
+                           governor=governor)
+    try:
+        tweets, errors = await engine.collect(accounts, max_tweets=max_tweets, delay=delay)
+    finally:
+        await engine.close()
+    return tweets, errors, [a['username'] for a in engine.polled_accounts]
+
+
+def run_shard(shard_index, shard_count, accounts, max_tweets, delay, run_dir, budget=None):
+    """
+    1シャード分を収集してJSONに書き出す（ワーカープロセスで実行）
+
+    budget: settings.json の budget。1回の実行の上限と1日の残りをシャード数で等分する。
+
+    Returns:
+        dict: {'shard_index', 'accounts', 'tweets', 'errors', 'skipped'}
+    """
+    path = shard_path(run_dir, shard_index)
+    if os.path.exists(path):
+        data = load_json_file(path)
+        return {'shard_index': shard_index, 'accounts': len(data['accounts']),
+                'tweets': len(data['tweets']), 'errors': len(data['errors']), 'skipped': True}
+
+    governor = CostGovernor.from_settings({'budget': budget or {}}).split(shard_count)
+    tweets, errors, polled_accounts = asyncio.run(_collect(accounts, max_tweets, delay, governor))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    save_json_file(tmp_path, {
+        'shard_index': shard_index,
+        'shard_count': shard_count,
+        'accounts': [a['username'] for a in accounts],
+        'tweets': tweets,
+        'errors': errors,
+        # 実際に取得したアカウント（失敗・予算で見送ったものは含まない）
+        'polled_accounts': polled_accounts,
+    })
+    # 書き終わったファイルだけが見えるようにする（マージ側が途中のファイルを読まない）
+    os.replace(tmp_path, path)
+    return {'shard_index': shard_index, 'accounts': len(accounts),
+            'tweets': len(tweets), 'errors': len(errors), 'skipped': False}
+
+
+def run_shards(shards, max_tweets, delay, run_dir, workers, budget=None):
+    """シャードをプロセスプールで並列に収集"""
+    shard_count = len(shards)
+    # ワーカー側で asyncio / スレッドを使うので fork ではなく spawn
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, shard_count)),
+                             mp_context=context) as pool:
+        futures = [
+            pool.submit(run_shard, i, shard_count, accounts, max_tweets, delay, run_dir, budget)
+            for i, accounts in enumerate(shards) if accounts
+        ]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                log_error(f"シャードの収集に失敗: {e}")
+                continue
+            status = 'スキップ（書き出し済み）' if result['skipped'] else '完了'
+            log_success(f"[shard {result['shard_index']}] {status}: {result['accounts']}アカウント、"
+                        f"{result['tweets']}件、エラー{result['errors']}件")
+
+
+def merge_shards(run_dir, shards, min_likes, min_retweets, scheduler=None, checkpoint=None):
+    """
+    シャードの結果をマージしてエンゲージメント順の候補にする
+
+    scheduler（AccountScheduler）と checkpoint（RunCheckpoint）を渡すと、アカウントごとの
+    収穫を記録する。記録済みのシャードは checkpoint に残し、--merge をやり直しても二重に数えない。
+
+    Returns:
+        dict: candidates.json の内容
+            {'shard_count', 'merged_shards', 'missing_shards', 'total_collected',
+             'errors', 'candidates'}
+    """
+    tweets = {}
+    errors = []
+    polled_accounts = {}
+    merged, missing = [], []
+    for i, accounts in enumerate(shards):
+        path = shard_path(run_dir, i)
+        if not os.path.exists(path):
+            if accounts:
+                missing.append(i)
+            continue
+        data = load_json_file(path)
+        merged.append(i)
+        errors += data.get('errors', [])
+        polled_accounts[i] = data.get('polled_accounts', [])
+        for tweet in data['tweets']:
+            # 同じツイートが複数アカウントから取れた場合（RTなど）は1件にする
+            tweets.setdefault(str(tweet.get('id') or tweet.get('url')), tweet)
+
+    candidates = TweetPipeline.filter_viral(list(tweets.values()), min_likes, min_retweets)
+    if scheduler and checkpoint:
+        # 未完了のシャード・取得しなかったアカウントは収穫0として記録しない
+        recorded = set(checkpoint.get_meta('scheduler_recorded_shards') or [])
+        new_shards = [i for i in merged if i not in recorded]
+        if new_shards:
+            polled = [{'username': name} for i in new_shards for name in polled_accounts[i]]
+            scheduler.record_run(polled, list(tweets.values()), candidates)
+            scheduler.save()
+            checkpoint.set_meta('scheduler_recorded_shards', sorted(recorded | set(new_shards)))
+    result = {
+        'shard_count': len(shards),
+        'merged_shards': merged,
+        'missing_shards': missing,
+        'total_collected': len(tweets),
+        'errors': errors,
+        'candidates': candidates,
+    }
+    save_json_file(os.path.join(run_dir, 'candidates.json'), result)
+    return result
+
+
+async def process_candidates(settings, checkpoint, candidates):
+    """マージした候補を 分析 → リライト → 保存（チェックポイントは同じ run_id）"""
+    run_id = checkpoint.run_id
+    governor = CostGovernor.from_settings(settings)
+    engine = TweetPipeline.from_env(
+        archive=RunArchive(source='shard'),
+        sheets_options={'batch_size': 50, 'flush_interval': 30, 'dedupe': True},
+        concurrency=settings['processing'].get('concurrency'),
+        retries=settings['processing'].get('stage_retries', 1),
+        image_tier=settings.get('image_generation', {}).get('tier'),
+        checkpoint=checkpoint,
+        governor=governor
+    )
+    try:
+        tweets_to_analyze, tweets_to_rewrite = governor.plan(
+            settings['processing']['tweets_to_analyze'],
+            settings['processing']['tweets_to_rewrite']
+        )
+        saved = await engine.process(
+            candidates[:tweets_to_analyze],
+            rewrite_limit=tweets_to_rewrite,
+            generate_images=settings['processing']['generate_images']
+        )
+        log_success(f"{len(engine.analyzed)} 件を分析、{len(saved)} 件をリライト・保存")
+        if engine.errors:
+            log_error(f"{len(engine.errors)} 件が途中で失敗しました（--run-id {run_id} --merge --process で再開）")
+        elif not governor.skipped:
+            checkpoint.mark_complete()
+    finally:
+        await engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='アカウントをシャードに分けて並列収集')
+    parser.add_argument('--run-id', help='実行ID（別ジョブで同じシャードセットを扱う場合に指定）')
+    parser.add_argument('--shard-count', type=int,
+                        help='シャード数（省略時は settings.json の collection.sharding.shards、無ければCPU数）')
+    parser.add_argument('--shard-index', type=int, help='このシャードだけを収集して終了（別ジョブ実行用）')
+    parser.add_argument('--workers', type=int, help='並列プロセス数（省略時はシャード数）')
+    parser.add_argument('--merge', action='store_true', help='収集せず、書き出し済みのシャードをマージ')
+    parser.add_argument('--process', action='store_true', help='マージした候補を分析・リライト・保存')
+    args = parser.parse_args()
+
+    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    accounts_config = load_json_file(os.path.join(parent_dir, 'config/accounts.json'))
+    settings = load_json_file(os.path.join(parent_dir, 'config/settings.json'))
+    sharding = settings['collection'].get('sharding', {})
+
+    shard_count = args.shard_count or sharding.get('shards') or os.cpu_count() or 1
+    if args.shard_index is not None and not 0 <= args.shard_index < shard_count:
+        parser.error(f"--shard-index は 0〜{shard_count - 1} で指定してください")
+    if args.shard_index is not None and not args.run_id:
+        parser.error("--shard-index を使う場合は全ジョブで同じ --run-id を指定してください")
+    checkpoint = RunCheckpoint(run_id=args.run_id or new_run_id())
+    try:
+        _run(args, settings, accounts_config, sharding, shard_count, checkpoint)
+    finally:
+        checkpoint.close()
+
+
+def _run(args, settings, accounts_config, sharding, shard_count, checkpoint):
+    run_id = checkpoint.run_id
+    run_dir = checkpoint.run_dir
+
+    # 優先度・過去の収穫率・経過時間で今回収集するアカウントを選ぶ
+    # （同じ run_id の別ジョブ・再実行では最初に選んだアカウントを使う）
+    scheduler = AccountScheduler.from_settings(settings)
+    accounts = scheduler.select_for_run(checkpoint, accounts_config['benchmark_accounts'],
+                                        limit=sharding.get('max_accounts'))
+    shards = partition(accounts, shard_count)
+    max_tweets = settings['collection']['tweets_per_account']
+    # 全シャード合計で delay_between_accounts のレートに収める
+    delay = settings['rate_limiting']['delay_between_accounts'] * shard_count
+
+    log_info(f"実行ID: {run_id} / {len(accounts)}アカウントを{shard_count}シャードに分割")
+
+    if args.shard_index is not None:
+        result = run_shard(args.shard_index, shard_count, shards[args.shard_index],
+                           max_tweets, delay, run_dir, settings.get('budget'))
+        log_success(f"[shard {args.shard_index}] {result['accounts']}アカウント、{result['tweets']}件")
+        return
+
+    if not args.merge:
+        run_shards(shards, max_tweets, delay, run_dir, args.workers or shard_count,
+                   settings.get('budget'))
+
+    threshold = settings['filtering']['engagement_threshold']
+    merged = merge_shards(run_dir, shards, threshold['min_likes'], threshold['min_retweets'],
+                          scheduler=scheduler, checkpoint=checkpoint)
+    if merged['missing_shards']:
+        log_error(f"未完了のシャード: {merged['missing_shards']}")
+    log_success(f"{merged['total_collected']} 件をマージ、候補 {len(merged['candidates'])} 件 "
+                f"→ {os.path.join(run_dir, 'candidates.json')}")
+
+    if args.process and merged['candidates']:
+        asyncio.run(process_candidates(settings, checkpoint, merged['candidates']))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        log_info("\n処理を中断しました")
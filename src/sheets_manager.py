@@ -1,32 +1,108 @@
 """
 Google Sheets保存機能
-- モックモード: CSVファイルに保存
+- モックモード: CSV/JSONLファイルに保存（切り詰めなし）
 - プロダクションモード: 実際のGoogle Sheetsに保存
+  （ローカルSQLiteミラーに同期書き込み → バッチでシートに反映）
+- gspreadの通信は専用スレッドプールで実行し、イベントループを止めない
 """
-import csv
+import asyncio
+import functools
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from results_sink import ResultsSink
+from resilience import RetryPolicy, default_policy, is_rejected, is_retryable, resilient_call
+from results_store import ResultsStore
 from utils import is_mock_mode, log_info, log_success
 
+# 結果シート（A〜O列）とローカルCSVのヘッダー
+HEADERS = [
+    '収集日',
+    '元URL',
+    'カテゴリ',
+    '元ツイート本文',
+    'いいね数',
+    'リツイート数',
+    'リプライ数',
+    'エンゲージメントスコア',
+    'P(dwell)要因',
+    'P(reply)要因',
+    'リライト本文',
+    'スレッド',
+    '問いかけ',
+    '図解画像URL',
+    '画像生成済み'
+]
+
 class SheetsManager:
     """
     Google Sheetsにデータを保存
     - 自動で行を追加
     - Drive共有リンクも管理
     """
-    def __init__(self, credentials_path=None, spreadsheet_id=None):
+    # 追記のリトライ回数（429/5xx時、1分単位のクォータに合わせて他の呼び出しより多め）
+    WRITE_MAX_RETRIES = 5
+
+    # 管理画面用の読み込み列（H〜Jの分析テキストは読まない）
+    ADMIN_READ_RANGES = ('A{start}:G{end}', 'K{start}:O{end}')
+
+    def __init__(self, credentials_path=None, spreadsheet_id=None,
+                 batch_size=1, flush_interval=None, read_cache_ttl=15, store_path=None,
+                 io_workers=4, dedupe=False):
+        """
+        Args:
+            credentials_path: サービスアカウントJSONのパス
+            spreadsheet_id: スプレッドシートID
+            batch_size: この行数たまったら append_rows でまとめて書き込む（1なら即時）
+            flush_interval: 最初の未書き込み行からこの秒数経過したら書き込む（Noneで無効）
+            read_cache_ttl: get_rows の結果をプロセス内にキャッシュする秒数
+            store_path: ローカルミラー（SQLite）のパス。省略時は RESULTS_DB_PATH or output/results.db
+            io_workers: gspread呼び出し用スレッドプールのスレッド数
+            dedupe: Trueなら同じツイート（元URL）が既にシートにあれば save_result で追加しない
+        """
         self.credentials_path = credentials_path
         self.spreadsheet_id = spreadsheet_id
         self.worksheet = None
+
+        # 書き込みバッファ（未反映の行はローカルミラーに溜める）
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.store = None
+        self._store_path = store_path
+        self._sync_lock = asyncio.Lock()
+
+        # 元URL（ツイートID）→ シート行番号 のインデックス（未反映行は None）
+        self.dedupe = dedupe
+        self._row_index = None
+
+        # gspread（同期I/O）専用のスレッドプール
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=max(1, io_workers),
+            thread_name_prefix='sheets-io'
+        )
+        # append_rows は冪等でないので、確実に断られた 429 だけリトライする。
+        # タイムアウト・切断・5xx は反映済みかもしれないので、次の送信前にシートと突き合わせる
+        self._write_policy = RetryPolicy(
+            max_retries=max(self.WRITE_MAX_RETRIES, default_policy.max_retries),
+            base_delay=default_policy.base_delay,
+            max_delay=default_policy.max_delay,
+            retry_on=is_rejected
+        )
+        self._append_uncertain = False
+
+        # 読み込みキャッシュ（書き込み時に破棄）
+        self.read_cache_ttl = read_cache_ttl
+        self._read_cache = {}
+        self._last_row = None
+        self._last_row_expires = 0
         
-        # 親ディレクトリのoutputフォルダを参照
-        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.mock_csv_path = os.path.join(parent_dir, "output/results.csv")
+        # ローカル出力（CSV/JSONL）は最初の書き込み時に開く
+        self.sink = None
         
-        # モックモード用のCSVファイル準備
         if is_mock_mode():
-            os.makedirs(os.path.dirname(self.mock_csv_path), exist_ok=True)
-            self._initialize_mock_csv()
+            log_info("Mock mode: results will be saved to output/results.csv / results.jsonl")
         else:
             # プロダクションモード: Google Sheets初期化
             self._initialize_google_sheets()
@@ -67,63 +143,69 @@ class SheetsManager:
                 self._initialize_sheet_headers()
             
             log_success(f"Google Sheets initialized: {self.spreadsheet_id}")
+            self._initialize_store()
             
         except Exception as e:
             log_info(f"Google Sheets initialization failed: {e}. Falling back to CSV.")
-            # フォールバック: CSVに保存
-            os.makedirs(os.path.dirname(self.mock_csv_path), exist_ok=True)
-            self._initialize_mock_csv()
     
+    def _initialize_store(self):
+        """ローカルミラー（SQLite）の初期化。ファイルが使えなければメモリ上に作る"""
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = (self._store_path or os.getenv('RESULTS_DB_PATH')
+                or os.path.join(parent_dir, 'output', 'results.db'))
+        try:
+            self.store = ResultsStore(path)
+            log_info(f"Local results mirror: {path}")
+        except Exception as e:
+            log_info(f"Local results mirror unavailable ({e}). Using in-memory store.")
+            self.store = ResultsStore(':memory:')
+
+    async def _run_io(self, func, *args, policy=None, **kwargs):
+        """gspreadの同期呼び出しを専用スレッドプールで実行（リトライ・サーキットブレーカー付き）"""
+        return await resilient_call('sheets', self._run_in_executor, func, *args,
+                                    policy=policy, **kwargs)
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._io_executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self):
+        """スレッドプール・ローカルミラー・ローカル出力を閉じる"""
+        self._io_executor.shutdown(wait=True)
+        if self.store:
+            self.store.close()
+        if self.sink:
+            self.sink.close()
+
     def _initialize_sheet_headers(self):
         """スプレッドシートのヘッダー行を初期化"""
-        headers = [
-            '収集日',
-            '元URL',
-            'カテゴリ',
-            '元ツイート本文',
-            'いいね数',
-            'リツイート数',
-            'リプライ数',
-            'エンゲージメントスコア',
-            'P(dwell)要因',
-            'P(reply)要因',
-            'リライト本文',
-            'スレッド',
-            '問いかけ',
-            '図解画像URL',
-            '画像生成済み'
-        ]
-        self.worksheet.append_row(headers)
+        self.worksheet.append_row(HEADERS)
         # ヘッダー行を太字に
         self.worksheet.format('A1:O1', {'textFormat': {'bold': True}})
         log_info("Sheet headers initialized")
     
-    def _initialize_mock_csv(self):
-        """モックCSVファイルのヘッダーを初期化"""
-        if not os.path.exists(self.mock_csv_path):
-            headers = [
-                '収集日',
-                '元URL',
-                'カテゴリ',
-                '元ツイート本文',
-                'いいね数',
-                'リツイート数',
-                'リプライ数',
-                'エンゲージメントスコア',
-                'P(dwell)要因',
-                'P(reply)要因',
-                'リライト本文',
-                'スレッド',
-                '問いかけ',
-                '図解画像URL',
-                '画像生成済み'
-            ]
-            with open(self.mock_csv_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-            log_info(f"Mock CSV initialized: {self.mock_csv_path}")
+    def output_location(self):
+        """結果の保存先（ログ表示用）"""
+        if self.worksheet:
+            return f"Google Sheets ({self.spreadsheet_id})"
+        sink = self._get_sink()
+        return f"{sink.path_for('csv')}（完全版は {sink.path_for('jsonl')}）"
+
+    def _get_sink(self):
+        """ローカル出力（CSV/JSONL）を開く（RESULTS_ROTATE=daily で日付ごとに分割）"""
+        if self.sink is None:
+            parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            rotate = os.getenv('RESULTS_ROTATE') or None
+            self.sink = ResultsSink(
+                os.path.join(parent_dir, 'output'),
+                csv_headers=HEADERS,
+                rotate=rotate if rotate in ('daily',) else None
+            )
+        return self.sink
     
-    async def save_result(self, data):
+    async def save_result(self, data, dedupe=None):
         """
         分析・リライト結果を保存
         
@@ -134,43 +216,250 @@ class SheetsManager:
                 'rewritten': dict,
                 'image_url': str
             }
+            dedupe: 重複チェックの有無（Noneならインスタンスの設定に従う）
+        
+        Returns:
+            bool: 保存した（キューに入れた）か。重複でスキップした場合はFalse
         """
         # モックモードでも、Google Sheetsが利用可能なら保存する
         if self.worksheet:
-            self._save_to_google_sheets(data)
+            key = self._index_key(data['original_tweet'].get('url', ''))
+            if self.dedupe if dedupe is None else dedupe:
+                index = await self._ensure_row_index()
+                if key and key in index:
+                    log_info(f"Skip duplicate: {data['original_tweet'].get('url', '')}")
+                    return False
+            self.store.add_rows([self._build_sheet_row(data)])
+            if key and self._row_index is not None:
+                self._row_index.setdefault(key, None)
+            if self._should_flush():
+                await self.flush()
         else:
             log_info("Google Sheets not available, saving to CSV")
             self._save_to_mock_csv(data)
-    
-    def _save_to_google_sheets(self, data):
-        """Google Sheetsに保存"""
+        return True
+
+    async def upsert_result(self, data):
+        """
+        元URLの行が既にあればその行（A〜M列）を上書き、なければ追加
+
+        画像URL・生成済みフラグ（N〜O列）は上書きしない。
+
+        Returns:
+            int | None: 上書きした行番号（新規追加時はNone）
+        """
+        url = data['original_tweet'].get('url', '')
+        row_number = await self.lookup_by_url(url)
+        if row_number is None and self._index_key(url) in (self._row_index or {}):
+            # 未反映の行があれば書き込んで行番号を確定させる
+            await self.flush()
+            row_number = await self.lookup_by_url(url)
+        if not row_number:
+            await self.save_result(data, dedupe=False)
+            return None
+        values = self._build_sheet_row(data)[:13]
+        await self._run_io(self.worksheet.update, f'A{row_number}:M{row_number}', [values])
+        self.store.update_row_values(row_number, values)
+        self._invalidate_read_cache()
+        log_success(f"Updated existing row {row_number}")
+        return row_number
+
+    async def lookup_by_url(self, url):
+        """
+        元URL（またはツイートID）からシート行番号を取得（O(1)）
+
+        Returns:
+            int | None: 行番号。未登録・未反映ならNone
+        """
+        if not self.worksheet:
+            return None
+        index = await self._ensure_row_index()
+        return index.get(self._index_key(url))
+
+    async def _ensure_row_index(self):
+        """URLインデックスが未構築ならB列（元URL）1列だけ読んで構築"""
+        if self._row_index is None:
+            urls = await self._run_io(self.worksheet.col_values, 2)
+            self._rebuild_row_index(urls[1:])
+            log_info(f"Row index built ({len(self._row_index)} tweets)")
+        return self._row_index
+
+    def _rebuild_row_index(self, urls):
+        """B列の値（2行目以降）からインデックスを作り直す（未反映行のキーは残す）"""
+        index = {}
+        for offset, url in enumerate(urls):
+            key = self._index_key(url)
+            if key:
+                index[key] = offset + 2
+        if self._row_index:
+            for key, row_number in self._row_index.items():
+                if row_number is None:
+                    index.setdefault(key, None)
+        self._row_index = index
+
+    @staticmethod
+    def _index_key(url):
+        """インデックスのキー（ツイートURLならツイートID、それ以外はURLそのもの）"""
+        if not url:
+            return None
+        match = re.search(r'/status/(\w+)', url)
+        return match.group(1) if match else url.strip()
+
+    def _should_flush(self):
+        """バッファの書き込みタイミングか判定（行数 or 経過時間）"""
+        count, oldest = self.store.pending_stats()
+        if count >= self.batch_size:
+            return True
+        if self.flush_interval is not None and oldest is not None:
+            return time.time() - oldest >= self.flush_interval
+        return False
+
+    async def flush(self):
+        """
+        ローカルミラーの未反映行を1回の append_rows でGoogle Sheetsに書き込む
+
+        クォータ超過（429）は指数バックオフでリトライする。
+        失敗した行はミラーに残り、次回の flush / 同期で再送される。
+        反映されたか分からない失敗（タイムアウトなど）の後は、再送の前にB列を読んで
+        すでにシートにある行を除く（二重追加を防ぐ）。
+        未反映の画像URL更新もあわせて送る。
+
+        Returns:
+            int: 書き込んだ行数
+        """
+        if self.sink:
+            self.sink.flush(fsync=True)
+        if not self.worksheet:
+            return 0
+        async with self._sync_lock:
+            written = await self._push_appends()
+            await self._push_image_updates()
+        return written
+
+    async def _push_appends(self):
+        """未反映行をシートに追加"""
+        pending = self.store.pending_appends()
+        if pending and self._append_uncertain:
+            pending = await self._reconcile_appends(pending)
+        if not pending:
+            return 0
+        ids = [row_id for row_id, _ in pending]
+        rows = [values for _, values in pending]
+
         try:
-            row = [
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                data['original_tweet'].get('url', ''),
-                data['original_tweet'].get('category', 'AI×副業'),
-                data['original_tweet']['text'][:500],  # 500文字まで
-                data['original_tweet']['likes'],
-                data['original_tweet']['retweets'],
-                data['original_tweet']['replies'],
-                data['original_tweet'].get('engagement_score', 0),
-                data['analysis']['positive_signals']['dwell_factors'][:300],
-                data['analysis']['positive_signals']['reply_triggers'][:300],
-                data['rewritten']['main_text'][:500],
-                ' | '.join(data['rewritten'].get('thread', []))[:500] if data['rewritten'].get('thread') else '',
-                data['rewritten'].get('call_to_action', ''),
-                data.get('image_url', ''),
-                'FALSE'  # 画像生成済みフラグ（初期値はFALSE）
-            ]
-            
-            self.worksheet.append_row(row)
-            log_success(f"Saved to Google Sheets (ID: {self.spreadsheet_id})")
-            
+            response = await self._run_io(self.worksheet.append_rows, rows,
+                                          policy=self._write_policy)
         except Exception as e:
-            log_info(f"Failed to save to Google Sheets: {e}. Falling back to CSV.")
-            self._save_to_mock_csv(data)
+            self._append_uncertain = is_retryable(e) and not is_rejected(e)
+            log_info(f"Failed to save to Google Sheets: {e}. "
+                     f"{len(rows)} rows kept in {self.store.db_path} for retry.")
+            return 0
+        self._invalidate_read_cache()
+        self._update_last_row(response)
+        first_row = self._first_updated_row(response)
+        log_success(f"Saved {len(rows)} rows to Google Sheets (ID: {self.spreadsheet_id})")
+        if first_row is None:
+            # レスポンスから行番号が取れない場合はB列を読んで行番号を付ける
+            # （読めなければ次回の flush 前に突き合わせる）
+            self._append_uncertain = True
+            await self._reconcile_appends(pending)
+            return len(rows)
+        self.store.mark_appended(ids, first_row)
+        if self._row_index is not None:
+            for offset, values in enumerate(rows):
+                key = self._index_key(values[1])
+                if key:
+                    self._row_index[key] = first_row + offset
+        return len(rows)
+
+    async def _reconcile_appends(self, pending):
+        """
+        シートに反映済みの行に行番号を付け、まだシートに無い行を返す
+
+        B列（元URL）を読み直して突き合わせる。前回の append_rows が反映されたか分からない場合と、
+        append_rows のレスポンスから行番号が取れなかった場合に使う。
+        """
+        try:
+            urls = await self._run_io(self.worksheet.col_values, 2)
+        except Exception as e:
+            log_info(f"Failed to check Google Sheets before re-sending: {e}")
+            return []
+        self._rebuild_row_index(urls[1:])
+        index = self._row_index
+        remaining = []
+        for row_id, values in pending:
+            row_number = index.get(self._index_key(values[1]))
+            if row_number is None:
+                remaining.append((row_id, values))
+            else:
+                self.store.mark_appended([row_id], row_number)
+        if len(remaining) < len(pending):
+            log_info(f"Resolved row numbers for {len(pending) - len(remaining)} rows from Google Sheets")
+        self._append_uncertain = False
+        return remaining
+
+    async def _push_image_updates(self):
+        """ミラーで更新済み・シート未反映の画像URLを送る"""
+        updates = self.store.pending_updates()
+        if not updates:
+            return
+        try:
+            await self._run_io(self._batch_update_image_cells, updates)
+            self._invalidate_read_cache()
+            self.store.mark_updated([row for row, _ in updates])
+        except Exception as e:
+            log_info(f"Failed to sync image URLs: {e}")
+
+    async def pull_remote(self):
+        """シート側の編集をローカルミラーに取り込む（全行読み込み、バックグラウンド用）"""
+        if not self.worksheet:
+            return
+        async with self._sync_lock:
+            values = await self._run_io(self.worksheet.get_all_values)
+            self.store.replace_from_remote(values[1:])
+            self._rebuild_row_index([row[1] if len(row) > 1 else '' for row in values[1:]])
+            self._invalidate_read_cache()
+        log_info(f"Pulled {max(0, len(values) - 1)} rows from Google Sheets into local mirror")
+
+    @staticmethod
+    def _first_updated_row(response):
+        """append_rows のレスポンスから追加された先頭行番号を取得"""
+        try:
+            updated_range = response['updates']['updatedRange']
+            return int(re.search(r'![A-Z]+(\d+)', updated_range).group(1))
+        except Exception:
+            return None
+
+    def _build_sheet_row(self, data, full=False):
+        """
+        結果シート（A〜O列）の1行を組み立てる
+
+        Args:
+            full: Trueなら切り詰めない（ローカル出力用）。Falseならセル用に500/300文字まで
+        """
+        def clip(text, limit):
+            return text if full else text[:limit]
+
+        thread = data['rewritten'].get('thread') or []
+        return [
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            data['original_tweet'].get('url', ''),
+            data['original_tweet'].get('category', 'AI×副業'),
+            clip(data['original_tweet']['text'], 500),
+            data['original_tweet']['likes'],
+            data['original_tweet']['retweets'],
+            data['original_tweet']['replies'],
+            data['original_tweet'].get('engagement_score', 0),
+            clip(data['analysis']['positive_signals']['dwell_factors'], 300),
+            clip(data['analysis']['positive_signals']['reply_triggers'], 300),
+            clip(data['rewritten']['main_text'], 500),
+            clip(' | '.join(thread), 500),
+            data['rewritten'].get('call_to_action', ''),
+            data.get('image_url') or '',
+            'FALSE'  # 画像生成済みフラグ（初期値はFALSE）
+        ]
     
-    def update_image_url(self, row_number, image_url):
+    async def update_image_url(self, row_number, image_url):
         """
         指定行の画像URLを更新
         
@@ -178,12 +467,29 @@ class SheetsManager:
             row_number: 行番号（2から開始、1はヘッダー）
             image_url: 生成した画像のURL
         """
+        return await self.update_image_urls([(row_number, image_url)])
+    
+    async def update_image_urls(self, updates):
+        """
+        複数行の画像URL（N列）と画像生成済みフラグ（O列）を1回の batch_update で更新
+        
+        Args:
+            updates: [(row_number, image_url), ...]
+        
+        Returns:
+            bool: 更新に成功したか
+        """
+        updates = [(row, url) for row, url in updates if url]
+        if not updates:
+            return False
         try:
             if not is_mock_mode() and self.worksheet:
-                # 画像URL列（N列）と画像生成済みフラグ（O列）を更新
-                self.worksheet.update_cell(row_number, 14, image_url)
-                self.worksheet.update_cell(row_number, 15, 'TRUE')
-                log_success(f"Updated image URL for row {row_number}")
+                # ミラーを先に更新（シート反映に失敗しても同期で再送される）
+                self.store.set_image_urls(updates)
+                await self._run_io(self._batch_update_image_cells, updates)
+                self._invalidate_read_cache()
+                self.store.mark_updated([row for row, _ in updates])
+                log_success(f"Updated image URL for {len(updates)} rows")
                 return True
             else:
                 log_info("Mock mode: Cannot update Sheet directly")
@@ -192,7 +498,36 @@ class SheetsManager:
             log_info(f"Failed to update image URL: {e}")
             return False
     
-    def get_row_data(self, row_number):
+    async def update_image_url_by_url(self, original_url, image_url):
+        """
+        元ツイートURLで行を特定して画像URLを更新
+
+        シート未反映の行ならミラーの行に書き込み、次回の append で一緒に送る。
+
+        Returns:
+            bool: 更新した（または反映待ちにした）か
+        """
+        if not image_url or is_mock_mode() or not self.worksheet:
+            return False
+        # flush（append中）と競合しないよう同期ロックの中で行を特定する
+        async with self._sync_lock:
+            row_number = await self.lookup_by_url(original_url)
+            if not row_number:
+                if self.store.set_pending_image_url(original_url, image_url):
+                    log_info(f"Image URL queued with pending row: {original_url}")
+                    return True
+                log_info(f"Row not found for image update: {original_url}")
+                return False
+        return await self.update_image_urls([(row_number, image_url)])
+
+    def _batch_update_image_cells(self, updates):
+        """N列（URL）とO列（フラグ）を1回の batch_update で書き込む"""
+        self.worksheet.batch_update([
+            {'range': f'N{row}:O{row}', 'values': [[url, 'TRUE']]}
+            for row, url in updates
+        ])
+    
+    async def get_row_data(self, row_number):
         """
         指定行のデータを取得
         
@@ -204,50 +539,160 @@ class SheetsManager:
         """
         try:
             if not is_mock_mode() and self.worksheet:
-                values = self.worksheet.row_values(row_number)
+                if self.store.is_hydrated():
+                    values = self.store.get_row(row_number) or []
+                else:
+                    values = await self._run_io(self.worksheet.row_values, row_number)
                 if len(values) >= 13:
-                    return {
-                        'row_number': row_number,
-                        'collected_date': values[0],
-                        'original_url': values[1],
-                        'category': values[2],
-                        'original_text': values[3],
-                        'likes': values[4],
-                        'retweets': values[5],
-                        'replies': values[6],
-                        'rewritten_text': values[10],
-                        'thread': values[11],
-                        'call_to_action': values[12],
-                        'image_url': values[13] if len(values) > 13 else '',
-                        'image_generated': values[14] if len(values) > 14 else 'FALSE'
-                    }
+                    return self._row_to_dict(row_number, values)
             return None
         except Exception as e:
             log_info(f"Failed to get row data: {e}")
             return None
     
+    async def get_rows(self, limit=50, cursor=None):
+        """
+        管理画面用に新しい順で行を取得
+
+        ローカルミラーが同期済みならそこから返す。未同期の間はシート全体を読まず、
+        必要な行範囲・列だけを batch_get で取得して短期キャッシュする。
+
+        Args:
+            limit: 取得する行数
+            cursor: 前ページの next_cursor（この行番号より古い行を返す）。Noneなら最新から
+
+        Returns:
+            dict: {'rows': list[dict], 'next_cursor': int | None}
+        """
+        # ミラーがシートと同期済みならローカルから返す
+        if self.store and self.store.is_hydrated():
+            rows, next_cursor = self.store.list_rows(limit=limit, cursor=cursor)
+            return {
+                'rows': [self._row_to_dict(row_number, values) for row_number, values in rows],
+                'next_cursor': next_cursor
+            }
+
+        key = (cursor, limit)
+        cached = self._read_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        last_row = await self._get_last_row()
+        end = min(last_row, cursor - 1) if cursor else last_row
+        if end < 2:
+            result = {'rows': [], 'next_cursor': None}
+        else:
+            start = max(2, end - limit + 1)
+            ranges = [r.format(start=start, end=end) for r in self.ADMIN_READ_RANGES]
+            left, right = await self._run_io(self.worksheet.batch_get, ranges)
+
+            rows = []
+            for offset in range(end - start + 1):
+                head = list(left[offset]) if offset < len(left) else []
+                tail = list(right[offset]) if offset < len(right) else []
+                if not head and not tail:
+                    continue
+                values = (head + [''] * 7)[:7] + ['', '', ''] + tail
+                rows.append(self._row_to_dict(start + offset, values))
+            rows.reverse()
+            result = {'rows': rows, 'next_cursor': start if start > 2 else None}
+
+        self._read_cache[key] = (time.monotonic() + self.read_cache_ttl, result)
+        return result
+
+    async def _get_last_row(self):
+        """データが入っている最終行番号（A列1列だけ読んでキャッシュ）"""
+        if self._last_row is None or time.monotonic() >= self._last_row_expires:
+            self._last_row = len(await self._run_io(self.worksheet.col_values, 1))
+            self._last_row_expires = time.monotonic() + self.read_cache_ttl
+        return self._last_row
+
+    def _update_last_row(self, response):
+        """append_rows のレスポンス（updatedRange）から最終行を更新"""
+        try:
+            updated_range = response['updates']['updatedRange']
+            self._last_row = int(re.search(r'(\d+)$', updated_range).group(1))
+            self._last_row_expires = time.monotonic() + self.read_cache_ttl
+        except Exception:
+            self._last_row = None
+
+    def _invalidate_read_cache(self):
+        """書き込み後に読み込みキャッシュを破棄"""
+        self._read_cache.clear()
+        self._last_row = None
+
+    @staticmethod
+    def _row_to_dict(row_number, values):
+        """シートの1行（A〜O列）を管理画面用の辞書に変換"""
+        return {
+            'row_number': row_number,
+            # シートにまだ追加されていない行（行番号が無いので行の操作はできない）
+            'pending': row_number is None,
+            'collected_date': values[0],
+            'original_url': values[1],
+            'category': values[2],
+            'original_text': values[3],
+            'likes': values[4],
+            'retweets': values[5],
+            'replies': values[6],
+            'rewritten_text': values[10] if len(values) > 10 else '',
+            'thread': values[11] if len(values) > 11 else '',
+            'call_to_action': values[12] if len(values) > 12 else '',
+            'image_url': values[13] if len(values) > 13 else '',
+            'image_generated': values[14] if len(values) > 14 else 'FALSE'
+        }
+
     def _save_to_mock_csv(self, data):
-        """モックCSVファイルに保存"""
-        row = [
-            datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            data['original_tweet'].get('url', ''),
-            data['original_tweet'].get('category', ''),
-            data['original_tweet']['text'][:100] + '...',  # 100文字まで
-            data['original_tweet']['likes'],
-            data['original_tweet']['retweets'],
-            data['original_tweet']['replies'],
-            data['original_tweet'].get('engagement_score', 0),
-            data['analysis']['positive_signals']['dwell_factors'][:100] + '...',
-            data['analysis']['positive_signals']['reply_triggers'][:100] + '...',
-            data['rewritten']['main_text'][:100] + '...',
-            ' | '.join(data['rewritten'].get('thread', []))[:100] + '...' if data['rewritten'].get('thread') else '',
-            data['rewritten'].get('call_to_action', ''),
-            data.get('image_url', ''),
-            'FALSE'  # 画像生成済みフラグ
-        ]
-        
-        with open(self.mock_csv_path, 'a', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
-        
-        log_success(f"Saved to {self.mock_csv_path}")
+        """ローカルのCSV/JSONLに保存（切り詰めなしの完全なレコード）"""
+        collected_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        row = self._build_sheet_row(data, full=True)
+        row[0] = collected_at
+        record = {'collected_at': collected_at, **data}
+        sink = self._get_sink()
+        sink.write(record, row)
+        log_success(f"Saved to {sink.path_for('csv')}")
+
+
+class SheetsSyncer:
+    """
+    SheetsManager のローカルミラーをバックグラウンドでGoogle Sheetsと同期
+
+    - push_interval ごとに未反映の行・画像URLをバッチ送信
+    - pull_interval ごとにシート側の編集を取り込む
+    """
+    def __init__(self, sheets, push_interval=5, pull_interval=300):
+        self.sheets = sheets
+        self.push_interval = push_interval
+        self.pull_interval = pull_interval
+        self._task = None
+
+    def start(self):
+        """同期タスクを開始（Sheets未接続なら何もしない）"""
+        if self._task is None and self.sheets.worksheet:
+            self._task = asyncio.create_task(self._run())
+            log_info(f"Sheets syncer started (push {self.push_interval}s, pull {self.pull_interval}s)")
+
+    async def stop(self):
+        """同期タスクを止め、残りを書き込む"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sheets.flush()
+
+    async def _run(self):
+        last_pull = None
+        while True:
+            try:
+                if last_pull is None or time.monotonic() - last_pull >= self.pull_interval:
+                    await self.sheets.pull_remote()
+                    last_pull = time.monotonic()
+                await self.sheets.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_info(f"Sheets sync failed: {e}")
+            await asyncio.sleep(self.push_interval)
@@ -0,0 +1,419 @@
+"""
+バズ投稿生成パイプライン（main.py / manual_mode.py / api.py 共通）
+
+収集 → フィルタ → 分析 → リライト → 画像 → 保存 の流れを1か所で定義する。
+各ステージの並列数・リトライ・メトリクスは pipeline.Pipeline が扱う。
+
+使い方:
+    engine = TweetPipeline.from_env(image_tier='template')
+    tweets, errors = await engine.collect([{'username': 'foo', 'category': 'AI×副業'}], max_tweets=50)
+    viral = TweetPipeline.filter_viral(tweets, min_likes=500, min_retweets=50)
+    items = await engine.process(viral[:10], rewrite_limit=5)
+    await engine.close()
+
+アイテム（process の戻り値）:
+    {'index', 'original', 'analysis', 'rewritten', 'image_url'}
+
+governor（cost_governor.CostGovernor）を渡すと、X API・Gemini・画像生成の実際の使用量を数え、
+予算を超える呼び出しは行わない（そのアイテムはそこで打ち切る）。
+
+checkpoint（checkpoint.RunCheckpoint）を渡すと、収集・取得・分析・リライト・画像・保存の
+結果をステージごとに記録し、同じ run_id で再実行したときは記録済みの分をやり直さない。
+"""
+import asyncio
+import contextlib
+import os
+from collections import Counter
+from analyzer import TweetAnalyzer
+from guest_token_manager import GuestTokenManager
+from image_generator import InfographicGenerator
+from pipeline import Pipeline, Stage
+from rewriter import TweetRewriter
+from scraper import XScraper
+from sheets_manager import SheetsManager
+from utils import log_info, log_success
+
+DEFAULT_CONCURRENCY = {
+    'fetch': 3,
+    'analyze': 3,
+    'rewrite': 2,
+    'image': 2,
+    'save': 1,
+}
+
+
+class TweetPipeline:
+    """
+    収集・分析・リライト・画像生成・保存のエンジン
+
+    渡されなかったサービス（sheets / image_gen）は from_env で生成し、close() で閉じる。
+    """
+    def __init__(self, scraper, analyzer, rewriter, image_gen=None, sheets=None, archive=None,
+                 concurrency=None, retries=1, image_tier=None, after_save=None,
+                 checkpoint=None, governor=None, queue_size=10, owned=()):
+        """
+        Args:
+            concurrency: ステージ名 → 並列数（DEFAULT_CONCURRENCY を上書き）
+            retries: 外部API呼び出しステージ（fetch / analyze / rewrite / image）のリトライ回数
+            image_tier: 画像のティア（'template' / 'model'）
+            after_save: 保存直後に呼ぶコルーチン関数 after_save(item)（APIの画像ジョブ登録など）
+            checkpoint: RunCheckpoint（途中から再開する場合）
+            governor: CostGovernor（予算の管理）
+            queue_size: ステージ間のキューの上限（入力を先読みする件数）
+            owned: close() で閉じるサービス
+        """
+        self.scraper = scraper
+        self.analyzer = analyzer
+        self.rewriter = rewriter
+        self.image_gen = image_gen
+        self.sheets = sheets
+        self.archive = archive
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.retries = retries
+        self.image_tier = image_tier
+        self.after_save = after_save
+        self.checkpoint = checkpoint
+        self.governor = governor
+        self.queue_size = queue_size
+        self.restored = Counter()  # チェックポイントから復元したステージごとの件数
+        self.failed_accounts = []  # 直近の collect で取得に失敗したアカウント
+        self.polled_accounts = []  # 直近の collect で実際に取得した（または復元した）アカウント
+        self._owned = list(owned)
+        self.analyzed = []
+        self.last_pipeline = None
+
+    @classmethod
+    def from_env(cls, sheets=None, image_gen=None, archive=None, sheets_options=None, **kwargs):
+        """
+        環境変数の認証情報からサービスを組み立てる
+
+        Args:
+            sheets / image_gen: 共有インスタンス（APIなど）。Noneならここで生成して所有する
+            sheets_options: SheetsManager を生成する場合の追加引数
+        """
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        credentials_path = (os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+                            or os.path.join(parent_dir, 'config', 'credentials.json'))
+        owned = []
+
+        scraper = cls.build_scraper()
+        analyzer = TweetAnalyzer(gemini_api_key=os.getenv('GEMINI_API_KEY'))
+        rewriter = TweetRewriter(gemini_api_key=os.getenv('GEMINI_API_KEY'))
+        if image_gen is None:
+            image_gen = InfographicGenerator(
+                project_id=os.getenv('GCP_PROJECT_ID'),
+                location='us-central1',
+                credentials_path=credentials_path,
+                gemini_api_key=os.getenv('GEMINI_API_KEY'),
+                bucket_name=os.getenv('GCS_BUCKET_NAME'),
+                tier=kwargs.get('image_tier')
+            )
+            owned.append(image_gen)
+        if sheets is None:
+            sheets = SheetsManager(
+                credentials_path=credentials_path,
+                spreadsheet_id=os.getenv('SPREADSHEET_ID'),
+                **(sheets_options or {})
+            )
+            owned.append(sheets)
+        return cls(scraper, analyzer, rewriter, image_gen=image_gen, sheets=sheets,
+                   archive=archive, owned=owned, **kwargs)
+
+    @staticmethod
+    def build_scraper():
+        """収集だけ行う場合（シャードのワーカーなど）のスクレイパー"""
+        return XScraper(
+            GuestTokenManager(),
+            proxy_manager=None,
+            twitter_bearer_token=os.getenv('TWITTER_BEARER_TOKEN')
+        )
+
+    # ─── 収集・フィルタ ───
+
+    async def collect(self, accounts, max_tweets, delay=1.0):
+        """
+        アカウントのタイムラインから収集
+
+        Args:
+            accounts: [{'username': str, 'category': str}, ...]
+            max_tweets: 1アカウントあたりの取得数
+            delay: アカウント間の待機秒数
+
+        Returns:
+            tuple: (tweets, errors)
+        """
+        tweets = []
+        errors = []
+        self.failed_accounts = []
+        self.polled_accounts = []
+        paid = self.governor and getattr(self.scraper, 'uses_paid_api', False)
+        for i, account in enumerate(accounts, 1):
+            username = account['username'].strip().lstrip('@')
+            if not username:
+                continue
+            fetched = self._restore('collect', username)
+            if fetched is not None:
+                log_info(f"[{i}/{len(accounts)}] @{username}: チェックポイントから{len(fetched)}件を復元")
+                tweets.extend(fetched)
+                self.polled_accounts.append(account)
+                continue
+            if paid and not self.governor.allow('x_account', max_tweets):
+                # 残りのアカウントは取得していないので polled_accounts に入れない
+                log_info(f"予算の上限のため残り{len(accounts) - i + 1}アカウントの収集を停止")
+                break
+            log_info(f"[{i}/{len(accounts)}] @{username} から収集中...")
+            try:
+                async with self._reserved('x_account' if paid else None):
+                    fetched = await self.scraper.scrape_account_timeline(
+                        username=username,
+                        max_tweets=max_tweets
+                    )
+            except Exception as e:
+                errors.append(f"@{username}: {e}")
+                self.failed_accounts.append(username)
+                log_info(f"  → 収集失敗: {e}")
+                # 失敗したアカウントは記録せず、再開時に取り直す
+                if delay and i < len(accounts):
+                    await asyncio.sleep(delay)
+                continue
+            for tweet in fetched:
+                tweet['category'] = account.get('category') or 'AI×副業'
+                tweet['account'] = username
+            if paid:
+                self.governor.record_x_reads(len(fetched), user_lookups=1)
+            tweets.extend(fetched)
+            self.polled_accounts.append(account)
+            self._record('collect', username, fetched)
+            log_success(f"  → {len(fetched)}件のツイートを取得")
+            if delay and i < len(accounts):
+                await asyncio.sleep(delay)
+        if self.archive:
+            self.archive.add_tweets(tweets)
+        return tweets, errors
+
+    @staticmethod
+    def filter_viral(tweets, min_likes, min_retweets):
+        """エンゲージメント閾値を満たすツイートをエンゲージメント順に返す"""
+        viral = [
+            t for t in tweets
+            if t['likes'] >= min_likes and t['retweets'] >= min_retweets
+        ]
+        viral.sort(key=lambda t: t['engagement_score'], reverse=True)
+        return viral
+
+    # ─── 分析 → リライト → 画像 → 保存 ───
+
+    async def process(self, tweets, rewrite_limit=None, generate_images=False):
+        """
+        ツイートを 分析 → リライト → (画像) → 保存 に流す
+
+        Args:
+            tweets: 分析するツイート（エンゲージメント順）
+            rewrite_limit: リライトする上位件数（Noneなら全件）
+            generate_images: 画像をパイプライン内で生成するか
+
+        Returns:
+            list[dict]: 保存まで終わったアイテム（入力順）
+        """
+        items = [{'index': i, 'original': tweet} for i, tweet in enumerate(tweets)]
+        return await self._run(items, len(tweets), rewrite_limit, generate_images, fetch=False)
+
+    async def process_urls(self, urls, generate_images=False, on_result=None, on_error=None,
+                           collect=True):
+        """
+        ツイートURLから 取得 → 分析 → リライト → (画像) → 保存
+
+        Args:
+            urls: URLのリスト、または非同期イテラブル（ファイル・標準入力から逐次読む場合）
+            on_result: 保存まで終わったアイテムごとに on_result(item) を呼ぶ（完了順）
+            on_error: 失敗したアイテムごとに on_error(stage, item, exception) を呼ぶ
+            collect: False なら結果・分析済み・エラーをメモリに溜めない（戻り値は空、
+                件数は metrics()）。大量のURLを流す場合用
+        """
+        if hasattr(urls, '__aiter__'):
+            items = self._index_stream(urls)
+            total = None
+        else:
+            items = [{'index': i, 'url': url} for i, url in enumerate(urls)]
+            total = len(items)
+        return await self._run(items, total, None, generate_images, fetch=True,
+                               on_result=on_result, on_error=on_error, collect=collect)
+
+    @staticmethod
+    async def _index_stream(urls):
+        index = 0
+        async for url in urls:
+            yield {'index': index, 'url': url}
+            index += 1
+
+    async def _run(self, items, total, rewrite_limit, generate_images, fetch,
+                   on_result=None, on_error=None, collect=True):
+        self.analyzed = []
+        if total is not None:
+            rewrite_limit = total if rewrite_limit is None else min(rewrite_limit, total)
+        # 件数が分からない入力（ストリーム）は「?」と表示
+        total_label = '?' if total is None else total
+        rewrite_label = '?' if rewrite_limit is None else rewrite_limit
+
+        async def fetch_tweet(item):
+            tweet = self._restore('fetch', item['url'])
+            if tweet is None:
+                paid = self.governor and getattr(self.scraper, 'uses_paid_api', False)
+                if paid and not self.governor.allow('x_tweet'):
+                    return None
+                async with self._reserved('x_tweet' if paid else None):
+                    tweet = await self.scraper.scrape_tweet_by_url(item['url'])
+                if paid:
+                    self.governor.record_x_reads(1)
+                if not tweet:
+                    raise RuntimeError(f"ツイートの取得に失敗しました: {item['url']}")
+                self._record('fetch', item['url'], tweet)
+            item['original'] = tweet
+            log_success(f"[取得 {item['index'] + 1}/{total_label}] いいね {tweet['likes']:,} / "
+                        f"エンゲージメント {tweet['engagement_score']:,.0f}")
+            return item
+
+        async def analyze(item):
+            tweet = item['original']
+            item['analysis'] = self._restore('analyze', self._key(tweet))
+            if item['analysis'] is None:
+                if self.governor and not self.governor.allow('analyze'):
+                    return None
+                async with self._reserved('analyze'):
+                    item['analysis'] = await self.analyzer.analyze_tweet(tweet, on_usage=self._on_usage)
+                self._record('analyze', self._key(tweet), item['analysis'])
+            if self.archive:
+                self.archive.add_analysis(tweet, item['analysis'])
+            if collect:
+                self.analyzed.append(item)
+            scores = item['analysis']['scores']
+            log_success(f"[分析 {item['index'] + 1}/{total_label}] P(dwell): {scores['dwell_potential']}/10, "
+                        f"P(reply): {scores['reply_potential']}/10")
+            # リライト対象はエンゲージメント上位 rewrite_limit 件のみ
+            return item if rewrite_limit is None or item['index'] < rewrite_limit else None
+
+        async def rewrite(item):
+            key = self._key(item['original'])
+            item['rewritten'] = self._restore('rewrite', key)
+            if item['rewritten'] is None:
+                if self.governor and not self.governor.allow('rewrite'):
+                    return None
+                async with self._reserved('rewrite'):
+                    item['rewritten'] = await self.rewriter.rewrite_tweet(
+                        item['original'], item['analysis'], on_usage=self._on_usage
+                    )
+                self._record('rewrite', key, item['rewritten'])
+            thread = item['rewritten'].get('thread') or []
+            log_success(f"[リライト {item['index'] + 1}/{rewrite_label}] "
+                        f"{len(item['rewritten']['main_text'])}文字"
+                        + (f"、スレッド{len(thread)}件" if thread else ""))
+            return item
+
+        async def generate_image(item):
+            key = self._key(item['original'])
+            item['image_url'] = self._restore('image', key)
+            if item['image_url'] is None:
+                tier = self.image_gen.resolve_tier(self.image_tier)
+                if tier == 'model' and self.governor and not self.governor.allow('image'):
+                    # 画像なしで保存まで進める
+                    item['image_url'] = ''
+                    return item
+                async with self._reserved('image' if tier == 'model' else None):
+                    item['image_url'] = await self.image_gen.generate_infographic(
+                        item['rewritten'], tier=self.image_tier, on_usage=self._on_usage
+                    )
+                self._record('image', key, item['image_url'])
+            log_success(f"[画像 {item['index'] + 1}/{rewrite_label}] {item['image_url'] or '生成なし'}")
+            return item
+
+        async def save(item):
+            image_url = item.get('image_url') or None
+            if self.archive:
+                self.archive.add_rewrite(item['original'], item['rewritten'], image_url)
+            key = self._key(item['original'])
+            if self._restore('save', key):
+                # 前回の実行で保存済み（同じ行を二重に書かない）
+                return item
+            if self.sheets:
+                await self.sheets.save_result({
+                    'original_tweet': item['original'],
+                    'analysis': item['analysis'],
+                    'rewritten': item['rewritten'],
+                    'image_url': image_url
+                })
+            self._record('save', key, True)
+            if self.after_save:
+                await self.after_save(item)
+            return item
+
+        stages = []
+        if fetch:
+            stages.append(self._stage('fetch', fetch_tweet))
+        stages += [self._stage('analyze', analyze), self._stage('rewrite', rewrite)]
+        if generate_images and self.image_gen:
+            stages.append(self._stage('image', generate_image))
+        stages.append(Stage('save', save, self.concurrency['save']))
+
+        self.last_pipeline = Pipeline(stages, queue_size=self.queue_size)
+        done = await self.last_pipeline.run(items, on_result=on_result, on_error=on_error,
+                                            collect=collect)
+        self.last_pipeline.log_metrics()
+        return sorted(done, key=lambda item: item['index'])
+
+    @staticmethod
+    def _key(tweet):
+        """チェックポイントのキー（ツイートID、無ければURL）"""
+        return str(tweet.get('id') or tweet.get('url'))
+
+    @contextlib.asynccontextmanager
+    async def _reserved(self, kind):
+        """allow() で予約した予算を、呼び出しが終わったら（失敗しても）返す"""
+        try:
+            yield
+        finally:
+            if self.governor and kind:
+                self.governor.release(kind)
+
+    @property
+    def _on_usage(self):
+        return self.governor.record_usage if self.governor else None
+
+    def _restore(self, stage, key):
+        """チェックポイントに記録済みの出力（無ければ None）"""
+        if not self.checkpoint:
+            return None
+        value = self.checkpoint.get(stage, key)
+        if value is not None:
+            self.restored[stage] += 1
+        return value
+
+    def _record(self, stage, key, value):
+        if self.checkpoint:
+            self.checkpoint.put(stage, key, value)
+
+    def _stage(self, name, handler):
+        """外部API呼び出しのステージ（リトライあり）"""
+        return Stage(name, handler, self.concurrency[name], retries=self.retries)
+
+    @property
+    def errors(self):
+        """直近の実行で失敗したアイテム: [(stage, item, exception), ...]"""
+        return self.last_pipeline.errors if self.last_pipeline else []
+
+    def metrics(self):
+        return self.last_pipeline.metrics() if self.last_pipeline else {}
+
+    async def close(self):
+        """未反映の行を書き込み、アーカイブ・コストを書き出し、所有しているサービスを閉じる"""
+        if self.sheets:
+            await self.sheets.flush()
+        if self.archive:
+            await asyncio.to_thread(self.archive.write)
+        if self.governor:
+            self.governor.commit()
+        for service in self._owned:
+            service.close()
+        self._owned = []
+        if self.checkpoint:
+            self.checkpoint.close()
+            self.checkpoint = None
@@ -13,7 +13,9 @@ https://github.com/HayattiQ/x-research-skills
 import asyncio
 import json
 import os
+import time
 from datetime import datetime, timedelta
+from resilience import resilient_call
 from utils import is_mock_mode, log_info, log_error, log_success
 
 
@@ -23,12 +25,25 @@ class XResearcher:
     Grokが使えない場合はGeminiにフォールバック
     """
 
-    def __init__(self, xai_api_key=None, gemini_api_key=None):
+    XAI_BASE_URL = "https://api.x.ai/v1"
+
+    def __init__(self, xai_api_key=None, gemini_api_key=None,
+                 max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry=60.0, timeout=120.0):
         self.xai_api_key = xai_api_key
         self.gemini_api_key = gemini_api_key
         self._grok_available = bool(xai_api_key)
         self._gemini_model = None
 
+        # xAI HTTPクライアント（初回利用時に生成し、インスタンス内で使い回す）
+        self._http_client = None
+        self._http_limits = {
+            "max_connections": max_connections,
+            "max_keepalive_connections": max_keepalive_connections,
+            "keepalive_expiry": keepalive_expiry,
+        }
+        self._http_timeout = timeout
+
         if xai_api_key:
             log_info("xAI Grok researcher initialized (x_search enabled)")
         elif gemini_api_key and not is_mock_mode():
@@ -40,6 +55,50 @@ class XResearcher:
             except Exception as e:
                 log_info(f"Gemini researcher init failed: {e}")
 
+    def _get_http_client(self):
+        """
+        xAI API用の共有AsyncClientを取得
+
+        コネクションプール＋keep-alive（h2があればHTTP/2）で
+        TLSハンドシェイクを毎回払わないようにする
+        """
+        if self._http_client is None or self._http_client.is_closed:
+            import httpx
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._http_client = httpx.AsyncClient(
+                base_url=self.XAI_BASE_URL,
+                http2=http2,
+                limits=httpx.Limits(**self._http_limits),
+                timeout=httpx.Timeout(self._http_timeout, connect=10.0),
+                headers={
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.xai_api_key}",
+                },
+            )
+            log_info(f"xAI HTTP client created (http2={http2}, "
+                     f"max_connections={self._http_limits['max_connections']})")
+        return self._http_client
+
+    async def _xai_post(self, path, payload):
+        """xAI APIにPOSTしてJSONを返す（全xAI呼び出しの共通入口、リトライ・サーキットブレーカー付き）"""
+        return await resilient_call('xai', self._xai_post_once, path, payload)
+
+    async def _xai_post_once(self, path, payload):
+        client = self._get_http_client()
+        resp = await client.post(path, json=payload)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def aclose(self):
+        """HTTPクライアントを閉じる（アプリ終了時に呼ぶ）"""
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+
     async def research_topic(self, topic, locale="ja", audience="both", days=7):
         """
         トピックについてXのリアルタイム情報をリサーチ
@@ -92,6 +151,67 @@ class XResearcher:
 
         return self._get_mock_viral_analysis(topic)
 
+    async def research_topics(self, topics, locale="ja", audience="both", days=7,
+                              count=10, concurrency=5, timeout=180.0):
+        """
+        複数トピックを並列にリサーチし、完了した順にContext Packを返す
+
+        各トピックで research_topic と analyze_viral_patterns を同時に実行する。
+        全トピック共通のセマフォで同時実行数を制限し、トピックごとにタイムアウトを設ける。
+
+        Args:
+            topics: トピックのリスト
+            locale / audience / days: research_topic と同じ
+            count: analyze_viral_patterns の素材数
+            concurrency: 同時に処理するトピック数の上限
+            timeout: 1トピックあたりのタイムアウト（秒）
+
+        Yields:
+            dict: {
+                'topic': str,
+                'status': 'ok' | 'timeout' | 'error',
+                'research': dict | None,
+                'viral_analysis': dict | None,
+                'elapsed_sec': float,
+                'error': str  # 失敗時のみ
+            }
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _run(topic):
+            async with semaphore:
+                started = time.monotonic()
+                pack = {'topic': topic, 'research': None, 'viral_analysis': None}
+                try:
+                    research, viral = await asyncio.wait_for(
+                        asyncio.gather(
+                            self.research_topic(topic, locale=locale, audience=audience, days=days),
+                            self.analyze_viral_patterns(topic, count=count),
+                        ),
+                        timeout=timeout,
+                    )
+                    pack.update(status='ok', research=research, viral_analysis=viral)
+                except asyncio.TimeoutError:
+                    log_error(f"Research timed out for '{topic}' ({timeout}s)")
+                    pack.update(status='timeout', error=f"timeout after {timeout}s")
+                except Exception as e:
+                    log_error(f"Research failed for '{topic}': {e}")
+                    pack.update(status='error', error=str(e))
+                pack['elapsed_sec'] = round(time.monotonic() - started, 2)
+                return pack
+
+        # 重複トピックは1回だけ処理
+        unique_topics = list(dict.fromkeys(t.strip() for t in topics if t and t.strip()))
+        tasks = [asyncio.create_task(_run(t)) for t in unique_topics]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 呼び出し側が途中で切断した場合は残りをキャンセル
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     async def _research_with_grok(self, topic, locale, audience, days):
         """xAI Grok API (x_search) でリサーチ"""
         log_info(f"Grok x_search: researching '{topic}'")
@@ -157,24 +277,12 @@ class XResearcher:
 """
 
         try:
-            import httpx
             payload = {
                 "model": "grok-3-fast",
                 "input": prompt,
                 "tools": [{"type": "x_search"}],
             }
-
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                resp = await client.post(
-                    "https://api.x.ai/v1/responses",
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.xai_api_key}",
-                    },
-                    json=payload,
-                )
-                resp.raise_for_status()
-                data = resp.json()
+            data = await self._xai_post("/responses", payload)
 
             text = self._extract_grok_text(data)
             result = self._parse_json_response(text)
@@ -239,24 +347,12 @@ class XResearcher:
 """
 
         try:
-            import httpx
             payload = {
                 "model": "grok-3-fast",
                 "input": prompt,
                 "tools": [{"type": "x_search"}],
             }
-
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                resp = await client.post(
-                    "https://api.x.ai/v1/responses",
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.xai_api_key}",
-                    },
-                    json=payload,
-                )
-                resp.raise_for_status()
-                data = resp.json()
+            data = await self._xai_post("/responses", payload)
 
             text = self._extract_grok_text(data)
             result = self._parse_json_response(text)
@@ -305,7 +401,8 @@ JSON形式のみで回答:
 """
 
         try:
-            response = await asyncio.to_thread(
+            response = await resilient_call(
+                'gemini',
                 self._gemini_model.generate_content,
                 prompt,
                 generation_config={
@@ -355,7 +452,8 @@ JSON形式のみで回答:
 """
 
         try:
-            response = await asyncio.to_thread(
+            response = await resilient_call(
+                'gemini',
                 self._gemini_model.generate_content,
                 prompt,
                 generation_config={
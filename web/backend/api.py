@@ -3,10 +3,11 @@ FastAPI バックエンド
 X バズ投稿生成AI
 """
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+import json
 import sys
 import os
 
@@ -25,27 +26,154 @@ except Exception:
 # 親ディレクトリのsrcをパスに追加
 sys.path.insert(0, os.path.join(_base, 'src'))
 
-from scraper import XScraper
-from guest_token_manager import GuestTokenManager
-from analyzer import TweetAnalyzer
-from rewriter import TweetRewriter
-from image_generator import InfographicGenerator
-from sheets_manager import SheetsManager
+from image_generator import TIERS, InfographicGenerator, thumbnail_url_for
+from sheets_manager import SheetsManager, SheetsSyncer
 from x_research import XResearcher
+from archive import RunArchive
+from checkpoint import RunCheckpoint
+from cost_governor import CostGovernor
+from resilience import breaker_states
+from image_jobs import ImageJobQueue
+from tweet_pipeline import TweetPipeline
+from image_cache import (
+    IMMUTABLE_CACHE_CONTROL, ImageBytesCache, is_not_modified, make_etag,
+    make_last_modified, media_type_for, parse_range, stat_image,
+)
+from utils import load_json_file
+from contextlib import asynccontextmanager
 import asyncio
 
+def _load_settings():
+    """config/settings.json（予算などの既定値。無ければ空）"""
+    try:
+        return load_json_file(os.path.join(_base, 'config', 'settings.json'))
+    except (OSError, ValueError):
+        return {}
+
+# アプリ全体で共有するリサーチャー（xAIへのコネクションプールを使い回す）
+_researcher = None
+
+def _get_researcher():
+    """共有XResearcherを取得（未生成なら生成）"""
+    global _researcher
+    if _researcher is None:
+        _researcher = XResearcher(
+            xai_api_key=os.getenv('XAI_API_KEY'),
+            gemini_api_key=os.getenv('GEMINI_API_KEY'),
+            max_connections=int(os.getenv('XAI_MAX_CONNECTIONS', 20)),
+            max_keepalive_connections=int(os.getenv('XAI_MAX_KEEPALIVE', 10)),
+            keepalive_expiry=float(os.getenv('XAI_KEEPALIVE_EXPIRY', 60)),
+        )
+    return _researcher
+
+# アプリ全体で共有するSheetsManager（認証・読み込みキャッシュを使い回す）
+_sheets = None
+
+def _get_sheets():
+    """共有SheetsManagerを取得（未生成なら生成）"""
+    global _sheets
+    if _sheets is None:
+        _sheets = SheetsManager(
+            credentials_path=os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+            or os.path.join(_base, 'config', 'credentials.json'),
+            spreadsheet_id=os.getenv('SPREADSHEET_ID'),
+            batch_size=50,
+            read_cache_ttl=int(os.getenv('SHEETS_READ_CACHE_TTL', 15))
+        )
+    return _sheets
+
+# アプリ全体で共有する画像生成エンジン（GCSバケット・I/Oスレッドプールを使い回す）
+_image_gen = None
+
+def _get_image_generator():
+    """共有InfographicGeneratorを取得（未生成なら生成）"""
+    global _image_gen
+    if _image_gen is None:
+        _image_gen = InfographicGenerator(
+            project_id=os.getenv('GCP_PROJECT_ID'),
+            location='us-central1',
+            credentials_path=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'),
+            gemini_api_key=os.getenv('GEMINI_API_KEY'),
+            bucket_name=os.getenv('GCS_BUCKET_NAME')
+        )
+    return _image_gen
+
+# 画像生成のワーカープール（並列数は IMAGE_CONCURRENCY）
+_image_jobs = None
+
+def _get_image_jobs():
+    """共有ImageJobQueueを取得（未生成なら生成）"""
+    global _image_jobs
+    if _image_jobs is None:
+        _image_jobs = ImageJobQueue(_get_image_generator())
+    return _image_jobs
+
+def _public_image_url(image_url, base_url):
+    """シートに書く画像URL（ローカル保存の /api/images/... には配信元のURLを付ける）"""
+    if image_url and image_url.startswith("/"):
+        return f"{base_url}{image_url}"
+    return image_url
+
+async def _apply_generated_image(job):
+    """バックグラウンドで生成した画像のURLを結果シート（ミラー経由）に反映"""
+    if not job.image_url:
+        return
+    job.image_url = _public_image_url(job.image_url, job.meta['base_url'])
+    await _get_sheets().update_image_url_by_url(job.meta['original_url'], job.image_url)
+
+# レスポンスとは独立に動かすタスク（クライアントが切断しても最後まで実行する）
+_background_tasks = set()
+
+def _spawn_background(coro):
+    """タスクを起動し、完了まで参照を保持する（GCで消えないように）"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def _write_image_urls(jobs, base_url):
+    """画像ジョブの完了を待ち、生成できた画像URLをシートへ1回のバッチ更新で書き込む"""
+    await asyncio.gather(*(job.future for job in jobs), return_exceptions=True)
+    updates = [(job.meta['row_id'], _public_image_url(job.image_url, base_url))
+               for job in jobs if job.image_url]
+    return await _get_sheets().update_image_urls(updates) if updates else False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動・終了処理"""
+    # 起動時に .env の MODE を表示（本番でモックになる不具合の確認用）
+    mode = os.getenv("MODE", "(not set)")
+    print(f"[API] MODE={mode} (production=本番, mock=モック)", flush=True)
+    # ローカルミラーとGoogle Sheetsのバックグラウンド同期
+    # （認証・シートオープンは同期I/Oなのでスレッドで行う）
+    sheets = await asyncio.to_thread(_get_sheets)
+    syncer = SheetsSyncer(
+        sheets,
+        push_interval=float(os.getenv('SHEETS_PUSH_INTERVAL', 5)),
+        pull_interval=float(os.getenv('SHEETS_PULL_INTERVAL', 300))
+    )
+    syncer.start()
+    yield
+    if _image_jobs is not None:
+        await _image_jobs.stop()
+    # 実行中のシート書き込みを待つ（完了しなかったジョブは待たない）
+    if _background_tasks:
+        await asyncio.wait(list(_background_tasks), timeout=30)
+    await syncer.stop()
+    sheets.close()
+    # 終了時: 共有HTTPクライアントを閉じる
+    if _researcher is not None:
+        await _researcher.aclose()
+    if _image_gen is not None:
+        _image_gen.close()
+
 app = FastAPI(
     title="X バズ投稿生成AI API",
     description="X公式アルゴリズム（2026年版）準拠のバズ投稿生成システム",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-@app.on_event("startup")
-def _log_mode():
-    """起動時に .env の MODE を表示（本番でモックになる不具合の確認用）"""
-    mode = os.getenv("MODE", "(not set)")
-    print(f"[API] MODE={mode} (production=本番, mock=モック)", flush=True)
-
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +187,7 @@ app.add_middleware(
 class GenerateRequest(BaseModel):
     accounts: List[str]
     settings: Dict[str, Any]
+    resume_run_id: Optional[str] = None  # 途中で失敗した実行を再開（summary.run_id の値）
 
 # レスポンスモデル
 class GenerateResponse(BaseModel):
@@ -70,6 +199,11 @@ class ImageGenerateRequest(BaseModel):
     rewritten_text: str
     thread: List[str] = []
     call_to_action: str = ""
+    tier: Optional[str] = None  # template: ローカル描画 / model: Nano Banana Pro
+
+class BulkImageGenerateRequest(BaseModel):
+    row_ids: List[int]
+    tier: Optional[str] = None
 
 class ImageGenerateResponse(BaseModel):
     success: bool
@@ -94,8 +228,8 @@ async def root():
 
 @app.get("/api/health")
 async def health():
-    """ヘルスチェックエンドポイント"""
-    return {"status": "healthy"}
+    """ヘルスチェックエンドポイント（外部APIのサーキットの状態つき）"""
+    return {"status": "healthy", "circuits": breaker_states()}
 
 @app.post("/api/generate", response_model=GenerateResponse)
 async def generate(request: GenerateRequest, req: Request):
@@ -109,205 +243,150 @@ async def generate(request: GenerateRequest, req: Request):
         生成結果
     """
     try:
-        # サービス初期化
-        guest_token_manager = GuestTokenManager()
-        scraper = XScraper(
-            guest_token_manager,
-            proxy_manager=None,
-            twitter_bearer_token=os.getenv('TWITTER_BEARER_TOKEN')
-        )
-        analyzer = TweetAnalyzer(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-        rewriter = TweetRewriter(gemini_api_key=os.getenv('GEMINI_API_KEY'))
-        image_gen = InfographicGenerator(
-            project_id=os.getenv('GCP_PROJECT_ID'),
-            location='us-central1',
-            credentials_path=os.path.join(_base, 'config', 'credentials.json'),
-            gemini_api_key=os.getenv('GEMINI_API_KEY')
-        )
-        sheets_manager = SheetsManager(
-            spreadsheet_id=os.getenv('SPREADSHEET_ID'),
-            credentials_path=os.path.join(_base, 'config', 'credentials.json')
+        generate_images = request.settings.get('generate_images', False)
+        image_tier = request.settings.get('image_tier')
+        base_url = str(req.base_url).rstrip("/")
+
+        async def submit_image_job(item):
+            # 画像生成はレスポンスを待たせないようキューに積み、完了したら保存済みの行に反映する
+            # （この実行の予算で予約し、実際のコストはジョブの完了時に1日の累計へ加える）
+            item['image_job'] = await _get_image_jobs().submit(
+                item['rewritten'],
+                meta={'original_url': item['original']['url'], 'base_url': base_url},
+                on_done=_apply_generated_image,
+                tier=image_tier,
+                governor=governor
+            )
+
+        # チェックポイント（再開時は記録済みの収集・分析・リライトを使う）
+        # 古い実行は削除する（完了した実行はその場で削除、失敗した実行は RUNS_RETENTION_DAYS 日残す）
+        RunCheckpoint.prune(float(os.getenv('RUNS_RETENTION_DAYS', 7)))
+        if request.resume_run_id:
+            try:
+                found = RunCheckpoint.exists(request.resume_run_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if not found:
+                raise HTTPException(status_code=404, detail=f"実行 {request.resume_run_id} が見つかりません")
+        checkpoint = RunCheckpoint(run_id=request.resume_run_id)
+        resumed = checkpoint.resumed
+
+        # 予算（settings.json の budget / COST_LIMIT_PER_RUN_USD / COST_LIMIT_PER_DAY_USD、
+        # settings.budget_usd でさらに絞れる）
+        governor = CostGovernor.from_settings(_load_settings(),
+                                              run_limit_usd=request.settings.get('budget_usd'))
+
+        # サービス初期化（Sheets・画像生成はアプリ共有のインスタンスを使う）
+        engine = TweetPipeline.from_env(
+            sheets=_get_sheets(),
+            image_gen=_get_image_generator(),
+            archive=RunArchive(source='api'),
+            concurrency=request.settings.get('concurrency'),
+            image_tier=image_tier,
+            after_save=submit_image_job if generate_images else None,
+            checkpoint=checkpoint,
+            governor=governor
         )
         
-        # ステップ1: ツイート収集
-        all_tweets = []
-        scrape_errors = []
-        for account in request.accounts:
-            # @除去、空白トリム
-            clean = account.strip().lstrip('@')
-            if not clean:
-                continue
-            try:
-                tweets = await scraper.scrape_account_timeline(
-                    username=clean,
-                    max_tweets=100
-                )
-                print(f"[INFO] @{clean}: {len(tweets)} tweets fetched", flush=True)
-                for tweet in tweets:
-                    tweet['category'] = 'AI×副業'
-                all_tweets.extend(tweets)
-            except Exception as e:
-                msg = f"@{clean}: {e}"
-                scrape_errors.append(msg)
-                print(f"[WARN] Scrape failed - {msg}", flush=True)
-            await asyncio.sleep(1)
+        try:
+            # ステップ1: ツイート収集
+            all_tweets, scrape_errors = await engine.collect(
+                [{'username': account, 'category': 'AI×副業'} for account in request.accounts],
+                max_tweets=100,
+                delay=1
+            )
 
-        if len(all_tweets) == 0:
-            if scrape_errors:
+            if len(all_tweets) == 0:
+                if scrape_errors:
+                    raise HTTPException(
+                        status_code=502,
+                        detail=f"ツイート取得に失敗: {'; '.join(scrape_errors)}"
+                    )
                 raise HTTPException(
-                    status_code=502,
-                    detail=f"ツイート取得に失敗: {'; '.join(scrape_errors)}"
+                    status_code=404,
+                    detail="ツイートが0件でした。アカウント名を確認してください（@なし、実在するアカウント）"
                 )
-            raise HTTPException(
-                status_code=404,
-                detail="ツイートが0件でした。アカウント名を確認してください（@なし、実在するアカウント）"
-            )
 
-        # ステップ2: エンゲージメントフィルタリング
-        min_likes = request.settings.get('min_likes', 500)
-        min_retweets = request.settings.get('min_retweets', 50)
+            # ステップ2: エンゲージメントフィルタリング
+            min_likes = request.settings.get('min_likes', 500)
+            min_retweets = request.settings.get('min_retweets', 50)
+            viral_tweets = TweetPipeline.filter_viral(all_tweets, min_likes, min_retweets)
 
-        viral_tweets = [
-            t for t in all_tweets
-            if t['likes'] >= min_likes and t['retweets'] >= min_retweets
-        ]
-        viral_tweets.sort(key=lambda x: x['engagement_score'], reverse=True)
-
-        if len(viral_tweets) == 0:
-            # 取得できたツイートのいいね数の最大値を表示
-            max_likes = max(t['likes'] for t in all_tweets) if all_tweets else 0
-            max_rt = max(t['retweets'] for t in all_tweets) if all_tweets else 0
-            raise HTTPException(
-                status_code=404,
-                detail=f"閾値を満たすツイートがありません（いいね≥{min_likes}, RT≥{min_retweets}）。取得した{len(all_tweets)}件の最大いいね={max_likes}, 最大RT={max_rt}。閾値を下げてみてください"
-            )
-        
-        # ステップ3: 分析
-        tweets_to_analyze = min(
-            len(viral_tweets),
-            request.settings.get('tweets_to_analyze', 10)
-        )
-        analyzed_tweets = []
-        
-        for tweet in viral_tweets[:tweets_to_analyze]:
-            analysis = await analyzer.analyze_tweet(tweet)
-            analyzed_tweets.append({
-                'original': tweet,
-                'analysis': analysis
-            })
-            await asyncio.sleep(0.1)
+            if len(viral_tweets) == 0:
+                # 取得できたツイートのいいね数の最大値を表示
+                max_likes = max(t['likes'] for t in all_tweets) if all_tweets else 0
+                max_rt = max(t['retweets'] for t in all_tweets) if all_tweets else 0
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"閾値を満たすツイートがありません（いいね≥{min_likes}, RT≥{min_retweets}）。取得した{len(all_tweets)}件の最大いいね={max_likes}, 最大RT={max_rt}。閾値を下げてみてください"
+                )
         
-        # ステップ4: リライト（画像生成はデフォルトOFF、手動指定のみ）
-        tweets_to_rewrite = min(
-            len(analyzed_tweets),
-            request.settings.get('tweets_to_rewrite', 5)
-        )
-        generate_images = request.settings.get('generate_images', False)
-        results = []
+            # ステップ3〜4: 分析 → リライト → 保存（画像生成はデフォルトOFF、手動指定のみ）
+            # 有界キューでつなぎ、分析が終わったツイートから順にリライト・保存へ流す
+            # 残りの予算に収まるように件数を減らす
+            tweets_to_analyze, tweets_to_rewrite = governor.plan(
+                request.settings.get('tweets_to_analyze', 10),
+                request.settings.get('tweets_to_rewrite', 5)
+            )
+            saved = await engine.process(
+                viral_tweets[:tweets_to_analyze],
+                rewrite_limit=tweets_to_rewrite
+            )
+            # 画像ジョブはチェックポイントに記録しないので、予算で見送っても再開の対象にしない
+            completed = not engine.errors and not any(
+                count for kind, count in governor.skipped.items() if kind != 'image'
+            )
+        finally:
+            try:
+                await engine.close()
+            except Exception as e:
+                print(f"[WARN] Failed to flush results: {e}", flush=True)
+        if completed:
+            # 再開することはないのでチェックポイントは残さない
+            checkpoint.delete()
 
-        # コスト計算用
-        gemini_analysis_calls = len(analyzed_tweets)
-        gemini_rewrite_calls = 0
+        if engine.errors and not saved:
+            stage, _, error = engine.errors[0]
+            raise HTTPException(status_code=500, detail=f"{stage} に失敗しました: {error}")
 
-        for item in analyzed_tweets[:tweets_to_rewrite]:
-            # リライト
-            rewritten = await rewriter.rewrite_tweet(
-                item['original'],
-                item['analysis']
-            )
-            gemini_rewrite_calls += 1
-
-            # 画像生成（明示的にONの場合のみ）
-            image_url = ""
-            if generate_images:
-                image_url = await image_gen.generate_infographic(rewritten)
-                if image_url and image_url.startswith("/"):
-                    base_url = str(req.base_url).rstrip("/")
-                    image_url = f"{base_url}{image_url}"
-
-            # 結果を整形
-            result = {
-                'category': item['original'].get('category', 'AI×副業'),
-                'original_text': item['original']['text'],
-                'original_likes': item['original']['likes'],
-                'original_retweets': item['original']['retweets'],
-                'original_replies': item['original']['replies'],
-                'original_url': item['original']['url'],
+        # 結果を整形（エンゲージメント順）
+        results = []
+        for item in saved:
+            original, analysis, rewritten = item['original'], item['analysis'], item['rewritten']
+            image_job = item.get('image_job')
+            results.append({
+                'category': original.get('category', 'AI×副業'),
+                'original_text': original['text'],
+                'original_likes': original['likes'],
+                'original_retweets': original['retweets'],
+                'original_replies': original['replies'],
+                'original_url': original['url'],
                 'rewritten_text': rewritten['main_text'],
                 'thread': rewritten.get('thread', []),
                 'call_to_action': rewritten.get('call_to_action', ''),
-                'scores': item['analysis']['scores'],
-                'positive_signals': item['analysis']['positive_signals'],
-                'negative_signals': item['analysis']['negative_signals'],
-                'image_url': image_url
-            }
-            results.append(result)
-            await asyncio.sleep(0.1)
-        
-        # Google Sheetsに保存
-        for i, result in enumerate(results):
-            try:
-                # SheetsManagerが期待する形式に変換
-                sheets_data = {
-                    'original_tweet': {
-                        'text': result['original_text'],
-                        'likes': result['original_likes'],
-                        'retweets': result['original_retweets'],
-                        'replies': result['original_replies'],
-                        'url': result['original_url'],
-                        'category': result['category']
-                    },
-                    'analysis': {
-                        'scores': result['scores'],
-                        'positive_signals': result['positive_signals'],
-                        'negative_signals': result['negative_signals']
-                    },
-                    'rewritten': {
-                        'main_text': result['rewritten_text'],
-                        'thread': result['thread'],
-                        'call_to_action': result['call_to_action']
-                    },
-                    'image_url': result['image_url']
-                }
-                await sheets_manager.save_result(sheets_data)
-            except Exception as e:
-                print(f"[WARN] Failed to save result {i+1} to Sheets: {e}", flush=True)
-        
-        # コスト計算
-        # --- X API (Pay-Per-Use): $0.01/user lookup, $0.005/tweet read ---
-        x_api_user_lookups = len([a for a in request.accounts if a.strip().lstrip('@')])
-        x_api_tweets_read = len(all_tweets)
-        x_api_cost = (x_api_user_lookups * 0.01) + (x_api_tweets_read * 0.005)
-
-        # --- Gemini 2.5 Flash: $0.30/1M input, $2.50/1M output ---
-        # 分析: ~2000 input tokens, ~500 output tokens per call
-        # リライト: ~3000 input tokens, ~1000 output tokens per call
-        analysis_input_cost = gemini_analysis_calls * 2000 * 0.30 / 1_000_000
-        analysis_output_cost = gemini_analysis_calls * 500 * 2.50 / 1_000_000
-        rewrite_input_cost = gemini_rewrite_calls * 3000 * 0.30 / 1_000_000
-        rewrite_output_cost = gemini_rewrite_calls * 1000 * 2.50 / 1_000_000
-        gemini_cost = analysis_input_cost + analysis_output_cost + rewrite_input_cost + rewrite_output_cost
-
-        total_cost_usd = x_api_cost + gemini_cost
-        total_cost_jpy = total_cost_usd * 150  # 概算レート
+                'scores': analysis['scores'],
+                'positive_signals': analysis['positive_signals'],
+                'negative_signals': analysis['negative_signals'],
+                'image_url': '',
+                'image_status': image_job.status if image_job else 'none',
+                'image_job_id': image_job.job_id if image_job else None
+            })
+
+        analyzed_tweets = engine.analyzed
 
         # サマリー
         summary = {
+            'run_id': checkpoint.run_id,
+            'resumed': resumed,
+            'resumable': not completed,
+            'restored': dict(engine.restored),
             'total_collected': len(all_tweets),
             'total_filtered': len(viral_tweets),
             'total_analyzed': len(analyzed_tweets),
             'total_rewritten': len(results),
             'accounts_processed': len(request.accounts),
-            'cost': {
-                'x_api_user_lookups': x_api_user_lookups,
-                'x_api_tweets_read': x_api_tweets_read,
-                'x_api_cost_usd': round(x_api_cost, 4),
-                'gemini_analysis_calls': gemini_analysis_calls,
-                'gemini_rewrite_calls': gemini_rewrite_calls,
-                'gemini_cost_usd': round(gemini_cost, 4),
-                'estimated_cost_usd': round(total_cost_usd, 4),
-                'estimated_cost_jpy': round(total_cost_jpy, 2)
-            }
+            # 実際の使用量（Gemini は usage_metadata、チェックポイントから復元した分は含まない）
+            'cost': governor.summary()
         }
         
         return GenerateResponse(results=results, summary=summary)
@@ -321,7 +400,7 @@ async def generate(request: GenerateRequest, req: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/generate-image", response_model=ImageGenerateResponse)
-async def generate_image_for_row(request: ImageGenerateRequest):
+async def generate_image_for_row(request: ImageGenerateRequest, req: Request):
     """
     Google Sheetsの特定行に対して画像を生成
     
@@ -332,14 +411,8 @@ async def generate_image_for_row(request: ImageGenerateRequest):
         画像生成結果
     """
     try:
-        # 画像生成サービス初期化
-        image_gen = InfographicGenerator(
-            project_id=os.getenv('GCP_PROJECT_ID'),
-            location='us-central1',
-            credentials_path=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'),
-            gemini_api_key=os.getenv('GEMINI_API_KEY'),
-            bucket_name=os.getenv('GCS_BUCKET_NAME')
-        )
+        # 画像生成サービス（共有インスタンス）
+        image_gen = _get_image_generator()
         
         # リライトデータを構築
         rewritten = {
@@ -349,22 +422,19 @@ async def generate_image_for_row(request: ImageGenerateRequest):
         }
         
         # 画像生成
-        image_url = await image_gen.generate_infographic(rewritten)
+        image_url = await image_gen.generate_infographic(rewritten, tier=request.tier)
         
         if not image_url:
             raise HTTPException(
                 status_code=500,
                 detail="画像生成に失敗しました"
             )
+        image_url = _public_image_url(image_url, str(req.base_url).rstrip("/"))
         
         # Google Sheetsを更新
-        from sheets_manager import SheetsManager
-        sheets = SheetsManager(
-            credentials_path=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'),
-            spreadsheet_id=os.getenv('SPREADSHEET_ID')
-        )
+        sheets = _get_sheets()
         
-        success = sheets.update_image_url(request.sheet_row_id, image_url)
+        success = await sheets.update_image_url(request.sheet_row_id, image_url)
         
         return ImageGenerateResponse(
             success=success,
@@ -376,23 +446,122 @@ async def generate_image_for_row(request: ImageGenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/generate-images")
+async def generate_images_bulk(request: BulkImageGenerateRequest, req: Request):
+    """
+    複数行の画像をまとめて生成（ワーカープールで並列実行）
+
+    行データはローカルミラーから読み、完了した行から順に1行ずつJSONで返す（NDJSON）。
+    全行の完了後に画像URLをシートへ1回のバッチ更新で書き込む。書き込みはレスポンスとは
+    別のタスクで行うので、途中でクライアントが切断してもシートには反映される。
+
+    Args:
+        request: 行IDのリスト
+
+    Returns:
+        StreamingResponse (application/x-ndjson)
+        各行: {"type": "row", "row_id", "success", "image_url", "error"}
+        最終行: {"type": "done", "succeeded", "failed", "sheet_updated"}
+    """
+    row_ids = list(dict.fromkeys(request.row_ids))
+    if not row_ids:
+        raise HTTPException(status_code=400, detail="row_ids を指定してください")
+    if len(row_ids) > 200:
+        raise HTTPException(status_code=400, detail="row_ids は最大200件です")
+    if request.tier and request.tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"tier は {', '.join(TIERS)} のいずれかです")
+
+    sheets = _get_sheets()
+    image_jobs = _get_image_jobs()
+    base_url = str(req.base_url).rstrip("/")
+
+    async def stream():
+        jobs = []
+        writer = None
+        failed = 0
+        try:
+            for row_id in row_ids:
+                row = await sheets.get_row_data(row_id)
+                if not row or not row.get('rewritten_text'):
+                    failed += 1
+                    yield json.dumps({
+                        "type": "row", "row_id": row_id, "success": False,
+                        "image_url": "", "error": "行データが見つかりません"
+                    }, ensure_ascii=False) + "\n"
+                    continue
+                rewritten = {
+                    'main_text': row['rewritten_text'],
+                    'thread': row['thread'].split(' | ') if row.get('thread') else [],
+                    'call_to_action': row.get('call_to_action', '')
+                }
+                jobs.append(await image_jobs.submit(rewritten, meta={'row_id': row_id}, tier=request.tier))
+            writer = _spawn_background(_write_image_urls(jobs, base_url))
+
+            async def wait_job(job):
+                await job.future
+                return job
+
+            succeeded = 0
+            for next_done in asyncio.as_completed([wait_job(job) for job in jobs]):
+                job = await next_done
+                if job.image_url:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps({
+                    "type": "row", "row_id": job.meta['row_id'], "success": bool(job.image_url),
+                    "image_url": _public_image_url(job.image_url, base_url), "error": job.error
+                }, ensure_ascii=False) + "\n"
+
+            # 切断されてもシートへの書き込みは止めない
+            sheet_updated = await asyncio.shield(writer)
+            yield json.dumps({
+                "type": "done", "succeeded": succeeded, "failed": failed,
+                "sheet_updated": sheet_updated
+            }) + "\n"
+        finally:
+            if writer is None and jobs:
+                # 行の読み込み中に切断された場合も、投入済みのジョブの結果は書き込む
+                _spawn_background(_write_image_urls(jobs, base_url))
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/api/image-jobs")
+async def get_image_jobs(ids: str):
+    """
+    画像生成ジョブの状態を取得（/api/generate のポーリング用）
+
+    Args:
+        ids: カンマ区切りの job_id
+
+    Returns:
+        {"jobs": [{"job_id", "status", "image_url", "error"}, ...]}
+        status: pending / running / done / failed / unknown（期限切れ・存在しない）
+    """
+    image_jobs = _get_image_jobs()
+    jobs = []
+    for job_id in [i for i in ids.split(',') if i][:100]:
+        job = image_jobs.get(job_id)
+        if job:
+            jobs.append({k: v for k, v in job.to_dict().items() if k != 'base_url'})
+        else:
+            jobs.append({"job_id": job_id, "status": "unknown", "image_url": "", "error": None})
+    return {"jobs": jobs}
+
 @app.get("/api/sheet-rows")
-async def get_sheet_rows(limit: int = 50):
+async def get_sheet_rows(limit: int = 50, cursor: Optional[int] = None):
     """
-    Google Sheetsのデータを取得（管理画面用）
+    Google Sheetsのデータを新しい順に取得（管理画面用）
     
     Args:
         limit: 取得する行数の上限
+        cursor: 前回レスポンスの next_cursor（続きを読む場合）
     
     Returns:
-        行データのリスト
+        行データのリストと次ページのカーソル
     """
     try:
-        from sheets_manager import SheetsManager
-        sheets = SheetsManager(
-            credentials_path=os.getenv('GOOGLE_APPLICATION_CREDENTIALS'),
-            spreadsheet_id=os.getenv('SPREADSHEET_ID')
-        )
+        sheets = _get_sheets()
         
         if not sheets.worksheet:
             raise HTTPException(
@@ -400,48 +569,79 @@ async def get_sheet_rows(limit: int = 50):
                 detail="Google Sheetsに接続できません"
             )
         
-        # 全行データを取得（ヘッダー以降）
-        all_rows = sheets.worksheet.get_all_values()
-        
-        # ヘッダーをスキップ、最新から取得
-        data_rows = all_rows[1:limit+1] if len(all_rows) > 1 else []
-        
-        # 辞書形式に変換
-        result = []
-        for idx, row in enumerate(data_rows, start=2):  # 行番号は2から（1はヘッダー）
-            if len(row) >= 13:
-                result.append({
-                    'row_number': idx,
-                    'collected_date': row[0],
-                    'original_url': row[1],
-                    'category': row[2],
-                    'original_text': row[3],
-                    'likes': row[4],
-                    'retweets': row[5],
-                    'replies': row[6],
-                    'rewritten_text': row[10],
-                    'thread': row[11],
-                    'call_to_action': row[12],
-                    'image_url': row[13] if len(row) > 13 else '',
-                    'image_generated': row[14] if len(row) > 14 else 'FALSE'
-                })
+        limit = max(1, min(limit, 500))
+        page = await sheets.get_rows(limit=limit, cursor=cursor)
+        # 一覧にはサムネイル（軽量WebP）を表示する
+        for row in page['rows']:
+            row['thumbnail_url'] = thumbnail_url_for(row.get('image_url'))
         
-        return {"rows": result, "count": len(result)}
+        return {
+            "rows": page['rows'],
+            "count": len(page['rows']),
+            "next_cursor": page['next_cursor']
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # ─── 画像配信エンドポイント ───
 
+_images_dir = os.path.join(_base, "output", "images")
+_image_bytes_cache = ImageBytesCache(
+    max_bytes=int(os.getenv('IMAGE_CACHE_BYTES', 64 * 1024 * 1024)),
+    max_file_bytes=int(os.getenv('IMAGE_CACHE_MAX_FILE_BYTES', 2 * 1024 * 1024))
+)
+
 @app.get("/api/images/{filename}")
-async def serve_image(filename: str):
-    """生成画像を配信"""
-    images_dir = os.path.join(_base, "output", "images")
-    filepath = os.path.join(images_dir, filename)
-    if not os.path.exists(filepath):
+async def serve_image(filename: str, request: Request):
+    """
+    生成画像を配信
+
+    - 画像は内容が変わらないので長期キャッシュ（immutable）
+    - If-None-Match / If-Modified-Since に 304 で応答
+    - Range（単一範囲）に 206 で応答
+    """
+    found = stat_image(_images_dir, filename)
+    if not found:
         raise HTTPException(status_code=404, detail="Image not found")
-    media_type = "image/jpeg" if filename.endswith(".jpg") else "image/png"
-    return FileResponse(filepath, media_type=media_type)
+    filepath, stat = found
+
+    etag = make_etag(stat)
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": etag,
+        "Last-Modified": make_last_modified(stat),
+        "Accept-Ranges": "bytes",
+    }
+    if is_not_modified(request.headers, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = media_type_for(filename)
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat.st_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=headers)
+
+    data = await asyncio.to_thread(_image_bytes_cache.read, filepath, stat)
+    if byte_range is None:
+        if data is None:
+            # 大きいファイルはキャッシュせずストリーミング
+            return FileResponse(filepath, media_type=media_type, headers=headers)
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    if data is not None:
+        chunk = data[start:end + 1]
+    else:
+        chunk = await asyncio.to_thread(ImageBytesCache.read_range, filepath, start, end)
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return Response(content=chunk, status_code=206, media_type=media_type, headers=headers)
 
 # ─── リサーチエンドポイント（Hayatti式 Grok x_search 統合） ───
 
@@ -455,6 +655,16 @@ class ViralAnalysisRequest(BaseModel):
     topic: str
     count: int = 10
 
+class BatchResearchRequest(BaseModel):
+    topics: List[str]
+    locale: str = "ja"
+    audience: str = "both"
+    days: int = 7
+    count: int = 10
+    # 1リクエストで開くX APIの同時呼び出し数・待ち時間の上限
+    concurrency: int = Field(5, ge=1, le=10)
+    timeout_sec: float = Field(180.0, gt=0, le=600)
+
 @app.post("/api/research")
 async def research_topic(request: ResearchRequest):
     """
@@ -464,10 +674,7 @@ async def research_topic(request: ResearchRequest):
     Grok未設定時はGeminiにフォールバック。
     """
     try:
-        researcher = XResearcher(
-            xai_api_key=os.getenv('XAI_API_KEY'),
-            gemini_api_key=os.getenv('GEMINI_API_KEY')
-        )
+        researcher = _get_researcher()
         result = await researcher.research_topic(
             topic=request.topic,
             locale=request.locale,
@@ -487,10 +694,7 @@ async def analyze_viral_patterns(request: ViralAnalysisRequest):
     フックの型・構造・心理トリガー・「なぜ伸びたか」を抽出。
     """
     try:
-        researcher = XResearcher(
-            xai_api_key=os.getenv('XAI_API_KEY'),
-            gemini_api_key=os.getenv('GEMINI_API_KEY')
-        )
+        researcher = _get_researcher()
         result = await researcher.analyze_viral_patterns(
             topic=request.topic,
             count=request.count
@@ -499,6 +703,41 @@ async def analyze_viral_patterns(request: ViralAnalysisRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/research/batch")
+async def research_topics_batch(request: BatchResearchRequest):
+    """
+    複数トピックを並列リサーチし、完了したトピックから順にNDJSONでストリーミング
+
+    各行は1トピック分のContext Pack（research + viral_analysis）。
+    最後の行は {"type": "done", ...} のサマリー。
+    """
+    if not request.topics:
+        raise HTTPException(status_code=400, detail="topicsを1つ以上指定してください")
+    if len(request.topics) > 50:
+        raise HTTPException(status_code=400, detail="topicsは50件までです")
+
+    researcher = _get_researcher()
+
+    async def _stream():
+        completed = 0
+        failed = 0
+        async for pack in researcher.research_topics(
+            request.topics,
+            locale=request.locale,
+            audience=request.audience,
+            days=request.days,
+            count=request.count,
+            concurrency=request.concurrency,
+            timeout=request.timeout_sec,
+        ):
+            completed += 1
+            if pack['status'] != 'ok':
+                failed += 1
+            yield json.dumps({"type": "topic", **pack}, ensure_ascii=False) + "\n"
+        yield json.dumps({"type": "done", "completed": completed, "failed": failed}) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
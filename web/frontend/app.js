@@ -71,9 +71,10 @@ async function handleGenerate() {
         const data = await response.json();
         const elapsed = ((Date.now() - startTime) / 1000).toFixed(1);
 
-        // 結果表示
+        // 結果表示（画像はバックグラウンド生成なので後から差し込む）
         displayResults(data.results);
         displaySummary(data.summary, elapsed);
+        pollImageJobs(data.results);
 
         statusSection.style.display = 'none';
         showToast(`${data.results.length}件のリライトを生成しました（${elapsed}秒）`, 'success');
@@ -167,6 +168,7 @@ function createResultCard(result, index) {
             </div>
 
             ${result.call_to_action ? `<div class="result-cta">${esc(result.call_to_action)}</div>` : ''}
+            ${renderResultImage(result)}
         </div>
     `;
 
@@ -176,6 +178,45 @@ function createResultCard(result, index) {
     return card;
 }
 
+function renderResultImage(result) {
+    if (result.image_url) {
+        return `<div class="result-image"><img src="${esc(imageSrc(result.image_url))}" loading="lazy" alt=""></div>`;
+    }
+    if (result.image_job_id) {
+        return `<div class="result-image" data-job-id="${esc(result.image_job_id)}">🎨 画像生成中...</div>`;
+    }
+    return '';
+}
+
+function imageSrc(url) {
+    return url && url.startsWith('/') ? `${API_BASE_URL}${url}` : url;
+}
+
+// 画像生成ジョブが終わるまでポーリングして結果カードに反映
+async function pollImageJobs(results, intervalMs = 3000, maxPolls = 100) {
+    let pending = results.map(r => r.image_job_id).filter(Boolean);
+    for (let i = 0; i < maxPolls && pending.length > 0; i++) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/image-jobs?ids=${pending.join(',')}`);
+            if (!response.ok) continue;
+            const data = await response.json();
+            for (const job of data.jobs) {
+                if (job.status === 'pending' || job.status === 'running') continue;
+                const el = document.querySelector(`.result-image[data-job-id="${job.job_id}"]`);
+                if (el) {
+                    el.innerHTML = job.status === 'done'
+                        ? `<img src="${esc(imageSrc(job.image_url))}" loading="lazy" alt="">`
+                        : '画像生成に失敗しました';
+                }
+                pending = pending.filter(id => id !== job.job_id);
+            }
+        } catch (error) {
+            console.error('Image job polling failed:', error);
+        }
+    }
+}
+
 function copyText(btn, index) {
     const card = btn.closest('.result-card');
     const text = card.dataset.rewrite || '';